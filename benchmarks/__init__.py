@@ -0,0 +1,2 @@
+# Archivo de inicialización para el paquete benchmarks
+# Ejecutar los benchmarks desde la raíz del proyecto: python -m benchmarks.<nombre>
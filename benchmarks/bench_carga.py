@@ -0,0 +1,349 @@
+"""
+Prueba de carga sin red: usuarios virtuales registrando compras y pidiendo reportes
+
+Uso:
+    python -m benchmarks.bench_carga [--usuarios 50] [--iteraciones 5] [--reportes 0.2]
+                                     [--pausa 0] [--latencia-red 0] [--filas 0]
+                                     [--con-limitador] [--salida resultados.json]
+
+Construye la Application real (handlers, control de acceso, procesador
+concurrente) con una API de Telegram simulada en memoria y hace que cada
+usuario virtual recorra conversaciones completas de /compra (iniciar_compra →
+guardar_calidad) mezcladas con comandos de reporte. Los datos se escriben en un
+directorio temporal (opcionalmente con --filas compras sintéticas previas).
+
+Informa la latencia de extremo a extremo de cada paso (desde que el update
+entra a la cola hasta que terminan sus handlers) con p50/p95/p99, el
+rendimiento en updates/s y la contención de almacenamiento: tiempo dentro de
+utils.db, operaciones simultáneas y retraso del event loop.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+
+# Pasos de una conversación de compra: (nombre, texto)
+PASOS_COMPRA = [
+    ("compra.INICIO", "/compra"),
+    ("compra.PROVEEDOR", None),
+    ("compra.CANTIDAD", None),
+    ("compra.PRECIO", None),
+    ("compra.CALIDAD", None),
+]
+COMANDOS_REPORTE = ["/reporte", "/reporte_diario", "/reporte_semanal", "/reporte_mensual"]
+
+# Funciones de utils.db cuya duración y simultaneidad se miden
+FUNCIONES_DB = ["save_to_csv", "get_dataframe", "read_from_csv", "update_csv",
+                "update_record", "get_record_by_id"]
+
+def _parsear_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--usuarios', type=int, default=50, help="Usuarios virtuales simultáneos")
+    parser.add_argument('--iteraciones', type=int, default=5, help="Operaciones por usuario")
+    parser.add_argument('--reportes', type=float, default=0.2, help="Proporción de operaciones que son reportes")
+    parser.add_argument('--pausa', type=float, default=0.0, help="Segundos que 'piensa' el usuario entre mensajes")
+    parser.add_argument('--latencia-red', type=float, default=0.0, help="Milisegundos por petición a la API simulada")
+    parser.add_argument('--filas', type=int, default=0, help="Compras sintéticas previas en los datos")
+    parser.add_argument('--con-limitador', action='store_true', help="Aplicar los límites de envío de Telegram")
+    parser.add_argument('--timeout', type=float, default=60.0, help="Segundos máximos de espera por update")
+    parser.add_argument('--semilla', type=int, default=42)
+    parser.add_argument('--salida', help="Archivo JSON donde guardar los resultados")
+    return parser.parse_args()
+
+def _percentiles(valores):
+    if not valores:
+        return {"n": 0}
+    ordenados = sorted(valores)
+
+    def percentil(q):
+        return ordenados[min(int(q * len(ordenados)), len(ordenados) - 1)]
+
+    return {
+        "n": len(ordenados),
+        "p50_ms": percentil(0.50) * 1000,
+        "p95_ms": percentil(0.95) * 1000,
+        "p99_ms": percentil(0.99) * 1000,
+        "max_ms": ordenados[-1] * 1000,
+    }
+
+class MedidorAlmacenamiento:
+    """Envuelve las funciones de utils.db para medir su duración y simultaneidad"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._hilo_principal = threading.get_ident()
+        self.en_curso = 0
+        self.max_en_curso = 0
+        self.llamadas = defaultdict(list)
+        self.en_event_loop = defaultdict(float)
+
+    def envolver(self, nombre, funcion):
+        def envoltura(*args, **kwargs):
+            with self._lock:
+                self.en_curso += 1
+                self.max_en_curso = max(self.max_en_curso, self.en_curso)
+            inicio = time.perf_counter()
+            try:
+                return funcion(*args, **kwargs)
+            finally:
+                duracion = time.perf_counter() - inicio
+                with self._lock:
+                    self.en_curso -= 1
+                    self.llamadas[nombre].append(duracion)
+                    # Tiempo de E/S bloqueante dentro del event loop: detiene a todos los chats
+                    if threading.get_ident() == self._hilo_principal:
+                        self.en_event_loop[nombre] += duracion
+        envoltura.__wrapped__ = funcion
+        return envoltura
+
+    def instalar(self):
+        """Reemplaza las funciones en utils.db (antes de importar los handlers)"""
+        import utils.db
+        for nombre in FUNCIONES_DB:
+            setattr(utils.db, nombre, self.envolver(nombre, getattr(utils.db, nombre)))
+
+    def resumen(self):
+        return {
+            "max_operaciones_simultaneas": self.max_en_curso,
+            "funciones": {
+                nombre: dict(
+                    _percentiles(duraciones),
+                    total_s=sum(duraciones),
+                    en_event_loop_s=self.en_event_loop[nombre],
+                )
+                for nombre, duraciones in sorted(self.llamadas.items())
+            },
+        }
+
+def _crear_request(latencia_red):
+    """API de Telegram simulada en memoria"""
+    from telegram.request import BaseRequest
+
+    class RequestSimulada(BaseRequest):
+        def __init__(self):
+            self.peticiones = defaultdict(int)
+            self._ids = 0
+
+        @property
+        def read_timeout(self):
+            return None
+
+        async def initialize(self):
+            pass
+
+        async def shutdown(self):
+            pass
+
+        async def do_request(self, url, method, request_data=None, read_timeout=None,
+                             write_timeout=None, connect_timeout=None, pool_timeout=None):
+            metodo = url.rsplit('/', 1)[-1]
+            self.peticiones[metodo] += 1
+            if latencia_red:
+                await asyncio.sleep(latencia_red / 1000)
+            parametros = request_data.parameters if request_data else {}
+            if metodo == "getMe":
+                resultado = {"id": 1, "is_bot": True, "first_name": "Café Bot", "username": "cafe_test_bot"}
+            elif metodo in ("sendMessage", "editMessageText", "sendDocument"):
+                self._ids += 1
+                resultado = {
+                    "message_id": self._ids, "date": int(time.time()),
+                    "chat": {"id": int(parametros.get("chat_id", 0)), "type": "private"},
+                    "text": parametros.get("text", ""),
+                }
+            elif metodo == "getUpdates":
+                resultado = []
+            else:
+                resultado = True
+            return 200, json.dumps({"ok": True, "result": resultado}).encode()
+
+    return RequestSimulada()
+
+class Carga:
+    """Ejecuta los usuarios virtuales contra la Application y registra latencias"""
+
+    def __init__(self, application, args):
+        self.application = application
+        self.args = args
+        self.latencias = defaultdict(list)
+        self.timeouts = defaultdict(int)
+        self._pendientes = {}
+        self._siguiente_id = 0
+        self.lag_event_loop = []
+
+    def _crear_update(self, user_id, texto):
+        from telegram import Update
+        self._siguiente_id += 1
+        mensaje = {
+            "message_id": self._siguiente_id, "date": int(time.time()),
+            "chat": {"id": user_id, "type": "private"},
+            "from": {"id": user_id, "is_bot": False, "first_name": f"Usuario {user_id}",
+                     "username": f"usuario{user_id}"},
+            "text": texto,
+        }
+        if texto.startswith('/'):
+            mensaje["entities"] = [{"type": "bot_command", "offset": 0, "length": len(texto.split()[0])}]
+        return Update.de_json({"update_id": self._siguiente_id, "message": mensaje}, self.application.bot)
+
+    async def marcar_fin(self, update, context):
+        """Handler del último grupo: el update terminó de procesarse"""
+        futuro = self._pendientes.pop(update.update_id, None)
+        if futuro is not None and not futuro.done():
+            futuro.set_result(time.perf_counter())
+
+    async def _enviar(self, paso, user_id, texto):
+        update = self._crear_update(user_id, texto)
+        futuro = asyncio.get_running_loop().create_future()
+        self._pendientes[update.update_id] = futuro
+        inicio = time.perf_counter()
+        await self.application.update_queue.put(update)
+        try:
+            fin = await asyncio.wait_for(futuro, self.args.timeout)
+            self.latencias[paso].append(fin - inicio)
+        except asyncio.TimeoutError:
+            self._pendientes.pop(update.update_id, None)
+            self.timeouts[paso] += 1
+        if self.args.pausa:
+            await asyncio.sleep(self.args.pausa)
+
+    async def _usuario(self, user_id, rnd):
+        from tools.generar_datos import PROVEEDORES, CALIDADES
+        for _ in range(self.args.iteraciones):
+            if rnd.random() < self.args.reportes:
+                comando = rnd.choice(COMANDOS_REPORTE)
+                await self._enviar(comando.lstrip('/'), user_id, comando)
+                continue
+            textos = [
+                "/compra", rnd.choice(PROVEEDORES), f"{rnd.uniform(5, 500):.1f}",
+                f"{rnd.uniform(3, 8):.2f}", rnd.choice(CALIDADES),
+            ]
+            for (paso, _), texto in zip(PASOS_COMPRA, textos):
+                await self._enviar(paso, user_id, texto)
+
+    async def _medir_lag(self, intervalo=0.05):
+        while True:
+            inicio = time.perf_counter()
+            await asyncio.sleep(intervalo)
+            self.lag_event_loop.append(max(time.perf_counter() - inicio - intervalo, 0.0))
+
+    async def ejecutar(self):
+        """Ejecuta todos los usuarios virtuales y devuelve la duración total en segundos"""
+        rnd = random.Random(self.args.semilla)
+        monitor = asyncio.create_task(self._medir_lag())
+        inicio = time.perf_counter()
+        await asyncio.gather(*(
+            self._usuario(1000 + indice, random.Random(rnd.random()))
+            for indice in range(self.args.usuarios)
+        ))
+        duracion = time.perf_counter() - inicio
+        monitor.cancel()
+        return duracion
+
+async def _ejecutar(args, medidor):
+    from telegram import Update
+    from telegram.ext import TypeHandler
+    import bot
+
+    # Los logs INFO de cada petición distorsionarían las mediciones
+    logging.getLogger().setLevel(logging.WARNING)
+
+    request = _crear_request(args.latencia_red)
+    application = bot.crear_aplicacion(request=request, limitar_envios=args.con_limitador)
+    bot.register_acceso_handlers(application)
+    bot.registrar_handlers(application)
+    carga = Carga(application, args)
+    application.add_handler(TypeHandler(Update, carga.marcar_fin), group=1000)
+
+    async with application:
+        await application.post_init(application)
+        await application.start()
+        try:
+            duracion = await carga.ejecutar()
+        finally:
+            await application.stop()
+            await application.post_shutdown(application)
+
+    completados = sum(len(valores) for valores in carga.latencias.values())
+    todas = [valor for valores in carga.latencias.values() for valor in valores]
+    return {
+        "fecha": datetime.now().isoformat(timespec='seconds'),
+        "parametros": vars(args),
+        "duracion_s": duracion,
+        "updates_completados": completados,
+        "updates_por_s": completados / duracion if duracion else None,
+        "compras_por_s": len(carga.latencias["compra.CALIDAD"]) / duracion if duracion else None,
+        "timeouts": dict(carga.timeouts),
+        "latencia_total": _percentiles(todas),
+        "latencia_por_paso": {paso: _percentiles(valores) for paso, valores in sorted(carga.latencias.items())},
+        "peticiones_api": dict(request.peticiones),
+        "event_loop_lag": _percentiles(carga.lag_event_loop),
+        "almacenamiento": medidor.resumen(),
+    }
+
+def _imprimir(resultado):
+    print(f"\n{resultado['updates_completados']} updates en {resultado['duracion_s']:.1f}s: "
+          f"{resultado['updates_por_s']:.1f} updates/s, {resultado['compras_por_s']:.1f} compras/s")
+    if resultado["timeouts"]:
+        print(f"Timeouts: {resultado['timeouts']}")
+
+    print(f"\n{'paso':<20}{'n':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    filas = list(resultado["latencia_por_paso"].items()) + [("TOTAL", resultado["latencia_total"])]
+    for paso, datos in filas:
+        if datos["n"]:
+            print(f"{paso:<20}{datos['n']:>7}{datos['p50_ms']:>10.1f}{datos['p95_ms']:>10.1f}"
+                  f"{datos['p99_ms']:>10.1f}{datos['max_ms']:>10.1f}")
+
+    almacenamiento = resultado["almacenamiento"]
+    print(f"\nAlmacenamiento (máx. {almacenamiento['max_operaciones_simultaneas']} operaciones simultáneas)")
+    print(f"{'función':<20}{'n':>7}{'p50 ms':>10}{'p99 ms':>10}{'total s':>10}{'en loop s':>11}")
+    for nombre, datos in almacenamiento["funciones"].items():
+        print(f"{nombre:<20}{datos['n']:>7}{datos['p50_ms']:>10.2f}{datos['p99_ms']:>10.2f}"
+              f"{datos['total_s']:>10.2f}{datos['en_event_loop_s']:>11.2f}")
+
+    lag = resultado["event_loop_lag"]
+    if lag["n"]:
+        print(f"\nRetraso del event loop: p50 {lag['p50_ms']:.1f} ms, p99 {lag['p99_ms']:.1f} ms, "
+              f"máx {lag['max_ms']:.1f} ms")
+
+def main():
+    args = _parsear_args()
+
+    # Datos, usuarios y límites aislados de la instalación real; se fijan antes de importar config
+    directorio = tempfile.mkdtemp(prefix="cafe_bot_carga_")
+    os.environ["DATA_DIR"] = directorio
+    os.environ["USUARIOS_FILE"] = os.path.join(directorio, "usuarios.csv")
+    os.environ["ADMIN_USERS"] = ""
+    os.environ["TELEGRAM_API_URL"] = ""
+    os.environ.setdefault("ACCESO_RAFAGA", "1000000")
+    os.environ.setdefault("UPDATE_QUEUE_SIZE", str(max(args.usuarios * 2, 100)))
+
+    try:
+        if args.filas:
+            from tools.generar_datos import generar_datos
+            print(f"Generando {args.filas} compras sintéticas...")
+            generar_datos(directorio, args.filas)
+
+        medidor = MedidorAlmacenamiento()
+        medidor.instalar()
+        print(f"{args.usuarios} usuarios x {args.iteraciones} operaciones "
+              f"({args.reportes:.0%} reportes), datos en {directorio}")
+        resultado = asyncio.run(_ejecutar(args, medidor))
+    finally:
+        shutil.rmtree(directorio, ignore_errors=True)
+
+    _imprimir(resultado)
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as f:
+            json.dump(resultado, f, indent=2, ensure_ascii=False)
+        print(f"\nResultados guardados en {args.salida}")
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,96 @@
+"""
+Benchmark de registros tipados vs. diccionarios de texto en read_from_csv
+
+Uso:
+    python -m benchmarks.bench_registros [--datos datos_sinteticos] [--filas 100000]
+                                         [--repeticiones 3] [--salida resultados.json]
+
+Para cada tabla mide el tiempo de carga y la memoria retenida (tracemalloc)
+con csv.DictReader (read_from_csv(..., tipado=False)) y con los registros de
+utils/registros.py, y el tiempo de una agregación típica de los reportes
+(sumar un campo numérico y filtrar por fecha).
+"""
+import argparse
+import gc
+import json
+import os
+import timeit
+import tracemalloc
+from datetime import datetime, timedelta
+
+# Campo numérico que suma cada tabla en los reportes
+CAMPO_SUMA = {"compras": "total", "proceso": "kg_resultantes", "gastos": "monto",
+              "ventas": "total", "adelantos": "saldo_restante"}
+
+def _memoria(funcion):
+    """Bytes retenidos por el resultado de funcion()"""
+    gc.collect()
+    tracemalloc.start()
+    resultado = funcion()
+    actual, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del resultado
+    return actual
+
+def _agregar(filas, campo, desde):
+    """Agregación al estilo de los reportes: filtrar por fecha y sumar un campo"""
+    from utils.registros import fecha_de
+    total = 0.0
+    for fila in filas:
+        fecha = fecha_de(fila.get('fecha'))
+        if fecha is not None and fecha >= desde:
+            total += float(fila.get(campo, 0) or 0)
+    return total
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--datos', default="datos_sinteticos", help="Directorio con las tablas CSV")
+    parser.add_argument('--filas', type=int, default=100_000, help="Compras a generar si no hay datos")
+    parser.add_argument('--repeticiones', type=int, default=3)
+    parser.add_argument('--salida', help="Archivo JSON donde guardar los resultados")
+    args = parser.parse_args()
+    os.environ["DATA_DIR"] = os.path.abspath(args.datos)
+
+    from tools.generar_datos import COLUMNAS, generar_datos
+    from utils.db import read_from_csv
+    if not os.path.exists(os.path.join(args.datos, "compras.csv")):
+        print(f"Generando datos sintéticos en {args.datos} ({args.filas} compras)...")
+        generar_datos(args.datos, args.filas)
+
+    desde = datetime.now() - timedelta(days=30)
+    resultados = {}
+    print(f"{'tabla':<10}{'filas':>9}{'carga dict':>12}{'carga tip.':>12}"
+          f"{'MB dict':>10}{'MB tip.':>10}{'agr. dict':>11}{'agr. tip.':>11}")
+    for tabla in COLUMNAS:
+        ruta = os.path.join(args.datos, f"{tabla}.csv")
+        if not os.path.exists(ruta):
+            continue
+        medicion = {}
+        for modo, tipado in (("dict", False), ("tipado", True)):
+            cargar = lambda: read_from_csv(ruta, tipado=tipado)
+            filas = cargar()
+            medicion[modo] = {
+                "carga_s": min(timeit.repeat(cargar, number=1, repeat=args.repeticiones)),
+                "memoria_bytes": _memoria(cargar),
+                "agregacion_s": min(timeit.repeat(
+                    lambda: _agregar(filas, CAMPO_SUMA[tabla], desde), number=1, repeat=args.repeticiones
+                )),
+                "suma": _agregar(filas, CAMPO_SUMA[tabla], desde),
+            }
+            medicion["filas"] = len(filas)
+            del filas
+        if abs(medicion["dict"]["suma"] - medicion["tipado"]["suma"]) > 1e-6 * max(abs(medicion["dict"]["suma"]), 1):
+            raise SystemExit(f"Resultados distintos en {tabla}: {medicion['dict']['suma']} != {medicion['tipado']['suma']}")
+        resultados[tabla] = medicion
+        d, t = medicion["dict"], medicion["tipado"]
+        print(f"{tabla:<10}{medicion['filas']:>9}{d['carga_s'] * 1000:>10.0f}ms{t['carga_s'] * 1000:>10.0f}ms"
+              f"{d['memoria_bytes'] / 1e6:>10.1f}{t['memoria_bytes'] / 1e6:>10.1f}"
+              f"{d['agregacion_s'] * 1000:>9.0f}ms{t['agregacion_s'] * 1000:>9.0f}ms")
+
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as f:
+            json.dump(resultados, f, indent=2)
+        print(f"\nResultados guardados en {args.salida}")
+
+if __name__ == "__main__":
+    main()
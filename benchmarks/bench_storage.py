@@ -0,0 +1,134 @@
+"""
+Benchmark de almacenamiento y reportes sobre datos sintéticos
+
+Uso:
+    python -m benchmarks.bench_storage [--datos datos_sinteticos] [--filas 100000]
+                                       [--repeticiones 3] [--salida resultados.json]
+                                       [--comparar anterior.json] [--casos read_from_csv,reporte_diario]
+
+Si el directorio de --datos no tiene tablas, se generan con tools/generar_datos.py
+(--filas compras). Mide read_from_csv, get_dataframe, get_record_by_id,
+update_record y cada reporte con el backend configurado (CSV salvo que
+ENVIRONMENT=production) y guarda los tiempos en JSON para comparar corridas.
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import sys
+import timeit
+from datetime import datetime
+
+def _parsear_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--datos', default="datos_sinteticos", help="Directorio con las tablas CSV")
+    parser.add_argument('--filas', type=int, default=100_000, help="Compras a generar si no hay datos")
+    parser.add_argument('--repeticiones', type=int, default=3)
+    parser.add_argument('--salida', help="Archivo JSON donde guardar los resultados")
+    parser.add_argument('--comparar', help="JSON de una corrida anterior para comparar")
+    parser.add_argument('--casos', help="Casos a ejecutar separados por comas (por defecto, todos)")
+    parser.add_argument('--etiqueta', default="", help="Descripción de la corrida (rama, commit...)")
+    return parser.parse_args()
+
+def _casos(tabla_compras):
+    """Casos del benchmark: {nombre: (función, filas procesadas por ejecución)}"""
+    # Importar después de fijar DATA_DIR: config lee las rutas al importarse
+    from config import COMPRAS_FILE
+    from utils.db import read_from_csv, get_dataframe, get_record_by_id, update_record
+    from handlers.reportes import (
+        generar_reporte_general, generar_reporte_diario, generar_reporte_semanal,
+        generar_reporte_mensual
+    )
+
+    # Un registro a mitad de la tabla: ni el mejor ni el peor caso de una búsqueda lineal
+    filas = read_from_csv(COMPRAS_FILE)
+    registro = filas[len(filas) // 2] if filas else {"fecha": "", "estado": ""}
+    del filas
+
+    return {
+        "read_from_csv": (lambda: read_from_csv(COMPRAS_FILE), tabla_compras),
+        "get_dataframe": (lambda: get_dataframe(COMPRAS_FILE), tabla_compras),
+        "get_record_by_id": (lambda: get_record_by_id(COMPRAS_FILE, registro["fecha"]), tabla_compras),
+        # Reescribe el mismo valor: la tabla queda igual entre repeticiones
+        "update_record": (
+            lambda: update_record(COMPRAS_FILE, registro["fecha"], {"estado": registro["estado"]}),
+            tabla_compras
+        ),
+        "reporte_general": (generar_reporte_general, None),
+        "reporte_diario": (generar_reporte_diario, None),
+        "reporte_semanal": (generar_reporte_semanal, None),
+        "reporte_mensual": (generar_reporte_mensual, None),
+    }
+
+def _contar_filas(ruta):
+    with open(ruta, 'rb') as f:
+        return max(sum(1 for _ in f) - 1, 0)
+
+def _comparar(resultados, anterior):
+    print(f"\nComparación con {anterior.get('etiqueta') or anterior.get('fecha')}:")
+    for nombre, datos in resultados.items():
+        previo = anterior.get("resultados", {}).get(nombre)
+        if previo:
+            factor = previo["mejor_s"] / datos["mejor_s"] if datos["mejor_s"] else float('inf')
+            print(f"{nombre:<20} {previo['mejor_s'] * 1000:10.1f} ms -> "
+                  f"{datos['mejor_s'] * 1000:10.1f} ms  x{factor:.2f}")
+
+def main():
+    args = _parsear_args()
+    os.environ["DATA_DIR"] = os.path.abspath(args.datos)
+
+    from tools.generar_datos import COLUMNAS, generar_datos
+    tablas = {tabla: os.path.join(args.datos, f"{tabla}.csv") for tabla in COLUMNAS}
+    if not os.path.exists(tablas["compras"]):
+        print(f"Generando datos sintéticos en {args.datos} ({args.filas} compras)...")
+        generar_datos(args.datos, args.filas)
+
+    tamanos = {
+        tabla: {"filas": _contar_filas(ruta), "bytes": os.path.getsize(ruta)}
+        for tabla, ruta in tablas.items() if os.path.exists(ruta)
+    }
+    casos = _casos(tamanos["compras"]["filas"])
+    if args.casos:
+        seleccion = args.casos.split(',')
+        desconocidos = set(seleccion) - set(casos)
+        if desconocidos:
+            raise SystemExit(f"Casos desconocidos: {', '.join(sorted(desconocidos))}")
+        casos = {nombre: casos[nombre] for nombre in seleccion}
+
+    print(f"{tamanos['compras']['filas']} compras, mejor de {args.repeticiones} repeticiones\n")
+    resultados = {}
+    for nombre, (funcion, filas) in casos.items():
+        tiempos = timeit.repeat(funcion, number=1, repeat=args.repeticiones)
+        mejor = min(tiempos)
+        resultados[nombre] = {
+            "mejor_s": mejor,
+            "media_s": sum(tiempos) / len(tiempos),
+            "repeticiones": len(tiempos),
+        }
+        if filas:
+            resultados[nombre]["filas_por_s"] = filas / mejor if mejor else None
+        print(f"{nombre:<20} {mejor * 1000:10.1f} ms")
+
+    salida = {
+        "fecha": datetime.now().isoformat(timespec='seconds'),
+        "etiqueta": args.etiqueta,
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "backend": "excel" if os.getenv('ENVIRONMENT', '').lower() == 'production' else "csv",
+        "tablas": tamanos,
+        # ru_maxrss está en KB en Linux y en bytes en macOS
+        "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 if sys.platform != 'darwin' else 1024 ** 2),
+        "resultados": resultados,
+    }
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as f:
+            json.dump(salida, f, indent=2, ensure_ascii=False)
+        print(f"\nResultados guardados en {args.salida}")
+
+    if args.comparar:
+        with open(args.comparar, 'r', encoding='utf-8') as f:
+            _comparar(resultados, json.load(f))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Benchmark de validación: funciones por llamada vs. API por lotes con esquemas precompilados
+
+Uso:
+    python -m benchmarks.bench_validators [--filas 10000] [--repeticiones 5]
+"""
+import argparse
+import random
+import re
+import timeit
+
+from utils.validators import (
+    validate_phone, validate_email, sanitize_text, validate_positive_number,
+    validate_text_length, validate_date, validate_rows, validate_column
+)
+
+def _validate_phone_original(text):
+    """Copia de la implementación anterior (recompila/busca la regex en cada llamada)"""
+    try:
+        text = re.sub(r'[\s-]', '', text)
+        if re.match(r'^9\d{8}$', text):
+            return True
+        if re.match(r'^0\d{1,2}\d{6,7}$', text):
+            return True
+        return False
+    except:
+        return False
+
+def _validate_email_original(text):
+    try:
+        pattern = r'^[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+$'
+        return re.match(pattern, text) is not None
+    except:
+        return False
+
+def _sanitize_text_original(text):
+    text = re.sub(r'[\'";]', '', text)
+    return text[:500].strip()
+
+def generar_pedidos(cantidad, semilla=42):
+    """Genera filas de pedidos sintéticas con un ~10% de valores inválidos"""
+    rnd = random.Random(semilla)
+    filas = []
+    for _ in range(cantidad):
+        filas.append({
+            'cliente': rnd.choice(["Café Central", "Tostaduría Lima", "Juan Pérez", ""]),
+            'telefono': rnd.choice(["987 654 321", "01-4567890", "12345"]),
+            'cantidad': rnd.choice(["10", "2,5", "-1", "abc", "100"]),
+            'fecha_entrega': rnd.choice(["15/06/2025", "2025-06-15", "01/01/2026"]),
+        })
+    return filas
+
+def _por_llamada(filas):
+    errores = 0
+    for fila in filas:
+        errores += not validate_text_length(fila['cliente'], 1, 100)
+        errores += not validate_phone(fila['telefono'])
+        errores += not validate_positive_number(fila['cantidad'])
+        errores += not validate_date(fila['fecha_entrega'])
+    return errores
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--filas', type=int, default=10000)
+    parser.add_argument('--repeticiones', type=int, default=5)
+    args = parser.parse_args()
+    
+    filas = generar_pedidos(args.filas)
+    telefonos = [fila['telefono'] for fila in filas]
+    emails = [f"usuario{i}@cafe.pe" if i % 7 else "invalido@" for i in range(args.filas)]
+    textos = [f"Finca \"El Mirador\"; lote {i}" for i in range(args.filas)]
+    
+    casos = [
+        ("validate_phone (original)", lambda: [_validate_phone_original(t) for t in telefonos]),
+        ("validate_phone (precompilada)", lambda: [validate_phone(t) for t in telefonos]),
+        ("validate_column('pedido', 'telefono')", lambda: validate_column('pedido', 'telefono', telefonos)),
+        ("validate_email (original)", lambda: [_validate_email_original(t) for t in emails]),
+        ("validate_email (precompilada)", lambda: [validate_email(t) for t in emails]),
+        ("sanitize_text (original)", lambda: [_sanitize_text_original(t) for t in textos]),
+        ("sanitize_text (precompilada)", lambda: [sanitize_text(t) for t in textos]),
+        ("filas por llamada", lambda: _por_llamada(filas)),
+        ("validate_rows('pedido')", lambda: validate_rows('pedido', filas)),
+    ]
+    
+    print(f"{args.filas} filas, mejor de {args.repeticiones} repeticiones\n")
+    for nombre, funcion in casos:
+        mejor = min(timeit.repeat(funcion, number=1, repeat=args.repeticiones))
+        print(f"{nombre:<42} {mejor * 1000:9.2f} ms  {mejor / args.filas * 1e6:7.2f} µs/fila")
+
+if __name__ == "__main__":
+    main()
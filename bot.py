@@ -1,5 +1,9 @@
+import argparse
+import asyncio
+import importlib
 import logging
-from telegram.ext import Application, CommandHandler
+
+from utils.arranque import medir_fase, generar_reporte
 
 # Configuración de logging
 logging.basicConfig(
@@ -8,43 +12,200 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+with medir_fase("import telegram"):
+    from telegram.ext import Application, CommandHandler
+
 # Importar configuración
-from config import TOKEN
+with medir_fase("import config"):
+    from config import (
+        TOKEN, BOT_MODE, UPDATE_QUEUE_SIZE, CONCURRENT_UPDATES, TELEGRAM_API_URL,
+        NEGOCIOS_ACTIVOS,
+    )
 
-# Importar handlers
 from handlers.start import start_command, help_command
-from handlers.compras import register_compras_handlers
-from handlers.proceso import register_proceso_handlers
-from handlers.gastos import register_gastos_handlers
-from handlers.ventas import register_ventas_handlers
-from handlers.reportes import register_reportes_handlers
-from handlers.pedidos import register_pedidos_handlers
-from handlers.adelantos import register_adelantos_handlers
-from handlers.compra_adelanto import register_compra_adelanto_handlers
+from handlers.acceso import register_acceso_handlers
+from utils.helpers import configurar_locale
+from utils.db import checkpoint_storage
+from utils.concurrencia import ProcesadorPorChat
+from utils.envios import LimitadorEnvios, cola_envios
+from utils.acceso import control_acceso
+from utils.archivo import programar_archivo
+from utils.negocios import registro_negocios, programar_revision
+from utils.metricas import iniciar_exportador, detener_exportador, registrar_medidor
+
+# Módulos de handlers y su función de registro. Se importan al iniciar main()
+# y no al importar bot.py, para poder medir y reducir el tiempo de arranque
+HANDLER_MODULES = [
+    ("handlers.negocios", "register_negocios_handlers"),
+    ("handlers.compras", "register_compras_handlers"),
+    ("handlers.proceso", "register_proceso_handlers"),
+    ("handlers.gastos", "register_gastos_handlers"),
+    ("handlers.ventas", "register_ventas_handlers"),
+    ("handlers.reportes", "register_reportes_handlers"),
+    ("handlers.busqueda", "register_busqueda_handlers"),
+    ("handlers.pedidos", "register_pedidos_handlers"),
+    ("handlers.adelantos", "register_adelantos_handlers"),
+    ("handlers.compra_adelanto", "register_compra_adelanto_handlers"),
+    ("handlers.suscripciones", "register_suscripciones_handlers"),
+    ("handlers.metricas", "register_metricas_handlers"),
+    ("handlers.perf", "register_perf_handlers"),
+]
+
+def registrar_handlers(application):
+    """Importa cada módulo de handlers y registra sus handlers en la aplicación"""
+    for nombre_modulo, nombre_funcion in HANDLER_MODULES:
+        with medir_fase(f"import {nombre_modulo}"):
+            try:
+                modulo = importlib.import_module(nombre_modulo)
+            except ModuleNotFoundError as e:
+                # Solo se omite si falta el propio módulo, no una de sus dependencias
+                if e.name != nombre_modulo:
+                    raise
+                logger.warning(f"Módulo de handlers no encontrado, se omite: {nombre_modulo}")
+                continue
+        getattr(modulo, nombre_funcion)(application)
+
+def registrar_medidores(application):
+    """Expone como métricas el estado del procesador de updates, los envíos y el acceso"""
+    procesador = application.update_processor
+    if isinstance(procesador, ProcesadorPorChat):
+        registrar_medidor(
+            "cafebot_updates_en_proceso", "Updates en proceso",
+            lambda: procesador.metricas()["en_proceso"]
+        )
+        registrar_medidor(
+            "cafebot_updates_en_espera", "Updates esperando turno de su chat o de la concurrencia",
+            lambda: procesador.metricas()["en_espera"]
+        )
+        registrar_medidor(
+            "cafebot_updates_procesados", "Updates procesados desde el arranque",
+            lambda: procesador.metricas()["procesados"]
+        )
+    registrar_medidor(
+        "cafebot_update_queue", "Updates en la cola de entrada", application.update_queue.qsize
+    )
+    registrar_medidor(
+        "cafebot_envios_pendientes", "Mensajes en la cola de envíos masivos",
+        lambda: cola_envios.pendientes
+    )
+    registrar_medidor(
+        "cafebot_envios", "Contadores de la cola de envíos masivos",
+        lambda: cola_envios.estadisticas, etiqueta="evento"
+    )
+    limitador = application.bot.rate_limiter
+    if isinstance(limitador, LimitadorEnvios):
+        registrar_medidor(
+            "cafebot_limitador_envios", "Peticiones, esperas y RetryAfter del limitador de envíos",
+            lambda: limitador.estadisticas, etiqueta="evento"
+        )
+    if NEGOCIOS_ACTIVOS:
+        registrar_medidor(
+            "cafebot_negocios_cargados", "Negocios con datos en memoria",
+            lambda: registro_negocios.cargados
+        )
+        registrar_medidor(
+            "cafebot_negocios_descargas", "Negocios descargados y cachés vaciadas por motivo",
+            lambda: registro_negocios.descargas, etiqueta="motivo"
+        )
+    registrar_medidor(
+        "cafebot_accesos_rechazados", "Updates rechazados por el control de acceso",
+        lambda: control_acceso.rechazos, etiqueta="motivo"
+    )
+
+async def post_init(application):
+    """Arranca los servicios que necesitan el event loop en marcha"""
+    cola_envios.iniciar(application.bot)
+    registrar_medidores(application)
+    programar_archivo(application.job_queue)
+    programar_revision(application.job_queue)
+    application.bot_data["exportador_metricas"] = await iniciar_exportador()
+
+async def post_shutdown(application):
+    """Detiene los servicios y guarda los datos pendientes antes de terminar"""
+    await detener_exportador(application.bot_data.pop("exportador_metricas", None))
+    await cola_envios.detener()
+    checkpoint_storage()
+    # Cerrar los libros de los negocios cargados (ya guardados por el checkpoint)
+    registro_negocios.cerrar()
+
+def crear_aplicacion(request=None, limitar_envios=True):
+    """
+    Construye la Application con la configuración de config.py
+
+    Args:
+        request (BaseRequest, optional): Conexión a la API de Telegram a usar en lugar
+            de la de red (p. ej. una simulada para pruebas de carga)
+        limitar_envios (bool, optional): Aplicar los límites de envío de Telegram
+    """
+    builder = (
+        Application.builder()
+        .token(TOKEN)
+        # Cola acotada: en modo webhook se rechazan updates cuando está llena
+        .update_queue(asyncio.Queue(maxsize=UPDATE_QUEUE_SIZE))
+        # Chats distintos en paralelo, cada chat en orden
+        .concurrent_updates(ProcesadorPorChat(CONCURRENT_UPDATES))
+        .post_init(post_init)
+        .post_shutdown(post_shutdown)
+    )
+    if limitar_envios:
+        # Límites de envío globales y por chat, con prioridad para respuestas interactivas
+        builder = builder.rate_limiter(LimitadorEnvios())
+    if request is not None:
+        builder = builder.request(request).get_updates_request(request)
+    if TELEGRAM_API_URL:
+        builder = builder.base_url(f"{TELEGRAM_API_URL.rstrip('/')}/bot")
+        builder = builder.base_file_url(f"{TELEGRAM_API_URL.rstrip('/')}/file/bot")
+    return builder.build()
+
+def parse_args():
+    """Lee los argumentos de línea de comandos"""
+    parser = argparse.ArgumentParser(description="Bot de Telegram para gestión de café")
+    parser.add_argument(
+        "--startup-report", action="store_true",
+        help="Imprime el desglose de tiempos de arranque e importación por módulo y termina"
+    )
+    parser.add_argument(
+        "--modo", choices=["polling", "webhook"], default=BOT_MODE,
+        help="Forma de recibir updates (por defecto BOT_MODE o polling)"
+    )
+    return parser.parse_args()
 
 def main():
     """Iniciar el bot"""
+    args = parse_args()
+
     # Crear la aplicación
-    application = Application.builder().token(TOKEN).build()
-    
+    with medir_fase("crear Application"):
+        application = crear_aplicacion()
+
+    # Control de acceso: se ejecuta antes que cualquier otro handler
+    register_acceso_handlers(application)
+
     # Registrar comandos básicos
     application.add_handler(CommandHandler("start", start_command))
     application.add_handler(CommandHandler("ayuda", help_command))
     application.add_handler(CommandHandler("help", help_command))
-    
+
     # Registrar handlers específicos
-    register_compras_handlers(application)
-    register_proceso_handlers(application)
-    register_gastos_handlers(application)
-    register_ventas_handlers(application)
-    register_reportes_handlers(application)
-    register_pedidos_handlers(application)
-    register_adelantos_handlers(application)
-    register_compra_adelanto_handlers(application)
-    
+    registrar_handlers(application)
+
+    if args.startup_report:
+        modulos = ["config", "telegram", "telegram.ext", "handlers.start"]
+        modulos += [nombre_modulo for nombre_modulo, _ in HANDLER_MODULES]
+        print(generar_reporte(modulos))
+        return
+
+    # Configurar el locale una vez registrados los handlers
+    with medir_fase("configurar locale"):
+        configurar_locale()
+
     # Iniciar el bot
-    logger.info("Bot iniciado")
-    application.run_polling()
+    logger.info(f"Bot iniciado en modo {args.modo}")
+    if args.modo == "webhook":
+        from utils.webhook import run_webhook
+        run_webhook(application)
+    else:
+        application.run_polling()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -13,8 +13,53 @@ AUTHORIZED_USERS = [
     # Ejemplo: 123456789, 987654321
 ]
 
-# Directorios de datos
-DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
+# IDs de administradores separados por comas (pueden usar comandos de administración)
+ADMIN_USERS = [int(uid) for uid in os.getenv("ADMIN_USERS", "").split(",") if uid.strip()]
+
+# Límite por usuario para comandos costosos (reportes, exportaciones, importaciones):
+# ráfaga de ACCESO_RAFAGA comandos y luego uno cada ACCESO_INTERVALO segundos
+ACCESO_RAFAGA = int(os.getenv("ACCESO_RAFAGA", "3"))
+ACCESO_INTERVALO = float(os.getenv("ACCESO_INTERVALO", "20"))
+
+# Modo de recepción de updates: "polling" (por defecto) o "webhook"
+BOT_MODE = os.getenv("BOT_MODE", "polling").lower()
+
+# Configuración del modo webhook
+# WEBHOOK_URL es la URL pública base; si está vacía no se registra el webhook en
+# Telegram (útil para pruebas locales enviando updates a localhost)
+WEBHOOK_URL = os.getenv("WEBHOOK_URL", "")
+WEBHOOK_LISTEN = os.getenv("WEBHOOK_LISTEN", "0.0.0.0")
+WEBHOOK_PORT = int(os.getenv("PORT", os.getenv("WEBHOOK_PORT", "8443")))
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/telegram")
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET", "")
+
+# Máximo de updates en cola antes de rechazar nuevos (backpressure)
+UPDATE_QUEUE_SIZE = int(os.getenv("UPDATE_QUEUE_SIZE", "100"))
+
+# Máximo de updates procesados a la vez (de chats distintos; dentro de un
+# mismo chat siempre se procesan en orden). 1 equivale a procesamiento secuencial
+CONCURRENT_UPDATES = int(os.getenv("CONCURRENT_UPDATES", "8"))
+
+# URL base de la API de Telegram (vacía = API oficial). Permite apuntar el bot a un
+# servidor local de pruebas, p. ej. http://127.0.0.1:8081 (ver tools/fake_bot_api.py)
+TELEGRAM_API_URL = os.getenv("TELEGRAM_API_URL", "")
+
+# Límites de envío de mensajes (ver utils/envios.py)
+ENVIOS_GLOBAL_POR_SEGUNDO = float(os.getenv("ENVIOS_GLOBAL_POR_SEGUNDO", "25"))
+ENVIOS_CHAT_POR_SEGUNDO = float(os.getenv("ENVIOS_CHAT_POR_SEGUNDO", "1"))
+ENVIOS_GRUPO_POR_MINUTO = float(os.getenv("ENVIOS_GRUPO_POR_MINUTO", "20"))
+ENVIOS_MAX_REINTENTOS = int(os.getenv("ENVIOS_MAX_REINTENTOS", "3"))
+
+# Métricas de rendimiento (latencias, E/S de almacenamiento, cachés, event loop).
+# Desactivadas por defecto; activas se exponen en formato Prometheus en
+# http://METRICAS_HOST:METRICAS_PUERTO/metrics y con el comando /metricas
+METRICAS_ACTIVAS = os.getenv("METRICAS_ACTIVAS", "").lower() in ("1", "true", "si", "sí")
+METRICAS_HOST = os.getenv("METRICAS_HOST", "127.0.0.1")
+METRICAS_PUERTO = int(os.getenv("METRICAS_PUERTO", "9108"))
+
+# Directorios de datos (DATA_DIR permite apuntar el bot a otro juego de datos,
+# p. ej. uno generado con tools/generar_datos.py)
+DATA_DIR = os.getenv("DATA_DIR", os.path.join(os.path.dirname(__file__), "data"))
 COMPRAS_FILE = os.path.join(DATA_DIR, "compras.csv")
 PROCESO_FILE = os.path.join(DATA_DIR, "proceso.csv")
 GASTOS_FILE = os.path.join(DATA_DIR, "gastos.csv")
@@ -22,7 +67,63 @@ VENTAS_FILE = os.path.join(DATA_DIR, "ventas.csv")
 PROCESO_COMPRAS_FILE = os.path.join(DATA_DIR, "proceso_compras.csv")
 PEDIDOS_FILE = os.path.join(DATA_DIR, "pedidos.csv")
 PEDIDOS_WHATSAPP_FILE = os.path.join(DATA_DIR, "pedidos_whatsapp.csv")
+# Cambios de estado de los pedidos de ambas fuentes (una fila por cambio)
+PEDIDOS_ESTADOS_FILE = os.path.join(DATA_DIR, "pedidos_estados.csv")
+# Linaje de los lotes (ver utils/linaje.py): kilos que pasan de una compra a un proceso
+# o una venta, y kilos y valor de cada registro enlazado
+LINAJE_FILE = os.path.join(DATA_DIR, "linaje.csv")
+LINAJE_NODOS_FILE = os.path.join(DATA_DIR, "linaje_nodos.csv")
 ADELANTOS_FILE = os.path.join(DATA_DIR, "adelantos.csv")
+SUSCRIPCIONES_FILE = os.path.join(DATA_DIR, "suscripciones.csv")
+# Usuarios autorizados y sus roles (user_id,rol); se recarga al modificarse
+USUARIOS_FILE = os.getenv("USUARIOS_FILE", os.path.join(DATA_DIR, "usuarios.csv"))
+
+# Backend de Excel (solo en producción): libro en memoria que se guarda en disco
+# como máximo EXCEL_FLUSH_INTERVAL segundos después del primer cambio pendiente
+EXCEL_FILE = os.getenv("EXCEL_FILE", os.path.join(DATA_DIR, "cafe_bot.xlsx"))
+EXCEL_FLUSH_INTERVAL = float(os.getenv("EXCEL_FLUSH_INTERVAL", "5"))
+
+# Zona horaria del negocio (para programar reportes)
+ZONA_HORARIA = os.getenv("ZONA_HORARIA", "America/Lima")
+
+# Hora (HH:MM, zona horaria del negocio) en que se calculan y envían los reportes
+# programados, fuera del horario de operación
+REPORTES_HORA = os.getenv("REPORTES_HORA", "21:30")
+# Segundos entre entregas a suscriptores consecutivos
+REPORTES_ESCALONADO = float(os.getenv("REPORTES_ESCALONADO", "2"))
+
+# Archivo del historial antiguo (ver utils/archivo.py): las filas con más de ARCHIVO_DIAS
+# días se mueven a archivos comprimidos en ARCHIVO_DIR cada día a las ARCHIVO_HORA.
+# 0 lo desactiva. Los reportes diario/semanal/mensual siguen leyendo todo su período.
+ARCHIVO_DIAS = int(os.getenv("ARCHIVO_DIAS", "0"))
+ARCHIVO_DIR = os.getenv("ARCHIVO_DIR", os.path.join(DATA_DIR, "archivo"))
+ARCHIVO_TABLAS = [
+    tabla.strip() for tabla in os.getenv("ARCHIVO_TABLAS", "compras,ventas,gastos").split(",")
+    if tabla.strip()
+]
+ARCHIVO_HORA = os.getenv("ARCHIVO_HORA", "03:00")
+
+# Varios negocios en una misma instancia (ver utils/negocios.py): cada chat o grupo tiene
+# sus propias tablas en NEGOCIOS_DIR/<chat_id>. Se mantienen en memoria como máximo
+# NEGOCIOS_MAX_CARGADOS negocios; los inactivos por NEGOCIOS_INACTIVIDAD segundos se
+# descargan y cada uno puede usar hasta NEGOCIO_MEMORIA_MB en libros y cachés
+NEGOCIOS_ACTIVOS = os.getenv("NEGOCIOS_ACTIVOS", "").lower() in ("1", "true", "si", "sí")
+NEGOCIOS_DIR = os.getenv("NEGOCIOS_DIR", os.path.join(DATA_DIR, "negocios"))
+NEGOCIOS_MAX_CARGADOS = int(os.getenv("NEGOCIOS_MAX_CARGADOS", "50"))
+NEGOCIOS_INACTIVIDAD = float(os.getenv("NEGOCIOS_INACTIVIDAD", "900"))
+NEGOCIO_MEMORIA_MB = float(os.getenv("NEGOCIO_MEMORIA_MB", "32"))
+
+# Registro de cambios (ver utils/cambios.py): save_to_csv, update_csv y update_record
+# publican cada fila agregada, modificada o eliminada en un log en CAMBIOS_DIR que los
+# consumidores leen desde su último offset
+CAMBIOS_ACTIVOS = os.getenv("CAMBIOS_ACTIVOS", "").lower() in ("1", "true", "si", "sí")
+CAMBIOS_DIR = os.getenv("CAMBIOS_DIR", os.path.join(DATA_DIR, "cambios"))
+
+# Alerta de precio en /compra: se avisa cuando el precio por kg se aparta más de
+# ALERTA_PRECIO_PORCENTAJE del promedio de las últimas ALERTA_PRECIO_COMPRAS compras del
+# proveedor (0 desactiva la alerta)
+ALERTA_PRECIO_PORCENTAJE = float(os.getenv("ALERTA_PRECIO_PORCENTAJE", "15"))
+ALERTA_PRECIO_COMPRAS = int(os.getenv("ALERTA_PRECIO_COMPRAS", "10"))
 
 # Asegurarse de que el directorio de datos exista
 os.makedirs(DATA_DIR, exist_ok=True)
@@ -30,4 +131,10 @@ os.makedirs(DATA_DIR, exist_ok=True)
 # Estados de compras
 ESTADO_PENDIENTE = "Pendiente"
 ESTADO_PROCESADO_PARCIAL = "Procesado parcialmente"
-ESTADO_PROCESADO_COMPLETO = "Procesado completamente"
\ No newline at end of file
+ESTADO_PROCESADO_COMPLETO = "Procesado completamente"
+
+# Estados de pedidos (los dos primeros son pedidos abiertos)
+PEDIDO_PENDIENTE = "Pendiente"
+PEDIDO_CONFIRMADO = "Confirmado"
+PEDIDO_ENTREGADO = "Entregado"
+PEDIDO_CANCELADO = "Cancelado"
\ No newline at end of file
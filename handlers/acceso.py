@@ -0,0 +1,67 @@
+import logging
+from telegram import Update
+from telegram.ext import ContextTypes, TypeHandler, ApplicationHandlerStop, Application
+
+from utils.acceso import control_acceso, COMANDOS_COSTOSOS, COMANDOS_ADMIN, ROL_ADMIN
+
+# Logger
+logger = logging.getLogger(__name__)
+
+# Grupo de handlers del middleware: se ejecuta antes que todos los demás (grupo 0)
+GRUPO_ACCESO = -1
+
+def _comando(update):
+    """Extrae el comando de un mensaje (sin '/' ni @bot), o None si no es un comando"""
+    mensaje = update.effective_message
+    if mensaje is None or not mensaje.text or not mensaje.text.startswith('/'):
+        return None
+    partes = mensaje.text[1:].split(maxsplit=1)
+    if not partes:
+        return None
+    return partes[0].split('@')[0].lower()
+
+async def _responder(update, texto):
+    if update.effective_message is not None:
+        await update.effective_message.reply_text(texto)
+    elif update.callback_query is not None:
+        await update.callback_query.answer(texto, show_alert=True)
+
+async def verificar_acceso(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """
+    Middleware de acceso: rechaza usuarios no autorizados, comandos de
+    administración de no administradores y comandos costosos que exceden el
+    límite del usuario, antes de que cualquier otro handler acceda a los datos
+    """
+    usuario = update.effective_user
+    if usuario is None:
+        return
+
+    rol = control_acceso.rol(usuario.id)
+    if rol is None:
+        control_acceso.rechazar("no_autorizado")
+        logger.warning(f"Acceso denegado al usuario {usuario.id}")
+        await _responder(update, "⛔ No estás autorizado para usar este bot.")
+        raise ApplicationHandlerStop
+
+    comando = _comando(update)
+    if comando is None:
+        return
+
+    if comando in COMANDOS_ADMIN and rol != ROL_ADMIN:
+        control_acceso.rechazar("solo_admin")
+        await _responder(update, "⛔ Este comando es solo para administradores.")
+        raise ApplicationHandlerStop
+
+    if comando in COMANDOS_COSTOSOS:
+        espera = control_acceso.consumir(usuario.id)
+        if espera > 0:
+            control_acceso.rechazar("limite")
+            await _responder(
+                update,
+                f"⏳ Demasiadas solicitudes de /{comando}. Intenta de nuevo en {espera:.0f} segundos."
+            )
+            raise ApplicationHandlerStop
+
+def register_acceso_handlers(application: Application):
+    """Registra el middleware de control de acceso"""
+    application.add_handler(TypeHandler(Update, verificar_acceso), group=GRUPO_ACCESO)
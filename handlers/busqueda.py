@@ -0,0 +1,90 @@
+import logging
+from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.ext import ContextTypes, CommandHandler, CallbackQueryHandler, Application
+
+from utils.busqueda import interpretar_rango, pagina
+from utils.helpers import format_currency
+from utils.metricas import medir
+from utils.perfilado import ejecutar_en_hilo
+
+# Logger
+logger = logging.getLogger(__name__)
+
+RESULTADOS_POR_PAGINA = 10
+
+def _linea(tabla, fila):
+    """Una línea de resultado según la tabla"""
+    fecha = str(fila.get("fecha") or "")[:10]
+    if tabla == "compras":
+        return (f"🛒 {fecha} {fila.get('proveedor', '')} — {fila.get('cantidad', '')} kg "
+                f"{fila.get('calidad', '')}, {format_currency(fila.get('total', 0))}")
+    if tabla == "ventas":
+        return (f"💰 {fecha} {fila.get('cliente', '')} — {fila.get('cantidad', '')} kg, "
+                f"{format_currency(fila.get('total', 0))}")
+    if tabla == "gastos":
+        return (f"💸 {fecha} {fila.get('categoria', '')} — {format_currency(fila.get('monto', 0))} "
+                f"{(fila.get('descripcion') or '')[:60]}")
+    return f"💵 {fecha} {fila.get('proveedor', '')} — adelanto {format_currency(fila.get('monto', 0))}"
+
+async def _responder_pagina(busqueda, numero):
+    """Texto y teclado de una página de resultados"""
+    total, filas = await ejecutar_en_hilo(
+        pagina, busqueda["texto"], busqueda["desde"], busqueda["hasta"], numero, RESULTADOS_POR_PAGINA
+    )
+    if not total:
+        return f"🔍 Sin resultados para \"{busqueda['descripcion']}\".", None
+
+    paginas = (total + RESULTADOS_POR_PAGINA - 1) // RESULTADOS_POR_PAGINA
+    numero = min(numero, paginas - 1)
+    mensaje = f"🔍 {total} resultados para \"{busqueda['descripcion']}\" (página {numero + 1}/{paginas})\n\n"
+    mensaje += "\n".join(_linea(tabla, fila) for tabla, fila in filas)
+
+    botones = []
+    if numero > 0:
+        botones.append(InlineKeyboardButton("« Anterior", callback_data=f"buscar:{numero - 1}"))
+    if numero < paginas - 1:
+        botones.append(InlineKeyboardButton("Siguiente »", callback_data=f"buscar:{numero + 1}"))
+    return mensaje, InlineKeyboardMarkup([botones]) if botones else None
+
+async def buscar_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Busca compras, ventas, gastos y adelantos por proveedor, cliente, calidad, categoría o descripción"""
+    texto, desde, hasta = interpretar_rango(context.args or [])
+    if not texto:
+        await update.message.reply_text(
+            "Uso: /buscar <texto> [rango]\n"
+            "Ejemplos:\n"
+            "/buscar Finca El Mirador abril\n"
+            "/buscar flete 2026-01..2026-03\n"
+            "Rangos: hoy, ayer, semana, mes, un mes (abril, abril 2026), un año, "
+            "AAAA-MM, AAAA-MM-DD o desde..hasta"
+        )
+        return
+
+    busqueda = {
+        "texto": " ".join(texto),
+        "desde": desde,
+        "hasta": hasta,
+        "descripcion": " ".join(context.args),
+    }
+    # La paginación repite la búsqueda (el índice ya está construido)
+    context.chat_data["busqueda"] = busqueda
+    mensaje, teclado = await _responder_pagina(busqueda, 0)
+    await update.message.reply_text(mensaje, reply_markup=teclado)
+
+async def buscar_pagina(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Muestra otra página de la última búsqueda del chat"""
+    query = update.callback_query
+    busqueda = context.chat_data.get("busqueda")
+    if busqueda is None:
+        await query.answer("La búsqueda expiró. Repite /buscar.", show_alert=True)
+        return
+
+    await query.answer()
+    numero = int(query.data.split(":", 1)[1])
+    mensaje, teclado = await _responder_pagina(busqueda, numero)
+    await query.edit_message_text(mensaje, reply_markup=teclado)
+
+def register_busqueda_handlers(application: Application):
+    """Registra los handlers de búsqueda"""
+    application.add_handler(CommandHandler("buscar", medir("buscar")(buscar_command)))
+    application.add_handler(CallbackQueryHandler(medir("buscar_pagina")(buscar_pagina), pattern=r"^buscar:\d+$"))
@@ -1,20 +1,29 @@
 import logging
-from datetime import datetime
 from telegram import Update
 from telegram.ext import (
     ContextTypes, CommandHandler, ConversationHandler, 
     MessageHandler, filters, Application
 )
 
-from config import COMPRAS_FILE, ESTADO_PENDIENTE, ADELANTOS_FILE
+from config import COMPRAS_FILE, ESTADO_PENDIENTE
+from utils import precarga
 from utils.validators import validate_number
-from utils.db import save_to_csv, get_dataframe
+from utils.db import save_to_csv
 from utils.helpers import get_current_timestamp, calculate_total, format_currency
-import pandas as pd
+from utils.metricas import medir
+from utils.perfilado import ejecutar_en_hilo
+from utils.ranking import desviacion_precio
+from utils.linaje import COMPRAS, registrar_nodo
 
 # Estados para la conversación
 PROVEEDOR, CANTIDAD, PRECIO, CALIDAD = range(4)
 
+# Precarga de adelantos, precios y calidad del proveedor (ver utils/precarga.py)
+PRECARGA_PROVEEDOR = "precarga_proveedor"
+
+# Precios recientes que se sugieren al pedir el precio
+PRECIOS_SUGERIDOS = 3
+
 # Logger
 logger = logging.getLogger(__name__)
 
@@ -29,6 +38,8 @@ async def iniciar_compra(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
 async def guardar_proveedor(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Guarda el proveedor y pide la cantidad"""
     context.user_data["proveedor"] = update.message.text
+    # Leer sus datos mientras el usuario responde los siguientes pasos
+    precarga.iniciar(context.user_data, PRECARGA_PROVEEDOR, precarga.datos_proveedor, update.message.text)
     await update.message.reply_text(
         f"Proveedor: {context.user_data['proveedor']}\n"
         "Ahora, ¿cuántos kilogramos de café estás comprando?"
@@ -49,8 +60,16 @@ async def guardar_cantidad(update: Update, context: ContextTypes.DEFAULT_TYPE) -
     cantidad = float(cantidad_text)
     context.user_data["cantidad"] = cantidad
     
+    # Sugerir los últimos precios solo si la precarga ya terminó
+    datos = precarga.disponible(context.user_data, PRECARGA_PROVEEDOR, context.user_data["proveedor"])
+    sugerencia = ""
+    if datos and datos["precios"]:
+        precios = ", ".join(format_currency(p) for p in datos["precios"][:PRECIOS_SUGERIDOS])
+        sugerencia = f"Últimos precios de {context.user_data['proveedor']}: {precios}\n"
+    
     await update.message.reply_text(
         f"Cantidad: {context.user_data['cantidad']} kg\n"
+        f"{sugerencia}"
         "¿Cuál es el precio por kilogramo?"
     )
     return PRECIO
@@ -69,8 +88,14 @@ async def guardar_precio(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     precio = float(precio_text)
     context.user_data["precio"] = precio
     
+    datos = precarga.disponible(context.user_data, PRECARGA_PROVEEDOR, context.user_data["proveedor"])
+    sugerencia = ""
+    if datos and datos["calidad"]:
+        sugerencia = f"Última calidad comprada: {datos['calidad']}\n"
+    
     await update.message.reply_text(
         f"Precio: {format_currency(context.user_data['precio'])} por kg\n"
+        f"{sugerencia}"
         "¿Cuál es la calidad del café? (Grado 1, Grado 2, etc.)"
     )
     return CALIDAD
@@ -84,17 +109,18 @@ async def guardar_calidad(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     precio = context.user_data["precio"]
     total = calculate_total(cantidad, precio)
     
-    # Verificar si el proveedor tiene adelantos disponibles
+    # Verificar si el proveedor tiene adelantos disponibles (ya precargados
+    # desde guardar_proveedor)
+    datos = None
     try:
-        df_adelantos = get_dataframe(ADELANTOS_FILE)
         proveedor = context.user_data["proveedor"]
+        datos = await precarga.obtener(
+            context.user_data, PRECARGA_PROVEEDOR, precarga.datos_proveedor, proveedor
+        )
         
-        adelantos_proveedor = df_adelantos[df_adelantos['proveedor'] == proveedor]
-        adelantos_proveedor = adelantos_proveedor[adelantos_proveedor['saldo_restante'] > 0]
-        
-        if not adelantos_proveedor.empty:
+        if datos["adelantos"] > 0:
             # Hay adelantos disponibles
-            total_adelantos = adelantos_proveedor['saldo_restante'].sum()
+            total_adelantos = datos["adelantos"]
             
             await update.message.reply_text(
                 f"⚠️ AVISO: El proveedor {proveedor} tiene adelantos por S/ {total_adelantos:.2f}\n\n"
@@ -116,8 +142,14 @@ async def guardar_calidad(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         "estado": ESTADO_PENDIENTE    # Estado inicial: Pendiente
     }
     
-    # Guardar en CSV
-    if save_to_csv(COMPRAS_FILE, data):
+    # Comparar el precio con la media móvil del proveedor (precargada, sin esta compra)
+    alerta = desviacion_precio(datos["precios"], precio) if datos else None
+    
+    # Guardar en CSV (en un hilo para no bloquear los demás chats)
+    if await ejecutar_en_hilo(save_to_csv, COMPRAS_FILE, data):
+        # El lote queda en el linaje para enlazarlo con sus procesos y ventas
+        if not await ejecutar_en_hilo(registrar_nodo, COMPRAS, data):
+            logger.error(f"Error registrando la compra {data['fecha']} en el linaje")
         await update.message.reply_text(
             "✅ Compra registrada correctamente:\n\n"
             f"Proveedor: {context.user_data['proveedor']}\n"
@@ -127,6 +159,13 @@ async def guardar_calidad(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
             f"Total a pagar: {format_currency(total)}\n"
             f"Estado: {ESTADO_PENDIENTE}"
         )
+        if alerta:
+            media, desviacion = alerta
+            await update.message.reply_text(
+                f"📈 AVISO: el precio por kg está {abs(desviacion):.1f}% "
+                f"{'por encima' if desviacion > 0 else 'por debajo'} del promedio reciente "
+                f"de {data['proveedor']} ({format_currency(media)})"
+            )
     else:
         await update.message.reply_text(
             "❌ Error al registrar la compra. Por favor, intenta nuevamente."
@@ -148,13 +187,13 @@ def register_compras_handlers(application: Application):
     """Registra los handlers relacionados con compras"""
     # Conversación para registrar compras
     compra_conv_handler = ConversationHandler(
-        entry_points=[CommandHandler('compra', iniciar_compra)],
+        entry_points=[CommandHandler('compra', medir("compra.INICIO")(iniciar_compra))],
         states={
-            PROVEEDOR: [MessageHandler(filters.TEXT & ~filters.COMMAND, guardar_proveedor)],
-            CANTIDAD: [MessageHandler(filters.TEXT & ~filters.COMMAND, guardar_cantidad)],
-            PRECIO: [MessageHandler(filters.TEXT & ~filters.COMMAND, guardar_precio)],
-            CALIDAD: [MessageHandler(filters.TEXT & ~filters.COMMAND, guardar_calidad)],
+            PROVEEDOR: [MessageHandler(filters.TEXT & ~filters.COMMAND, medir("compra.PROVEEDOR")(guardar_proveedor))],
+            CANTIDAD: [MessageHandler(filters.TEXT & ~filters.COMMAND, medir("compra.CANTIDAD")(guardar_cantidad))],
+            PRECIO: [MessageHandler(filters.TEXT & ~filters.COMMAND, medir("compra.PRECIO")(guardar_precio))],
+            CALIDAD: [MessageHandler(filters.TEXT & ~filters.COMMAND, medir("compra.CALIDAD")(guardar_calidad))],
         },
-        fallbacks=[CommandHandler('cancelar', cancelar)],
+        fallbacks=[CommandHandler('cancelar', medir("compra.cancelar")(cancelar))],
     )
     application.add_handler(compra_conv_handler)
\ No newline at end of file
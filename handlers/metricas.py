@@ -0,0 +1,26 @@
+import io
+import logging
+from telegram import Update
+from telegram.ext import ContextTypes, CommandHandler, Application
+
+from config import METRICAS_ACTIVAS
+from utils.metricas import generar_resumen, generar_texto
+
+# Logger
+logger = logging.getLogger(__name__)
+
+async def metricas_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Envía el resumen de métricas y la exposición completa en formato Prometheus"""
+    await update.message.reply_text(generar_resumen())
+    if not METRICAS_ACTIVAS:
+        return
+    texto = generar_texto()
+    await update.message.reply_document(
+        document=io.BytesIO(texto.encode('utf-8')),
+        filename="metricas.txt",
+        caption="Métricas completas (formato Prometheus)"
+    )
+
+def register_metricas_handlers(application: Application):
+    """Registra el comando de métricas (solo administradores, ver utils/acceso.py)"""
+    application.add_handler(CommandHandler("metricas", metricas_command))
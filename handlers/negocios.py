@@ -0,0 +1,28 @@
+import logging
+from telegram import Update
+from telegram.ext import ContextTypes, TypeHandler, Application
+
+from config import NEGOCIOS_ACTIVOS
+from utils.concurrencia import clave_chat
+from utils.negocios import establecer_negocio
+
+# Logger
+logger = logging.getLogger(__name__)
+
+# Grupo del middleware: antes del control de acceso (-1) y de todos los demás
+GRUPO_NEGOCIOS = -2
+
+async def fijar_negocio(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """
+    Middleware de negocios: los datos del update se leen y escriben en el
+    espacio del chat o grupo del que proviene (ver utils/negocios.py)
+    """
+    # Se fija siempre, también a None, para no heredar el negocio de otro update
+    establecer_negocio(clave_chat(update))
+
+def register_negocios_handlers(application: Application):
+    """Registra el middleware de negocios (solo con NEGOCIOS_ACTIVOS)"""
+    if not NEGOCIOS_ACTIVOS:
+        return
+    application.add_handler(TypeHandler(Update, fijar_negocio), group=GRUPO_NEGOCIOS)
+    logger.info("Modo multi-negocio: cada chat tiene sus propios datos")
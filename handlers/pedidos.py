@@ -0,0 +1,204 @@
+import logging
+from datetime import datetime
+from telegram import Update
+from telegram.ext import (
+    ContextTypes, CommandHandler, ConversationHandler,
+    MessageHandler, filters, Application
+)
+
+from config import PEDIDO_PENDIENTE
+from utils.busqueda import normalizar
+from utils.envios import MAX_LONGITUD_MENSAJE
+from utils.pedidos import ESTADOS, ESTADOS_ABIERTOS, cambiar_estado, pedidos_de_cliente, proximos_pedidos, registrar_pedido
+from utils.validators import validate_date, validate_phone, validate_positive_number, validate_text_length
+from utils.metricas import medir
+from utils.perfilado import ejecutar_en_hilo
+
+# Estados para la conversación
+CLIENTE, TELEFONO, CANTIDAD, ENTREGA = range(4)
+
+# Pedidos que muestra /pedidos sin argumentos, y como máximo
+PEDIDOS_POR_DEFECTO = 10
+PEDIDOS_MAXIMO = 50
+
+# Logger
+logger = logging.getLogger(__name__)
+
+def _linea(pedido):
+    """Una línea de la lista de pedidos"""
+    entrega = pedido.entrega.strftime('%d/%m/%Y') if pedido.entrega else "sin fecha"
+    return f"📦 {pedido.id} · {entrega} · {pedido.cliente} · {pedido.cantidad:g} kg · {pedido.estado}"
+
+def _largo(texto):
+    """Largo de un texto como lo cuenta Telegram (unidades UTF-16: los emojis valen 2)"""
+    return len(texto.encode('utf-16-le')) // 2
+
+def _lista(encabezado, pedidos, pie=""):
+    """
+    Mensaje con una línea por pedido, cortado para no pasar el largo máximo
+    de Telegram (se indica cuántos pedidos no se muestran)
+    """
+    lineas = []
+    # Reservar lugar para el aviso de pedidos omitidos y el pie
+    disponible = MAX_LONGITUD_MENSAJE - _largo(encabezado) - _largo(pie) - 40
+    for pedido in pedidos:
+        linea = _linea(pedido)
+        disponible -= _largo(linea) + 1
+        if disponible < 0:
+            break
+        lineas.append(linea)
+    mensaje = encabezado + "\n".join(lineas)
+    if len(lineas) < len(pedidos):
+        mensaje += f"\n… y {len(pedidos) - len(lineas)} pedidos más"
+    return mensaje + pie
+
+async def iniciar_pedido(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+    """Inicia el registro de un pedido"""
+    await update.message.reply_text(
+        "Vamos a registrar un nuevo pedido.\n"
+        "¿Cuál es el nombre del cliente?"
+    )
+    return CLIENTE
+
+async def guardar_cliente(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+    """Guarda el cliente y pide el teléfono"""
+    cliente = update.message.text.strip()
+    if not validate_text_length(cliente, 1, 100):
+        await update.message.reply_text("El nombre del cliente debe tener entre 1 y 100 caracteres.")
+        return CLIENTE
+    context.user_data["cliente"] = cliente
+    await update.message.reply_text(
+        f"Cliente: {cliente}\n"
+        "¿Cuál es su teléfono? (escribe - si no lo tienes)"
+    )
+    return TELEFONO
+
+async def guardar_telefono(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+    """Guarda el teléfono y pide la cantidad"""
+    telefono = update.message.text.strip()
+    if telefono == "-":
+        telefono = ""
+    elif not validate_phone(telefono):
+        await update.message.reply_text(
+            "Por favor, ingresa un teléfono válido (celular de 9 dígitos o fijo con código de área), o -"
+        )
+        return TELEFONO
+    context.user_data["telefono"] = telefono
+    await update.message.reply_text("¿Cuántos kilogramos de café pide?")
+    return CANTIDAD
+
+async def guardar_cantidad(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+    """Guarda la cantidad y pide la fecha de entrega"""
+    cantidad_text = update.message.text
+    if not validate_positive_number(cantidad_text):
+        await update.message.reply_text("Por favor, ingresa una cantidad mayor que cero.")
+        return CANTIDAD
+    context.user_data["cantidad"] = float(cantidad_text.strip().replace(',', '.'))
+    await update.message.reply_text(
+        f"Cantidad: {context.user_data['cantidad']} kg\n"
+        "¿Para qué fecha es la entrega? (DD/MM/AAAA)"
+    )
+    return ENTREGA
+
+async def guardar_entrega(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+    """Guarda la fecha de entrega y registra el pedido"""
+    texto = update.message.text.strip()
+    if not validate_date(texto):
+        await update.message.reply_text("Por favor, ingresa la fecha en formato DD/MM/AAAA.")
+        return ENTREGA
+    entrega = datetime.strptime(texto, '%d/%m/%Y').date()
+
+    datos = {
+        "cliente": context.user_data["cliente"],
+        "telefono": context.user_data["telefono"],
+        "cantidad": context.user_data["cantidad"],
+        "fecha_entrega": entrega.isoformat(),
+        "usuario": update.effective_user.username or update.effective_user.first_name,
+    }
+    pedido_id = await ejecutar_en_hilo(registrar_pedido, datos)
+    if pedido_id:
+        await update.message.reply_text(
+            "✅ Pedido registrado correctamente:\n\n"
+            f"Id: {pedido_id}\n"
+            f"Cliente: {datos['cliente']}\n"
+            f"Cantidad: {datos['cantidad']} kg\n"
+            f"Entrega: {texto}\n"
+            f"Estado: {PEDIDO_PENDIENTE}"
+        )
+    else:
+        await update.message.reply_text(
+            "❌ Error al registrar el pedido. Por favor, intenta nuevamente."
+        )
+
+    context.user_data.clear()
+    return ConversationHandler.END
+
+async def cancelar(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+    """Cancela la conversación"""
+    await update.message.reply_text("Operación cancelada.")
+    context.user_data.clear()
+    return ConversationHandler.END
+
+async def pedidos_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Lista los próximos pedidos abiertos, o los de un cliente"""
+    argumentos = context.args or []
+    if argumentos and not argumentos[0].isdigit():
+        cliente = " ".join(argumentos)
+        pedidos = await ejecutar_en_hilo(pedidos_de_cliente, cliente)
+        if not pedidos:
+            await update.message.reply_text(f"No hay pedidos abiertos de \"{cliente}\".")
+            return
+        encabezado = f"📋 Pedidos abiertos de \"{cliente}\" ({len(pedidos)}):\n\n"
+        await update.message.reply_text(_lista(encabezado, pedidos))
+        return
+
+    cantidad = int(argumentos[0]) if argumentos else PEDIDOS_POR_DEFECTO
+    limitado = cantidad > PEDIDOS_MAXIMO
+    cantidad = min(max(cantidad, 1), PEDIDOS_MAXIMO)
+    pedidos, resumen = await ejecutar_en_hilo(proximos_pedidos, cantidad)
+    if not pedidos:
+        await update.message.reply_text("No hay pedidos pendientes.")
+        return
+    abiertos = sum(resumen.get(estado, 0) for estado in ESTADOS_ABIERTOS)
+    encabezado = f"📋 Próximos pedidos por fecha de entrega ({len(pedidos)} de {abiertos} abiertos):\n"
+    if limitado:
+        encabezado += f"(se muestran como máximo {PEDIDOS_MAXIMO})\n"
+    pie = "\n\n" + " · ".join(f"{estado}: {resumen.get(estado, 0)}" for estado in ESTADOS)
+    await update.message.reply_text(_lista(encabezado + "\n", pedidos, pie))
+
+async def pedido_estado_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Cambia el estado de un pedido abierto"""
+    argumentos = context.args or []
+    estados = {normalizar(estado): estado for estado in ESTADOS}
+    if len(argumentos) != 2 or normalizar(argumentos[1]) not in estados:
+        await update.message.reply_text(
+            "Uso: /pedido_estado <id> <estado>\n"
+            f"Estados: {', '.join(estado.lower() for estado in ESTADOS)}\n"
+            "Ejemplo: /pedido_estado P12 entregado"
+        )
+        return
+
+    pedido_id = argumentos[0].upper()
+    estado = estados[normalizar(argumentos[1])]
+    usuario = update.effective_user.username or update.effective_user.first_name
+    exito, error = await ejecutar_en_hilo(cambiar_estado, pedido_id, estado, usuario)
+    if exito:
+        await update.message.reply_text(f"✅ Pedido {pedido_id}: {estado}")
+    else:
+        await update.message.reply_text(f"❌ {error}")
+
+def register_pedidos_handlers(application: Application):
+    """Registra los handlers relacionados con pedidos"""
+    pedido_conv_handler = ConversationHandler(
+        entry_points=[CommandHandler('pedido', medir("pedido.INICIO")(iniciar_pedido))],
+        states={
+            CLIENTE: [MessageHandler(filters.TEXT & ~filters.COMMAND, medir("pedido.CLIENTE")(guardar_cliente))],
+            TELEFONO: [MessageHandler(filters.TEXT & ~filters.COMMAND, medir("pedido.TELEFONO")(guardar_telefono))],
+            CANTIDAD: [MessageHandler(filters.TEXT & ~filters.COMMAND, medir("pedido.CANTIDAD")(guardar_cantidad))],
+            ENTREGA: [MessageHandler(filters.TEXT & ~filters.COMMAND, medir("pedido.ENTREGA")(guardar_entrega))],
+        },
+        fallbacks=[CommandHandler('cancelar', medir("pedido.cancelar")(cancelar))],
+    )
+    application.add_handler(pedido_conv_handler)
+    application.add_handler(CommandHandler("pedidos", medir("pedidos")(pedidos_command)))
+    application.add_handler(CommandHandler("pedido_estado", medir("pedido_estado")(pedido_estado_command)))
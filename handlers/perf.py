@@ -0,0 +1,57 @@
+import logging
+from telegram import Update
+from telegram.ext import ContextTypes, CommandHandler, Application
+
+from utils.perfilado import perfilador, MODO_CPU, MODO_MEMORIA
+
+# Logger
+logger = logging.getLogger(__name__)
+
+# Updates perfilados por defecto y como máximo en una sesión
+UPDATES_POR_DEFECTO = 10
+MAX_UPDATES = 200
+
+USO_PERF = (
+    "Uso:\n"
+    "/perf cpu [N] - perfila el tiempo de CPU de los próximos N updates\n"
+    "/perf memoria [N] - compara la memoria asignada antes y después de N updates\n"
+    "/perf detener - termina la sesión actual y envía el informe\n"
+    f"N por defecto: {UPDATES_POR_DEFECTO}, máximo: {MAX_UPDATES}"
+)
+
+async def perf_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Inicia o detiene una sesión de perfilado de los próximos updates (solo administradores)"""
+    args = [arg.lower() for arg in context.args or []]
+    modo = args[0] if args else ""
+
+    if modo == "detener":
+        if not await perfilador.finalizar():
+            await update.message.reply_text("No hay ninguna sesión de perfilado activa.")
+        return
+
+    if modo not in (MODO_CPU, MODO_MEMORIA):
+        await update.message.reply_text(USO_PERF)
+        return
+
+    try:
+        cantidad = int(args[1]) if len(args) > 1 else UPDATES_POR_DEFECTO
+    except ValueError:
+        await update.message.reply_text(USO_PERF)
+        return
+    cantidad = max(1, min(cantidad, MAX_UPDATES))
+
+    sesion = perfilador.iniciar(modo, cantidad, update.effective_chat.id, context.bot)
+    if sesion is None:
+        await update.message.reply_text(
+            "⚠️ Ya hay una sesión de perfilado activa. Usa /perf detener para terminarla."
+        )
+        return
+
+    await update.message.reply_text(
+        f"🔬 Perfilando ({modo}) los próximos {cantidad} updates de cualquier chat. "
+        "El informe se enviará como documento a este chat."
+    )
+
+def register_perf_handlers(application: Application):
+    """Registra el comando de perfilado (solo administradores, ver utils/acceso.py)"""
+    application.add_handler(CommandHandler("perf", perf_command))
@@ -1,44 +1,66 @@
 import logging
-from datetime import datetime, timedelta
+from datetime import timedelta
+
 from telegram import Update
 from telegram.ext import (
     ContextTypes, CommandHandler, Application
 )
 
 from config import COMPRAS_FILE, PROCESO_FILE, GASTOS_FILE, VENTAS_FILE
+from utils.archivo import leer_historial, totales_archivados
+from utils.busqueda import interpretar_rango
 from utils.db import read_from_csv
-from utils.helpers import format_currency
+from utils.helpers import format_currency, ahora, inicio_del_dia, inicio_del_mes, fecha_a_epoch
+from utils.metricas import medir
+from utils.perfilado import ejecutar_en_hilo
+from utils.ranking import CRITERIOS, ranking_proveedores
+from utils.registros import epoch_de
 
 # Logger
 logger = logging.getLogger(__name__)
 
-async def reporte_general(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    """Genera un reporte general de todas las operaciones"""
+def _sumar(filas, campo, archivado):
+    """Suma un campo de las filas más su total en el historial archivado"""
+    return archivado["sumas"].get(campo, 0) + sum(float(fila.get(campo, 0)) for fila in filas)
+
+def generar_reporte_general():
+    """
+    Genera un reporte general de todas las operaciones
+    
+    Returns:
+        str: Mensaje del reporte
+    """
     # Leer datos
     compras = read_from_csv(COMPRAS_FILE)
     procesos = read_from_csv(PROCESO_FILE)
     gastos = read_from_csv(GASTOS_FILE)
     ventas = read_from_csv(VENTAS_FILE)
     
-    if not compras and not procesos and not gastos and not ventas:
-        await update.message.reply_text(
-            "No hay datos registrados para generar un reporte."
-        )
-        return
+    # Totales del historial archivado, leídos del encabezado sin descomprimirlo
+    archivo_compras = totales_archivados(COMPRAS_FILE)
+    archivo_procesos = totales_archivados(PROCESO_FILE)
+    archivo_gastos = totales_archivados(GASTOS_FILE)
+    archivo_ventas = totales_archivados(VENTAS_FILE)
+    hay_archivo = any(
+        archivado["filas"] for archivado in (archivo_compras, archivo_procesos, archivo_gastos, archivo_ventas)
+    )
+    
+    if not compras and not procesos and not gastos and not ventas and not hay_archivo:
+        return "No hay datos registrados para generar un reporte."
     
     # Calcular totales
-    total_compras = sum(float(compra.get('total', 0)) for compra in compras)
-    total_kg_comprados = sum(float(compra.get('cantidad', 0)) for compra in compras)
+    total_compras = _sumar(compras, 'total', archivo_compras)
+    total_kg_comprados = _sumar(compras, 'cantidad', archivo_compras)
     
-    total_kg_procesados = sum(float(proceso.get('kg_resultantes', 0)) for proceso in procesos)
+    total_kg_procesados = _sumar(procesos, 'kg_resultantes', archivo_procesos)
     rendimiento_promedio = (total_kg_procesados / total_kg_comprados * 100) if total_kg_comprados > 0 else 0
     
-    total_gastos = sum(float(gasto.get('monto', 0)) for gasto in gastos)
+    total_gastos = _sumar(gastos, 'monto', archivo_gastos)
     
-    total_ventas = sum(float(venta.get('total', 0)) for venta in ventas)
-    total_kg_vendidos = sum(float(venta.get('cantidad', 0)) for venta in ventas)
+    total_ventas = _sumar(ventas, 'total', archivo_ventas)
+    total_kg_vendidos = _sumar(ventas, 'cantidad', archivo_ventas)
     
-    total_utilidad = sum(float(venta.get('utilidad', 0)) for venta in ventas) - total_gastos
+    total_utilidad = _sumar(ventas, 'utilidad', archivo_ventas) - total_gastos
     
     # Preparar mensaje
     mensaje = "📊 *REPORTE GENERAL*\n\n"
@@ -61,32 +83,40 @@ async def reporte_general(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     mensaje += "*Balance:*\n"
     mensaje += f"Utilidad: {format_currency(total_utilidad)}\n"
     
-    # Enviar mensaje
-    await update.message.reply_text(mensaje)
+    return mensaje
 
-def _filtrar_por_periodo(datos, fecha_inicio, fecha_clave='fecha'):
-    """Filtra datos por período"""
-    return [
-        dato for dato in datos 
-        if dato.get(fecha_clave) and datetime.strptime(dato[fecha_clave], '%Y-%m-%d %H:%M:%S') >= fecha_inicio
-    ]
+def _filtrar_por_periodo(datos, fecha_inicio, fecha_fin=None):
+    """
+    Filtra datos por período, comparando los epoch enteros de cada fila
+    (desde fecha_inicio y, si se indica, antes de fecha_fin)
+    """
+    limite = fecha_a_epoch(fecha_inicio)
+    fin = fecha_a_epoch(fecha_fin) if fecha_fin is not None else None
+    resultado = []
+    for dato in datos:
+        epoch = epoch_de(dato)
+        if epoch is not None and epoch >= limite and (fin is None or epoch < fin):
+            resultado.append(dato)
+    return resultado
 
-async def reporte_diario(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    """Genera un reporte del día actual"""
+def generar_reporte_diario():
+    """
+    Genera un reporte del día actual
+    
+    Returns:
+        str: Mensaje del reporte
+    """
     # Fecha de inicio (hoy a las 00:00)
-    hoy = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    hoy = inicio_del_dia()
     
     # Leer y filtrar datos
-    compras = _filtrar_por_periodo(read_from_csv(COMPRAS_FILE), hoy)
-    procesos = _filtrar_por_periodo(read_from_csv(PROCESO_FILE), hoy)
-    gastos = _filtrar_por_periodo(read_from_csv(GASTOS_FILE), hoy)
-    ventas = _filtrar_por_periodo(read_from_csv(VENTAS_FILE), hoy)
+    compras = _filtrar_por_periodo(leer_historial(COMPRAS_FILE, desde=hoy), hoy)
+    procesos = _filtrar_por_periodo(leer_historial(PROCESO_FILE, desde=hoy), hoy)
+    gastos = _filtrar_por_periodo(leer_historial(GASTOS_FILE, desde=hoy), hoy)
+    ventas = _filtrar_por_periodo(leer_historial(VENTAS_FILE, desde=hoy), hoy)
     
     if not compras and not procesos and not gastos and not ventas:
-        await update.message.reply_text(
-            "No hay operaciones registradas para hoy."
-        )
-        return
+        return "No hay operaciones registradas para hoy."
     
     # Calcular totales
     total_compras = sum(float(compra.get('total', 0)) for compra in compras)
@@ -145,25 +175,26 @@ async def reporte_diario(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     mensaje += "*Balance del día:*\n"
     mensaje += f"Utilidad: {format_currency(total_utilidad)}\n"
     
-    # Enviar mensaje
-    await update.message.reply_text(mensaje)
+    return mensaje
 
-async def reporte_semanal(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    """Genera un reporte de la semana actual"""
+def generar_reporte_semanal():
+    """
+    Genera un reporte de la semana actual
+    
+    Returns:
+        str: Mensaje del reporte
+    """
     # Fecha de inicio (hace 7 días a las 00:00)
-    inicio_semana = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=7)
+    inicio_semana = inicio_del_dia(7)
     
     # Leer y filtrar datos
-    compras = _filtrar_por_periodo(read_from_csv(COMPRAS_FILE), inicio_semana)
-    procesos = _filtrar_por_periodo(read_from_csv(PROCESO_FILE), inicio_semana)
-    gastos = _filtrar_por_periodo(read_from_csv(GASTOS_FILE), inicio_semana)
-    ventas = _filtrar_por_periodo(read_from_csv(VENTAS_FILE), inicio_semana)
+    compras = _filtrar_por_periodo(leer_historial(COMPRAS_FILE, desde=inicio_semana), inicio_semana)
+    procesos = _filtrar_por_periodo(leer_historial(PROCESO_FILE, desde=inicio_semana), inicio_semana)
+    gastos = _filtrar_por_periodo(leer_historial(GASTOS_FILE, desde=inicio_semana), inicio_semana)
+    ventas = _filtrar_por_periodo(leer_historial(VENTAS_FILE, desde=inicio_semana), inicio_semana)
     
     if not compras and not procesos and not gastos and not ventas:
-        await update.message.reply_text(
-            "No hay operaciones registradas en los últimos 7 días."
-        )
-        return
+        return "No hay operaciones registradas en los últimos 7 días."
     
     # Calcular totales (similar al reporte diario pero para la semana)
     total_compras = sum(float(compra.get('total', 0)) for compra in compras)
@@ -187,7 +218,7 @@ async def reporte_semanal(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     total_utilidad = sum(float(venta.get('utilidad', 0)) for venta in ventas) - total_gastos
     
     # Preparar mensaje
-    mensaje = f"📊 *REPORTE SEMANAL ({inicio_semana.strftime('%d/%m/%Y')} - {datetime.now().strftime('%d/%m/%Y')})*\n\n"
+    mensaje = f"📊 *REPORTE SEMANAL ({inicio_semana.strftime('%d/%m/%Y')} - {ahora().strftime('%d/%m/%Y')})*\n\n"
     
     mensaje += "*Compras:*\n"
     if compras:
@@ -225,25 +256,38 @@ async def reporte_semanal(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     mensaje += "*Balance semanal:*\n"
     mensaje += f"Utilidad: {format_currency(total_utilidad)}\n"
     
-    # Enviar mensaje
-    await update.message.reply_text(mensaje)
+    return mensaje
 
-async def reporte_mensual(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    """Genera un reporte del mes actual"""
-    # Fecha de inicio (hace 30 días a las 00:00)
-    inicio_mes = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=30)
+def generar_reporte_mensual(mes_anterior=False):
+    """
+    Genera un reporte del mes actual
+    
+    Args:
+        mes_anterior (bool, optional): Reportar el mes calendario anterior
+            completo en lugar de los últimos 30 días (para el envío programado
+            del día 1)
+    
+    Returns:
+        str: Mensaje del reporte
+    """
+    if mes_anterior:
+        # Del primer día del mes anterior a las 00:00 hasta el inicio de este mes
+        inicio_mes, fin_mes = inicio_del_mes(1), inicio_del_mes()
+        ultimo_dia = fin_mes - timedelta(days=1)
+        sin_datos = f"No hay operaciones registradas en {inicio_mes.strftime('%m/%Y')}."
+    else:
+        # Fecha de inicio (hace 30 días a las 00:00)
+        inicio_mes, fin_mes, ultimo_dia = inicio_del_dia(30), None, ahora()
+        sin_datos = "No hay operaciones registradas en los últimos 30 días."
     
     # Leer y filtrar datos
-    compras = _filtrar_por_periodo(read_from_csv(COMPRAS_FILE), inicio_mes)
-    procesos = _filtrar_por_periodo(read_from_csv(PROCESO_FILE), inicio_mes)
-    gastos = _filtrar_por_periodo(read_from_csv(GASTOS_FILE), inicio_mes)
-    ventas = _filtrar_por_periodo(read_from_csv(VENTAS_FILE), inicio_mes)
+    compras = _filtrar_por_periodo(leer_historial(COMPRAS_FILE, desde=inicio_mes), inicio_mes, fin_mes)
+    procesos = _filtrar_por_periodo(leer_historial(PROCESO_FILE, desde=inicio_mes), inicio_mes, fin_mes)
+    gastos = _filtrar_por_periodo(leer_historial(GASTOS_FILE, desde=inicio_mes), inicio_mes, fin_mes)
+    ventas = _filtrar_por_periodo(leer_historial(VENTAS_FILE, desde=inicio_mes), inicio_mes, fin_mes)
     
     if not compras and not procesos and not gastos and not ventas:
-        await update.message.reply_text(
-            "No hay operaciones registradas en los últimos 30 días."
-        )
-        return
+        return sin_datos
     
     # Calcular totales (similar al reporte semanal pero para el mes)
     total_compras = sum(float(compra.get('total', 0)) for compra in compras)
@@ -269,7 +313,7 @@ async def reporte_mensual(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     total_utilidad = sum(float(venta.get('utilidad', 0)) for venta in ventas) - total_gastos
     
     # Preparar mensaje
-    mensaje = f"📊 *REPORTE MENSUAL ({inicio_mes.strftime('%d/%m/%Y')} - {datetime.now().strftime('%d/%m/%Y')})*\n\n"
+    mensaje = f"📊 *REPORTE MENSUAL ({inicio_mes.strftime('%d/%m/%Y')} - {ultimo_dia.strftime('%d/%m/%Y')})*\n\n"
     
     mensaje += "*Compras:*\n"
     if compras:
@@ -311,12 +355,83 @@ async def reporte_mensual(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     mensaje += "*Balance mensual:*\n"
     mensaje += f"Utilidad: {format_currency(total_utilidad)}\n"
     
-    # Enviar mensaje
+    return mensaje
+
+def generar_ranking_proveedores(desde=None, hasta=None, cantidad=5):
+    """
+    Genera el ranking de proveedores por kilos, gasto y precio promedio
+    
+    Args:
+        desde (date, optional): Primer día del período
+        hasta (date, optional): Último día del período
+        cantidad (int, optional): Proveedores por criterio
+    
+    Returns:
+        str: Mensaje del ranking
+    """
+    rankings = ranking_proveedores(desde, hasta, cantidad)
+    if desde or hasta:
+        periodo = f"{desde or '…'} a {hasta or '…'}"
+    else:
+        periodo = "todas las compras"
+    if not rankings["kg"]:
+        return f"🏆 No hay compras en el período ({periodo})"
+    
+    mensaje = f"🏆 *RANKING DE PROVEEDORES* ({periodo})\n\n"
+    for criterio, (titulo, _valor) in CRITERIOS.items():
+        mensaje += f"*{titulo}:*\n"
+        for posicion, (proveedor, acumulado) in enumerate(rankings[criterio], 1):
+            if criterio == "kg":
+                detalle = f"{acumulado.kg:.2f} kg"
+            elif criterio == "gasto":
+                detalle = format_currency(acumulado.gasto)
+            else:
+                detalle = f"{format_currency(acumulado.precio_promedio)} ({acumulado.kg:.2f} kg)"
+            mensaje += f"{posicion}. {proveedor}: {detalle}\n"
+        mensaje += "\n"
+    return mensaje
+
+async def reporte_general(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Genera un reporte general de todas las operaciones"""
+    # Leer los archivos en un hilo para no bloquear a los demás chats
+    mensaje = await ejecutar_en_hilo(generar_reporte_general)
+    await update.message.reply_text(mensaje)
+
+async def reporte_diario(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Genera un reporte del día actual"""
+    # Leer los archivos en un hilo para no bloquear a los demás chats
+    mensaje = await ejecutar_en_hilo(generar_reporte_diario)
+    await update.message.reply_text(mensaje)
+
+async def reporte_semanal(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Genera un reporte de la semana actual"""
+    # Leer los archivos en un hilo para no bloquear a los demás chats
+    mensaje = await ejecutar_en_hilo(generar_reporte_semanal)
+    await update.message.reply_text(mensaje)
+
+async def reporte_mensual(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Genera un reporte del mes actual"""
+    # Leer los archivos en un hilo para no bloquear a los demás chats
+    mensaje = await ejecutar_en_hilo(generar_reporte_mensual)
+    await update.message.reply_text(mensaje)
+
+async def ranking_proveedores_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Muestra los mejores proveedores por kilos, gasto y precio promedio de un período"""
+    texto, desde, hasta = interpretar_rango(context.args or [])
+    if texto:
+        await update.message.reply_text(
+            "Uso: /ranking_proveedores [rango]\n"
+            "Ejemplos: /ranking_proveedores, /ranking_proveedores mes, "
+            "/ranking_proveedores 2026-01..2026-03"
+        )
+        return
+    mensaje = await ejecutar_en_hilo(generar_ranking_proveedores, desde, hasta)
     await update.message.reply_text(mensaje)
 
 def register_reportes_handlers(application: Application):
     """Registra los handlers relacionados con reportes"""
-    application.add_handler(CommandHandler("reporte", reporte_general))
-    application.add_handler(CommandHandler("reporte_diario", reporte_diario))
-    application.add_handler(CommandHandler("reporte_semanal", reporte_semanal))
-    application.add_handler(CommandHandler("reporte_mensual", reporte_mensual))
\ No newline at end of file
+    application.add_handler(CommandHandler("reporte", medir("reporte")(reporte_general)))
+    application.add_handler(CommandHandler("reporte_diario", medir("reporte_diario")(reporte_diario)))
+    application.add_handler(CommandHandler("reporte_semanal", medir("reporte_semanal")(reporte_semanal)))
+    application.add_handler(CommandHandler("reporte_mensual", medir("reporte_mensual")(reporte_mensual)))
+    application.add_handler(CommandHandler("ranking_proveedores", medir("ranking_proveedores")(ranking_proveedores_command)))
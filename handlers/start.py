@@ -37,12 +37,20 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
         "/compra_adelanto - Compra usando adelanto previo\n\n"
         "*Pedidos:*\n"
         "/pedido - Registrar pedido\n"
-        "/pedidos - Ver pedidos pendientes\n\n"
+        "/pedidos [N|cliente] - Ver pedidos pendientes por fecha de entrega\n"
+        "/pedido_estado <id> <estado> - Confirmar, entregar o cancelar un pedido\n\n"
         "*Reportes:*\n"
         "/reporte - Reporte general\n"
         "/reporte_diario - Reporte del día\n"
         "/reporte_semanal - Reporte de la semana\n"
-        "/reporte_mensual - Reporte del mes\n\n"
+        "/reporte_mensual - Reporte del mes\n"
+        "/ranking_proveedores [rango] - Mejores proveedores por kilos, gasto y precio\n\n"
+        "*Búsqueda:*\n"
+        "/buscar <texto> [rango] - Buscar por proveedor, cliente, calidad, categoría o descripción\n\n"
+        "*Suscripciones:*\n"
+        "/suscribir diario|semanal|mensual - Recibir el reporte automáticamente\n"
+        "/desuscribir diario|semanal|mensual - Dejar de recibirlo\n"
+        "/suscripciones - Ver suscripciones del chat\n\n"
         "*Ayuda:*\n"
         "/help o /ayuda - Mostrar esta lista de comandos\n"
         "/cancelar - Cancelar operación en curso"
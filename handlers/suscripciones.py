@@ -0,0 +1,209 @@
+import asyncio
+import logging
+from datetime import datetime, time
+from functools import partial
+
+import pytz
+from telegram import Update
+from telegram.error import TelegramError
+from telegram.ext import ContextTypes, CommandHandler, Application
+
+from config import SUSCRIPCIONES_FILE, ZONA_HORARIA, REPORTES_HORA, REPORTES_ESCALONADO
+from handlers.reportes import generar_reporte_diario, generar_reporte_semanal, generar_reporte_mensual
+from utils.db import read_from_csv, save_to_csv, update_csv
+from utils.envios import cola_envios, PRIORIDAD_MASIVA
+from utils.helpers import get_current_timestamp, get_username
+from utils.metricas import medir, registrar_cache
+from utils.negocios import cache_negocio, ids_negocios, usar_negocio
+
+# Logger
+logger = logging.getLogger(__name__)
+
+# Reportes a los que se puede suscribir; el mensual se envía el día 1 y
+# cubre el mes calendario anterior completo
+TIPOS_REPORTE = {
+    "diario": generar_reporte_diario,
+    "semanal": generar_reporte_semanal,
+    "mensual": partial(generar_reporte_mensual, mes_anterior=True),
+}
+
+CAMPOS_SUSCRIPCION = ["chat_id", "tipo", "usuario", "fecha", "activa"]
+
+# Cachés por negocio (ver utils/negocios.cache_negocio):
+# último reporte calculado por tipo {tipo: (clave_periodo, mensaje)} y candados de cálculo
+CACHE_REPORTES = "reportes_calculados"
+CACHE_CANDADOS = "candados_reportes"
+
+def _clave_periodo(tipo, ahora):
+    """Identifica el período de un reporte; dentro de un mismo período se reutiliza el cálculo"""
+    if tipo == "diario":
+        return ahora.strftime('%Y-%m-%d')
+    if tipo == "semanal":
+        anio, semana, _ = ahora.isocalendar()
+        return f"{anio}-S{semana:02d}"
+    return ahora.strftime('%Y-%m')
+
+async def obtener_reporte(tipo):
+    """
+    Devuelve el reporte del período actual, calculándolo una sola vez por
+    período para todos los suscriptores
+
+    Args:
+        tipo (str): 'diario', 'semanal' o 'mensual'
+
+    Returns:
+        str: Mensaje del reporte
+    """
+    clave = _clave_periodo(tipo, datetime.now(pytz.timezone(ZONA_HORARIA)))
+    reportes_calculados = cache_negocio(CACHE_REPORTES)
+    # Los candados no se liberan con las cachés: uno tomado quedaría duplicado
+    candado = cache_negocio(CACHE_CANDADOS, liberable=False).setdefault(tipo, asyncio.Lock())
+    async with candado:
+        calculado = reportes_calculados.get(tipo)
+        acierto = calculado is not None and calculado[0] == clave
+        registrar_cache(f"reporte_{tipo}", acierto)
+        if not acierto:
+            # Calcular en un hilo para no bloquear el tráfico interactivo
+            mensaje = await asyncio.to_thread(TIPOS_REPORTE[tipo])
+            reportes_calculados[tipo] = (clave, mensaje)
+            logger.info(f"Reporte {tipo} calculado para el período {clave}")
+        return reportes_calculados[tipo][1]
+
+def obtener_suscriptores(tipo):
+    """
+    Obtiene los chats con suscripción activa a un tipo de reporte
+
+    Args:
+        tipo (str): Tipo de reporte
+
+    Returns:
+        list: Lista de chat_id (int)
+    """
+    return [
+        int(fila['chat_id']) for fila in read_from_csv(SUSCRIPCIONES_FILE)
+        if fila.get('tipo') == tipo and str(fila.get('activa')) == '1'
+    ]
+
+def _guardar_suscripcion(chat_id, tipo, usuario, activa):
+    """Activa o desactiva una suscripción; devuelve True si se guardó"""
+    filas = read_from_csv(SUSCRIPCIONES_FILE)
+    for fila in filas:
+        if str(fila.get('chat_id')) == str(chat_id) and fila.get('tipo') == tipo:
+            fila['activa'] = '1' if activa else '0'
+            return update_csv(SUSCRIPCIONES_FILE, filas)
+
+    if not activa:
+        return True
+    return save_to_csv(SUSCRIPCIONES_FILE, {
+        "chat_id": chat_id,
+        "tipo": tipo,
+        "usuario": usuario,
+        "fecha": get_current_timestamp(),
+        "activa": '1',
+    }, CAMPOS_SUSCRIPCION)
+
+def _leer_tipo(context):
+    tipo = context.args[0].lower() if context.args else ""
+    return tipo if tipo in TIPOS_REPORTE else None
+
+async def suscribir_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Suscribe el chat a un reporte programado"""
+    tipo = _leer_tipo(context)
+    if tipo is None:
+        await update.message.reply_text(
+            "Uso: /suscribir diario|semanal|mensual"
+        )
+        return
+
+    if _guardar_suscripcion(update.effective_chat.id, tipo, get_username(update), True):
+        await update.message.reply_text(
+            f"✅ Suscrito al reporte {tipo}. Se enviará automáticamente a las {REPORTES_HORA}."
+        )
+    else:
+        await update.message.reply_text(
+            "❌ Error al guardar la suscripción. Por favor, intenta nuevamente."
+        )
+
+async def desuscribir_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Cancela la suscripción del chat a un reporte programado"""
+    tipo = _leer_tipo(context)
+    if tipo is None:
+        await update.message.reply_text(
+            "Uso: /desuscribir diario|semanal|mensual"
+        )
+        return
+
+    if _guardar_suscripcion(update.effective_chat.id, tipo, get_username(update), False):
+        await update.message.reply_text(f"Suscripción al reporte {tipo} cancelada.")
+    else:
+        await update.message.reply_text(
+            "❌ Error al cancelar la suscripción. Por favor, intenta nuevamente."
+        )
+
+async def suscripciones_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Lista las suscripciones activas del chat"""
+    chat_id = update.effective_chat.id
+    tipos = [tipo for tipo in TIPOS_REPORTE if chat_id in obtener_suscriptores(tipo)]
+    if not tipos:
+        await update.message.reply_text(
+            "Este chat no tiene suscripciones. Usa /suscribir diario|semanal|mensual"
+        )
+        return
+    await update.message.reply_text(
+        "📬 Suscripciones activas: " + ", ".join(tipos) + f"\nHora de envío: {REPORTES_HORA}"
+    )
+
+async def enviar_reportes_programados(context: ContextTypes.DEFAULT_TYPE) -> None:
+    """
+    Calcula el reporte una vez por negocio y programa su entrega escalonada a
+    los suscriptores (las entregas de todos los negocios se intercalan en una
+    misma secuencia para respetar los límites de envío)
+    """
+    tipo = context.job.data
+    posicion = 0
+    for negocio_id in ids_negocios():
+        with usar_negocio(negocio_id):
+            suscriptores = await asyncio.to_thread(obtener_suscriptores, tipo)
+            if not suscriptores:
+                continue
+
+            mensaje = await obtener_reporte(tipo)
+        for chat_id in suscriptores:
+            context.job_queue.run_once(
+                _entregar_reporte, when=posicion * REPORTES_ESCALONADO,
+                data=(chat_id, mensaje), name=f"entrega_{tipo}_{chat_id}"
+            )
+            posicion += 1
+    if posicion:
+        logger.info(f"Reporte {tipo} programado para {posicion} suscriptores")
+
+async def _entregar_reporte(context: ContextTypes.DEFAULT_TYPE) -> None:
+    chat_id, mensaje = context.job.data
+    try:
+        await cola_envios.encolar(chat_id, mensaje, prioridad=PRIORIDAD_MASIVA)
+    except TelegramError as e:
+        logger.warning(f"No se pudo entregar el reporte programado a {chat_id}: {e}")
+
+def programar_reportes(job_queue):
+    """Programa el cálculo y envío de los reportes diario, semanal y mensual"""
+    horas, minutos = (int(parte) for parte in REPORTES_HORA.split(':'))
+    hora = time(horas, minutos, tzinfo=pytz.timezone(ZONA_HORARIA))
+
+    job_queue.run_daily(enviar_reportes_programados, hora, data="diario", name="reporte_diario")
+    # En la JobQueue 0 es domingo
+    job_queue.run_daily(enviar_reportes_programados, hora, days=(0,), data="semanal", name="reporte_semanal")
+    job_queue.run_monthly(enviar_reportes_programados, hora, day=1, data="mensual", name="reporte_mensual")
+
+def register_suscripciones_handlers(application: Application):
+    """Registra los handlers de suscripción a reportes y programa los envíos"""
+    application.add_handler(CommandHandler("suscribir", medir("suscribir")(suscribir_command)))
+    application.add_handler(CommandHandler("desuscribir", medir("desuscribir")(desuscribir_command)))
+    application.add_handler(CommandHandler("suscripciones", medir("suscripciones")(suscripciones_command)))
+
+    if application.job_queue is None:
+        logger.warning(
+            "JobQueue no disponible (instala python-telegram-bot[job-queue]); "
+            "los reportes programados no se enviarán"
+        )
+        return
+    programar_reportes(application.job_queue)
@@ -0,0 +1,29 @@
+import contextlib
+
+import numpy as np
+import pandas as pd
+
+from utils.esquemas import tipar_dataframe
+
+def _sin_infer_string():
+    """Semántica de texto de pandas 2 (la opción no existe antes de pandas 2.1)"""
+    try:
+        return pd.option_context("future.infer_string", False)
+    except (KeyError, pd.errors.OptionError):
+        return contextlib.nullcontext()
+
+def test_texto_conserva_nulos():
+    """Los nulos de una columna de texto no se convierten en 'nan' ni 'None'"""
+    with _sin_infer_string():
+        df = pd.DataFrame({"notas": ["lavado", None, np.nan, 5]}, dtype=object)
+        notas = tipar_dataframe(df, "proceso")["notas"]
+    assert notas.isna().tolist() == [False, True, True, False]
+    assert notas[0] == "lavado"
+    assert notas[3] == "5"
+
+def test_texto_conserva_nulos_infer_string():
+    """Lo mismo con la configuración de texto por defecto de la versión instalada"""
+    df = pd.DataFrame({"descripcion": ["flete", None, np.nan]}, dtype=object)
+    descripcion = tipar_dataframe(df, "gastos")["descripcion"]
+    assert descripcion.isna().tolist() == [False, True, True]
+    assert descripcion[0] == "flete"
@@ -0,0 +1,2 @@
+# Archivo de inicialización para el paquete tools
+# Ejecutar las herramientas desde la raíz del proyecto: python -m tools.<nombre>
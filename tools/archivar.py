@@ -0,0 +1,54 @@
+"""
+Mueve el historial antiguo de las tablas al archivo comprimido (ver utils/archivo.py)
+
+Uso:
+    python -m tools.archivar --dias 365 [--tablas compras,ventas,gastos]
+    python -m tools.archivar --resumen
+
+Es lo mismo que hace el bot cada día a las ARCHIVO_HORA cuando ARCHIVO_DIAS
+está configurado. Con --resumen solo muestra los encabezados de los archivos
+existentes (sin descomprimirlos).
+"""
+import argparse
+import os
+
+from config import ARCHIVO_DIAS, ARCHIVO_DIR, ARCHIVO_TABLAS
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Archivo del historial antiguo")
+    parser.add_argument("--dias", type=int, default=ARCHIVO_DIAS,
+                        help="Archivar filas con más de estos días (por defecto ARCHIVO_DIAS)")
+    parser.add_argument("--tablas", default=",".join(ARCHIVO_TABLAS),
+                        help="Tablas separadas por comas")
+    parser.add_argument("--resumen", action="store_true",
+                        help="Solo mostrar el contenido del archivo")
+    return parser.parse_args()
+
+def mostrar_resumen(tablas):
+    from utils.archivo import segmentos
+
+    for tabla in tablas:
+        for ruta, encabezado in segmentos(tabla):
+            sumas = ", ".join(f"{campo}={valor:,.2f}" for campo, valor in encabezado["sumas"].items())
+            print(f"{os.path.basename(ruta):28} {encabezado['filas']:>9} filas "
+                  f"{os.path.getsize(ruta) / 1024:>9.1f} KB  "
+                  f"{encabezado['fecha_min']} .. {encabezado['fecha_max']}  {sumas}")
+
+def main():
+    args = parse_args()
+    tablas = [tabla.strip() for tabla in args.tablas.split(",") if tabla.strip()]
+
+    if args.resumen:
+        mostrar_resumen(tablas)
+        return
+    if args.dias <= 0:
+        raise SystemExit("Indica --dias (o configura ARCHIVO_DIAS)")
+
+    from utils.archivo import archivar
+
+    resultado = archivar(args.dias, tablas)
+    for tabla, filas in resultado.items():
+        print(f"{tabla}: {filas} filas archivadas en {ARCHIVO_DIR}")
+
+if __name__ == "__main__":
+    main()
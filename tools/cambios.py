@@ -0,0 +1,39 @@
+"""
+Muestra el registro de cambios de las tablas (ver utils/cambios.py)
+
+Uso:
+    python -m tools.cambios [--desde OFFSET] [--tablas compras,ventas] [--negocio CHAT_ID]
+    python -m tools.cambios --consumidor NOMBRE [--tablas ...]
+
+Con --consumidor muestra solo los cambios pendientes de ese consumidor y los
+confirma, como haría un proceso que los exporta: la próxima ejecución
+continúa desde el siguiente.
+"""
+import argparse
+import json
+
+def imprimir(cambio):
+    print(json.dumps(cambio.a_dict(), ensure_ascii=False, default=str))
+
+def main():
+    parser = argparse.ArgumentParser(description="Registro de cambios de las tablas")
+    parser.add_argument("--desde", type=int, default=0, help="Primer offset a mostrar")
+    parser.add_argument("--tablas", help="Tablas separadas por comas (por defecto, todas)")
+    parser.add_argument("--consumidor", help="Mostrar y confirmar los pendientes de este consumidor")
+    parser.add_argument("--negocio", type=int, help="Id del negocio (con NEGOCIOS_ACTIVOS)")
+    args = parser.parse_args()
+    tablas = args.tablas.split(",") if args.tablas else None
+
+    from utils.cambios import Consumidor, log_cambios
+    from utils.negocios import usar_negocio
+
+    with usar_negocio(args.negocio):
+        if args.consumidor:
+            procesados = Consumidor(args.consumidor, tablas).procesar(imprimir)
+            print(f"{procesados} cambios procesados por {args.consumidor}")
+        else:
+            for cambio in log_cambios().leer(args.desde, set(tablas) if tablas else None):
+                imprimir(cambio)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Envía updates de Telegram grabados (JSON) al webhook local del bot
+
+Uso:
+    python -m tools.enviar_update tools/updates/start.json [--url http://127.0.0.1:8443/telegram]
+                                  [--secreto SECRETO] [--repetir 1]
+
+Cada archivo puede contener un update o una lista de updates. Con --repetir
+se reenvía el lote varias veces (cambiando update_id) para probar la cola y
+el backpressure: las respuestas 503 indican que la cola estaba llena.
+"""
+import argparse
+import json
+import urllib.error
+import urllib.request
+from collections import Counter
+
+from config import WEBHOOK_PORT, WEBHOOK_PATH, WEBHOOK_SECRET
+
+def cargar_updates(rutas):
+    """Lee los updates grabados de uno o varios archivos JSON"""
+    updates = []
+    for ruta in rutas:
+        with open(ruta, 'r', encoding='utf-8') as f:
+            datos = json.load(f)
+        updates.extend(datos if isinstance(datos, list) else [datos])
+    return updates
+
+def enviar(url, update, secreto=""):
+    """
+    Envía un update por POST y devuelve el código de estado HTTP
+
+    Args:
+        url (str): URL del webhook
+        update (dict): Update de Telegram
+        secreto (str, optional): Secret token del webhook
+
+    Returns:
+        int: Código de estado HTTP
+    """
+    solicitud = urllib.request.Request(
+        url, data=json.dumps(update).encode('utf-8'), method='POST',
+        headers={"Content-Type": "application/json"}
+    )
+    if secreto:
+        solicitud.add_header("X-Telegram-Bot-Api-Secret-Token", secreto)
+    try:
+        with urllib.request.urlopen(solicitud, timeout=10) as r:
+            return r.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('archivos', nargs='+', help="Archivos JSON con updates grabados")
+    parser.add_argument('--url', default=f"http://127.0.0.1:{WEBHOOK_PORT}{WEBHOOK_PATH}")
+    parser.add_argument('--secreto', default=WEBHOOK_SECRET)
+    parser.add_argument('--repetir', type=int, default=1)
+    args = parser.parse_args()
+
+    updates = cargar_updates(args.archivos)
+    estados = Counter()
+    for ronda in range(args.repetir):
+        for update in updates:
+            update = dict(update, update_id=update["update_id"] + ronda * len(updates))
+            estados[enviar(args.url, update, args.secreto)] += 1
+
+    for estado, cantidad in sorted(estados.items()):
+        print(f"HTTP {estado}: {cantidad}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+Servidor local que imita la API de bots de Telegram, para pruebas sin red
+
+Uso:
+    python -m tools.fake_bot_api [--puerto 8081] [--limite-chat 1] [--limite-global 30]
+                                 [--retry-after 2]
+
+Luego iniciar el bot con TELEGRAM_API_URL=http://127.0.0.1:8081. El servidor
+aplica límites de envío como los de Telegram y responde 429 con retry_after
+cuando se exceden. GET /_enviados devuelve los mensajes recibidos y
+GET /_estadisticas los contadores.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import time
+from collections import Counter, defaultdict, deque
+from email.parser import BytesParser
+from email.policy import HTTP
+from urllib.parse import parse_qs
+
+from utils.http_server import ServidorHTTP, respuesta
+
+class FakeBotAPI:
+    """Implementación mínima de la API de bots con límites de envío simulados"""
+
+    def __init__(self, host="127.0.0.1", puerto=8081, limite_chat=1, limite_global=30, retry_after=2):
+        self.servidor = ServidorHTTP(host, puerto)
+        self.servidor.agregar_ruta_prefijo("POST", "/bot", self._atender)
+        self.servidor.agregar_ruta("GET", "/_enviados", self._listar_enviados)
+        self.servidor.agregar_ruta("GET", "/_estadisticas", self._listar_estadisticas)
+        self.limite_chat = limite_chat
+        self.limite_global = limite_global
+        self.retry_after = retry_after
+        self.enviados = []
+        self.estadisticas = Counter()
+        self._ids_mensaje = itertools.count(1)
+        # Marcas de tiempo del último segundo, globales y por chat
+        self._ventana_global = deque()
+        self._ventana_chat = defaultdict(deque)
+
+    async def iniciar(self):
+        await self.servidor.iniciar()
+
+    async def detener(self):
+        await self.servidor.detener()
+
+    @staticmethod
+    def _parametros(solicitud):
+        tipo = solicitud.encabezados.get('content-type', '')
+        if tipo.startswith('application/json'):
+            return json.loads(solicitud.cuerpo or b"{}")
+        if tipo.startswith('multipart/form-data'):
+            mensaje = BytesParser(policy=HTTP).parsebytes(
+                f"Content-Type: {tipo}\r\n\r\n".encode() + solicitud.cuerpo
+            )
+            parametros = {}
+            for parte in mensaje.iter_parts():
+                nombre = parte.get_param('name', header='content-disposition')
+                if parte.get_filename():
+                    parametros[nombre] = {"archivo": parte.get_filename(), "bytes": len(parte.get_payload(decode=True))}
+                else:
+                    parametros[nombre] = parte.get_content().strip()
+            return parametros
+        return {clave: valores[0] for clave, valores in parse_qs(solicitud.cuerpo.decode()).items()}
+
+    def _excede_limite(self, ventana, limite):
+        ahora = time.monotonic()
+        while ventana and ahora - ventana[0] > 1:
+            ventana.popleft()
+        if len(ventana) >= limite:
+            return True
+        ventana.append(ahora)
+        return False
+
+    def _mensaje(self, chat_id, **campos):
+        return dict(
+            message_id=next(self._ids_mensaje), date=int(time.time()),
+            chat={"id": int(chat_id), "type": "group" if str(chat_id).startswith('-') else "private"},
+            **campos
+        )
+
+    async def _atender(self, solicitud):
+        metodo = solicitud.ruta.rsplit('/', 1)[-1]
+        parametros = self._parametros(solicitud)
+        self.estadisticas[metodo] += 1
+        chat_id = parametros.get('chat_id')
+
+        if chat_id is not None and (
+            self._excede_limite(self._ventana_global, self.limite_global)
+            or self._excede_limite(self._ventana_chat[chat_id], self.limite_chat)
+        ):
+            self.estadisticas["429"] += 1
+            return self._json({
+                "ok": False, "error_code": 429,
+                "description": f"Too Many Requests: retry after {self.retry_after}",
+                "parameters": {"retry_after": self.retry_after},
+            }, estado=429)
+
+        if metodo == "getMe":
+            resultado = {"id": 1, "is_bot": True, "first_name": "Café Bot", "username": "cafe_test_bot"}
+        elif metodo == "getUpdates":
+            # Long polling simulado: no hay updates nuevos
+            await asyncio.sleep(min(float(parametros.get('timeout', 0) or 0), 1))
+            resultado = []
+        elif metodo in ("sendMessage", "editMessageText"):
+            resultado = self._mensaje(chat_id, text=parametros.get('text', ''))
+            self.enviados.append({"chat_id": chat_id, "metodo": metodo, "text": parametros.get('text', '')})
+        elif metodo == "sendDocument":
+            resultado = self._mensaje(chat_id, document={
+                "file_id": "fake", "file_unique_id": "fake",
+                "file_name": str(parametros.get('document', {}).get('archivo', 'documento')),
+            })
+            self.enviados.append({"chat_id": chat_id, "metodo": metodo, "documento": parametros.get('document')})
+        else:
+            resultado = True
+        return self._json({"ok": True, "result": resultado})
+
+    @staticmethod
+    def _json(datos, estado=200):
+        return respuesta(estado, json.dumps(datos), content_type="application/json")
+
+    async def _listar_enviados(self, solicitud):
+        return self._json(self.enviados)
+
+    async def _listar_estadisticas(self, solicitud):
+        return self._json(dict(self.estadisticas))
+
+async def _ejecutar(args):
+    api = FakeBotAPI(puerto=args.puerto, limite_chat=args.limite_chat,
+                     limite_global=args.limite_global, retry_after=args.retry_after)
+    await api.iniciar()
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await api.detener()
+        print(json.dumps(dict(api.estadisticas), indent=2))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--puerto', type=int, default=8081)
+    parser.add_argument('--limite-chat', type=int, default=1, help="Mensajes por segundo por chat")
+    parser.add_argument('--limite-global', type=int, default=30, help="Mensajes por segundo en total")
+    parser.add_argument('--retry-after', type=int, default=2, help="Segundos indicados en las respuestas 429")
+    args = parser.parse_args()
+    try:
+        asyncio.run(_ejecutar(args))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
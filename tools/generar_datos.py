@@ -0,0 +1,220 @@
+"""
+Genera tablas sintéticas de compras, proceso, gastos, ventas y adelantos
+
+Uso:
+    python -m tools.generar_datos --destino datos_sinteticos [--filas 100000] [--dias 365]
+                                  [--semilla 42] [--tablas compras,ventas]
+
+--filas es la cantidad de compras; las demás tablas se generan en proporción
+(ver PROPORCIONES). Las filas siguen las columnas que escriben los handlers
+(p. ej. guardar_calidad) y leen los reportes, en orden cronológico y
+terminando en el momento actual para que los reportes diario, semanal y
+mensual tengan datos. Para usarlas con el bot: DATA_DIR=datos_sinteticos.
+"""
+import argparse
+import csv
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from config import ESTADO_PENDIENTE, ESTADO_PROCESADO_PARCIAL, ESTADO_PROCESADO_COMPLETO
+from utils.esquemas import CAMPO_EPOCH, epochs
+from utils.helpers import ahora
+
+# Columnas de cada tabla, en el orden en que las escriben los handlers
+COLUMNAS = {
+    "compras": ["fecha", "proveedor", "cantidad", "precio_kg", "calidad", "total",
+                "usuario", "kg_disponibles", "estado"],
+    "proceso": ["fecha", "tipo_proceso", "cantidad", "kg_resultantes", "rendimiento",
+                "notas", "usuario"],
+    "gastos": ["fecha", "categoria", "monto", "descripcion", "usuario"],
+    "ventas": ["fecha", "cliente", "tipo_cafe", "cantidad", "precio_kg", "total",
+               "costo", "utilidad", "margen", "usuario"],
+    "adelantos": ["fecha", "proveedor", "monto", "saldo_restante", "notas", "usuario"],
+}
+# save_to_csv agrega a cada fila el epoch de su fecha
+for _columnas in COLUMNAS.values():
+    _columnas.append(CAMPO_EPOCH)
+
+# Filas de cada tabla por cada compra
+PROPORCIONES = {"compras": 1.0, "proceso": 0.5, "gastos": 0.3, "ventas": 0.8, "adelantos": 0.05}
+
+# Filas generadas y escritas por bloque (acota la memoria con tablas grandes)
+TAMANO_BLOQUE = 100_000
+
+PROVEEDORES = [
+    "José", "Rosa Café", "Finca El Mirador", "Cooperativa Pangoa", "Hermanos Quispe",
+    "Asociación Villa Rica", "Don Ñico", "Finca La Esperanza", "Café Chanchamayo",
+    "María Huamán", "Cooperativa Satipo", "Finca Santa Inés", "Juan Mamani",
+    "Agroindustrial Oxapampa", "Finca Los Ángeles", "Teodoro Ccahuana",
+] + [f"Productor {i:03d}" for i in range(1, 65)]
+CALIDADES = ["Grado 1", "Grado 2", "Grado 3", "Especial"]
+# Precio medio por kg según calidad (S/)
+PRECIO_CALIDAD = np.array([5.0, 4.2, 3.5, 7.5])
+USUARIOS = ["Keyla", "Admin", "Sofía", "Luis", "Carmen"]
+TIPOS_PROCESO = ["Tostado", "Pilado", "Molido", "Secado", "Selección"]
+# Rendimiento medio (%) por tipo de proceso
+RENDIMIENTO_PROCESO = np.array([82.0, 80.0, 97.0, 88.0, 93.0])
+CATEGORIAS_GASTO = ["Transporte", "Personal", "Empaque", "Servicios", "Mantenimiento", "Otros"]
+DESCRIPCIONES_GASTO = ["Flete a Lima", "Jornales", "Bolsas kraft", "Luz y agua",
+                       "Reparación tostadora", "Varios", "Combustible", "Etiquetas"]
+CLIENTES = [
+    "Café Central", "Tostaduría Lima", "Juan Pérez", "Cafetería Miraflores",
+    "Restaurante El Señorío", "Bodega Doña Ana", "Hotel Cusco Plaza", "Exportadora Andina",
+] + [f"Cliente {i:03d}" for i in range(1, 43)]
+TIPOS_CAFE = ["Tostado en grano", "Molido", "Verde", "Especial"]
+NOTAS = ["", "", "", "Pendiente de revisar", "Lote húmedo", "Buen aroma"]
+
+def _fechas(rnd, cantidad, inicio, fin):
+    """Marcas de tiempo 'YYYY-MM-DD HH:MM:SS' ordenadas entre dos epoch (segundos)"""
+    segundos = np.sort(rnd.integers(inicio, fin, size=cantidad))
+    texto = np.datetime_as_string(segundos.astype('datetime64[s]'), unit='s')
+    return [valor.replace('T', ' ') for valor in texto.tolist()]
+
+def _elegir(rnd, opciones, cantidad):
+    return np.asarray(opciones, dtype=object)[rnd.integers(0, len(opciones), size=cantidad)].tolist()
+
+def _redondear(valores, decimales=2):
+    return np.round(valores, decimales).tolist()
+
+def _bloque_compras(rnd, cantidad, inicio, fin, reciente):
+    fechas = _fechas(rnd, cantidad, inicio, fin)
+    calidad = rnd.integers(0, len(CALIDADES), size=cantidad)
+    kilos = np.round(np.clip(rnd.lognormal(3.5, 0.8, size=cantidad), 5, 2000), 1)
+    precio = np.round(np.clip(rnd.normal(PRECIO_CALIDAD[calidad], 0.4), 1.5, None), 2)
+    total = np.round(kilos * precio, 2)
+
+    # Las compras del último mes pueden seguir pendientes o procesadas en parte
+    recientes = np.array([f >= reciente for f in fechas]) if fechas else np.zeros(0, bool)
+    estado = np.where(recientes, rnd.integers(0, 3, size=cantidad), 2)
+    disponibles = np.select(
+        [estado == 0, estado == 1],
+        [kilos, np.round(kilos * rnd.uniform(0.1, 0.9, size=cantidad), 1)],
+        0.0
+    )
+    estados = np.array([ESTADO_PENDIENTE, ESTADO_PROCESADO_PARCIAL, ESTADO_PROCESADO_COMPLETO], dtype=object)
+    return [
+        fechas, _elegir(rnd, PROVEEDORES, cantidad), kilos.tolist(), precio.tolist(),
+        np.asarray(CALIDADES, dtype=object)[calidad].tolist(), total.tolist(),
+        _elegir(rnd, USUARIOS, cantidad), disponibles.tolist(), estados[estado].tolist(),
+    ]
+
+def _bloque_proceso(rnd, cantidad, inicio, fin, reciente):
+    tipo = rnd.integers(0, len(TIPOS_PROCESO), size=cantidad)
+    kilos = np.round(np.clip(rnd.lognormal(3.8, 0.7, size=cantidad), 5, 3000), 1)
+    rendimiento = np.clip(rnd.normal(RENDIMIENTO_PROCESO[tipo], 3.0), 50, 100)
+    return [
+        _fechas(rnd, cantidad, inicio, fin), np.asarray(TIPOS_PROCESO, dtype=object)[tipo].tolist(),
+        kilos.tolist(), _redondear(kilos * rendimiento / 100, 1), _redondear(rendimiento),
+        _elegir(rnd, NOTAS, cantidad), _elegir(rnd, USUARIOS, cantidad),
+    ]
+
+def _bloque_gastos(rnd, cantidad, inicio, fin, reciente):
+    return [
+        _fechas(rnd, cantidad, inicio, fin), _elegir(rnd, CATEGORIAS_GASTO, cantidad),
+        _redondear(np.clip(rnd.lognormal(4.0, 1.0, size=cantidad), 1, 20000)),
+        _elegir(rnd, DESCRIPCIONES_GASTO, cantidad), _elegir(rnd, USUARIOS, cantidad),
+    ]
+
+def _bloque_ventas(rnd, cantidad, inicio, fin, reciente):
+    kilos = np.round(np.clip(rnd.lognormal(2.5, 0.9, size=cantidad), 0.5, 1000), 1)
+    precio = np.round(np.clip(rnd.normal(28.0, 6.0, size=cantidad), 8, None), 2)
+    total = np.round(kilos * precio, 2)
+    costo = np.round(total * rnd.uniform(0.45, 0.85, size=cantidad), 2)
+    utilidad = np.round(total - costo, 2)
+    return [
+        _fechas(rnd, cantidad, inicio, fin), _elegir(rnd, CLIENTES, cantidad),
+        _elegir(rnd, TIPOS_CAFE, cantidad), kilos.tolist(), precio.tolist(), total.tolist(),
+        costo.tolist(), utilidad.tolist(), _redondear(utilidad / total * 100),
+        _elegir(rnd, USUARIOS, cantidad),
+    ]
+
+def _bloque_adelantos(rnd, cantidad, inicio, fin, reciente):
+    monto = np.round(np.clip(rnd.lognormal(6.0, 0.8, size=cantidad), 50, 50000), 2)
+    # La mayoría de los adelantos ya se descontaron de compras posteriores
+    usado = np.where(rnd.random(cantidad) < 0.8, 1.0, rnd.uniform(0, 1, size=cantidad))
+    return [
+        _fechas(rnd, cantidad, inicio, fin), _elegir(rnd, PROVEEDORES, cantidad),
+        monto.tolist(), _redondear(monto * (1 - usado)), _elegir(rnd, NOTAS, cantidad),
+        _elegir(rnd, USUARIOS, cantidad),
+    ]
+
+_GENERADORES = {
+    "compras": _bloque_compras,
+    "proceso": _bloque_proceso,
+    "gastos": _bloque_gastos,
+    "ventas": _bloque_ventas,
+    "adelantos": _bloque_adelantos,
+}
+
+def generar_tabla(ruta, tabla, filas, dias=365, semilla=42, fin=None):
+    """
+    Escribe una tabla sintética en CSV
+
+    Args:
+        ruta (str): Archivo CSV de destino (se sobrescribe)
+        tabla (str): Nombre de la tabla (clave de COLUMNAS)
+        filas (int): Cantidad de filas
+        dias (int, optional): Días de historia que cubren las filas
+        semilla (int, optional): Semilla del generador aleatorio
+        fin (datetime, optional): Fecha de la última fila (por defecto, ahora)
+
+    Returns:
+        int: Bytes escritos
+    """
+    rnd = np.random.default_rng([semilla, list(COLUMNAS).index(tabla)])
+    # Las fechas se escriben en la hora del negocio, como get_current_timestamp
+    fin = fin or ahora().replace(tzinfo=None)
+    fin_s = int(np.datetime64(fin.replace(microsecond=0), 's').astype(np.int64))
+    inicio_s = fin_s - dias * 86400
+    # Límite a partir del cual una compra se considera reciente (último mes)
+    reciente = np.datetime_as_string(np.datetime64(fin_s - 30 * 86400, 's'), unit='s').replace('T', ' ')
+    generador = _GENERADORES[tabla]
+
+    with open(ruta, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(COLUMNAS[tabla])
+        for desde in range(0, filas, TAMANO_BLOQUE):
+            cantidad = min(TAMANO_BLOQUE, filas - desde)
+            # Cada bloque cubre su tramo del período para que la tabla quede ordenada
+            tramo_inicio = inicio_s + (fin_s - inicio_s) * desde // max(filas, 1)
+            tramo_fin = inicio_s + (fin_s - inicio_s) * (desde + cantidad) // max(filas, 1)
+            columnas = generador(rnd, cantidad, tramo_inicio, max(tramo_fin, tramo_inicio + 1), reciente)
+            columnas.append(epochs(pd.DataFrame({"fecha": columnas[0]})).tolist())
+            writer.writerows(zip(*columnas))
+        return f.tell()
+
+def generar_datos(destino, filas, dias=365, semilla=42, tablas=None):
+    """
+    Genera todas las tablas (o las indicadas) en un directorio
+
+    Returns:
+        dict: {tabla: {"filas": int, "bytes": int, "segundos": float}}
+    """
+    os.makedirs(destino, exist_ok=True)
+    resultado = {}
+    for tabla in tablas or COLUMNAS:
+        cantidad = max(int(filas * PROPORCIONES[tabla]), 1)
+        inicio = time.perf_counter()
+        escritos = generar_tabla(os.path.join(destino, f"{tabla}.csv"), tabla, cantidad, dias, semilla)
+        resultado[tabla] = {"filas": cantidad, "bytes": escritos, "segundos": time.perf_counter() - inicio}
+    return resultado
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--destino', required=True, help="Directorio donde escribir los CSV")
+    parser.add_argument('--filas', type=int, default=100_000, help="Cantidad de compras (10k a 10M)")
+    parser.add_argument('--dias', type=int, default=365, help="Días de historia")
+    parser.add_argument('--semilla', type=int, default=42)
+    parser.add_argument('--tablas', help="Tablas separadas por comas (por defecto, todas)")
+    args = parser.parse_args()
+
+    tablas = args.tablas.split(',') if args.tablas else None
+    for tabla, datos in generar_datos(args.destino, args.filas, args.dias, args.semilla, tablas).items():
+        print(f"{tabla:<10} {datos['filas']:>10} filas {datos['bytes'] / 1e6:9.1f} MB "
+              f"{datos['segundos']:7.1f} s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Consulta el linaje de los lotes (ver utils/linaje.py)
+
+Uso:
+    python -m tools.linaje --lote "2026-04-03 10:15:00" [--negocio CHAT_ID]
+    python -m tools.linaje --venta "2026-04-20 16:02:11" [--negocio CHAT_ID]
+    python -m tools.linaje --registrar-compras [--negocio CHAT_ID]
+
+--lote muestra a dónde fueron los kilos de una compra y su costo y utilidad
+reales; --venta, de qué compras salió. Si hay varios registros con la misma
+fecha se muestra cada uno. --registrar-compras agrega al linaje las compras
+guardadas antes de que existiera (desde entonces /compra las registra al
+guardarlas).
+"""
+import argparse
+from collections import Counter
+
+def registrar_compras():
+    """
+    Agrega al linaje las compras que aún no tienen nodo
+
+    Returns:
+        int: Compras agregadas
+    """
+    from config import COMPRAS_FILE
+    from utils.db import leer_desde
+    from utils.linaje import COMPRAS, epoch_de, nodos_de, registrar_nodo
+
+    # La n-ésima compra de un segundo corresponde al nodo n de ese epoch
+    vistas = Counter()
+    agregadas = 0
+    for _posicion, _siguiente, fila in leer_desde(COMPRAS_FILE):
+        epoch = epoch_de(fila)
+        if epoch is None:
+            continue
+        vistas[epoch] += 1
+        if len(nodos_de(COMPRAS, epoch)) < vistas[epoch] and registrar_nodo(COMPRAS, fila):
+            agregadas += 1
+    return agregadas
+
+def nodos_por_fecha(tabla, file_path, fecha):
+    """
+    Nodos de los registros de una tabla con una fecha dada
+
+    La fecha se busca en la tabla para usar el fecha_epoch con que se guardó
+    cada registro (las filas antiguas pueden tenerlo en otra zona horaria).
+
+    Returns:
+        list: Ids de los nodos
+    """
+    from utils.db import leer_desde
+    from utils.linaje import epoch_de, nodos_de
+
+    epochs = []
+    for _posicion, _siguiente, fila in leer_desde(file_path):
+        if str(fila.get("fecha")) == fecha:
+            epoch = epoch_de(fila)
+            if epoch is not None and epoch not in epochs:
+                epochs.append(epoch)
+    return [nodo_id for epoch in epochs for nodo_id in nodos_de(tabla, epoch)]
+
+def mostrar_lote(compra):
+    from utils.linaje import aguas_abajo, margen_lote
+
+    print(compra)
+    for destino, distancia in aguas_abajo(compra):
+        print(f"{'  ' * distancia}{destino}")
+    margen = margen_lote(compra)
+    print(f"Lote: {margen['kg']:.2f} kg, costo {margen['costo']:.2f}")
+    print(f"Vendido: {margen['kg_vendidos']:.2f} kg, ingresos {margen['ingresos']:.2f}, "
+          f"costo de lo vendido {margen['costo_vendido']:.2f}")
+    print(f"Utilidad: {margen['utilidad']:.2f} (margen {margen['margen']:.2f}%)")
+
+def main():
+    parser = argparse.ArgumentParser(description="Linaje de los lotes")
+    grupo = parser.add_mutually_exclusive_group(required=True)
+    grupo.add_argument("--lote", help="Fecha de la compra")
+    grupo.add_argument("--venta", help="Fecha de la venta")
+    grupo.add_argument("--registrar-compras", action="store_true",
+                       help="Agregar al linaje las compras anteriores")
+    parser.add_argument("--negocio", type=int, help="Id del negocio (con NEGOCIOS_ACTIVOS)")
+    args = parser.parse_args()
+
+    from config import COMPRAS_FILE, VENTAS_FILE
+    from utils.db import checkpoint_storage
+    from utils.linaje import COMPRAS, VENTAS, compras_de_venta
+    from utils.negocios import usar_negocio
+
+    with usar_negocio(args.negocio):
+        if args.registrar_compras:
+            print(f"{registrar_compras()} compras agregadas al linaje")
+            checkpoint_storage()
+        elif args.lote:
+            compras = nodos_por_fecha(COMPRAS, COMPRAS_FILE, args.lote)
+            if not compras:
+                raise SystemExit(f"No hay compras en el linaje con fecha {args.lote}")
+            for compra in compras:
+                mostrar_lote(compra)
+        else:
+            ventas = nodos_por_fecha(VENTAS, VENTAS_FILE, args.venta)
+            if not ventas:
+                raise SystemExit(f"No hay ventas en el linaje con fecha {args.venta}")
+            for venta in ventas:
+                print(venta)
+                for compra, kg in sorted(compras_de_venta(venta).items()):
+                    print(f"  {compra}: {kg:.2f} kg")
+
+if __name__ == "__main__":
+    main()
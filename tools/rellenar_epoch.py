@@ -0,0 +1,113 @@
+"""
+Rellena la columna fecha_epoch de las filas guardadas antes de que existiera
+
+Uso:
+    python -m tools.rellenar_epoch [--tablas compras,ventas] [--negocio CHAT_ID]
+                                   [--zona-origen America/Lima]
+
+Cada tabla se reescribe con fecha_epoch calculado desde su fecha; las filas
+que ya lo tienen no cambian. Desde entonces save_to_csv lo escribe en cada
+fila nueva. Ejecutar con el bot detenido: la tabla se reescribe completa y una
+fila agregada mientras tanto se perdería.
+
+Las filas sin fecha_epoch se guardaron antes de que las fechas se escribieran
+en ZONA_HORARIA: su fecha es la hora local del servidor que las escribió (UTC
+en Heroku). --zona-origen indica esa zona; por defecto es la zona local de la
+máquina donde se ejecuta la herramienta, que debe ser la del servidor del bot.
+"""
+import argparse
+import os
+from datetime import datetime
+
+from config import DATA_DIR
+from utils.esquemas import CAMPO_EPOCH, TABLAS
+
+def fecha_a_epoch_en(fecha, zona=None):
+    """
+    Segundos UTC de una fecha sin zona horaria escrita en la zona indicada
+
+    Args:
+        fecha (str): Texto 'YYYY-MM-DD[ HH:MM:SS]'
+        zona (tzinfo, optional): Zona de pytz; None para la zona local del sistema
+
+    Returns:
+        int: Segundos, o None si la fecha no es válida
+    """
+    try:
+        fecha = datetime.fromisoformat(str(fecha or ""))
+    except ValueError:
+        return None
+    if fecha.tzinfo is None and zona is not None:
+        # La hora repetida al volver del horario de verano se toma como la estándar
+        fecha = zona.localize(fecha, is_dst=False)
+    # Un datetime sin zona se interpreta en la zona local del sistema
+    return int(fecha.timestamp())
+
+def rellenar_tabla(file_path, zona=None):
+    """
+    Calcula fecha_epoch para las filas de una tabla que no lo tienen
+
+    Args:
+        file_path (str): Ruta del archivo de la tabla
+        zona (tzinfo, optional): Zona en que se escribieron las fechas (ver
+            --zona-origen); None para la zona local del sistema
+
+    Returns:
+        tuple: (filas rellenadas, filas sin fecha válida)
+    """
+    from utils.db import instantanea_tabla, update_csv
+
+    instantanea = instantanea_tabla(file_path)
+    rellenadas = invalidas = 0
+    filas = []
+    for fila in instantanea["filas"]:
+        fila = dict(fila)
+        if fila.get(CAMPO_EPOCH) in (None, ''):
+            epoch = fecha_a_epoch_en(fila.get("fecha"), zona)
+            if epoch is None:
+                invalidas += 1
+                fila[CAMPO_EPOCH] = ''
+            else:
+                rellenadas += 1
+                fila[CAMPO_EPOCH] = epoch
+        filas.append(fila)
+
+    # Aunque no haya filas que rellenar, el encabezado debe incluir la columna
+    if rellenadas or invalidas or CAMPO_EPOCH not in instantanea["columnas"]:
+        if filas and not update_csv(file_path, filas):
+            raise SystemExit(f"No se pudo reescribir {file_path}")
+    return rellenadas, invalidas
+
+def main():
+    parser = argparse.ArgumentParser(description="Rellena fecha_epoch en las tablas existentes")
+    parser.add_argument("--tablas", help="Tablas separadas por comas (por defecto, todas las que tienen fecha)")
+    parser.add_argument("--negocio", type=int, help="Id del negocio (con NEGOCIOS_ACTIVOS)")
+    parser.add_argument("--zona-origen",
+                        help="Zona horaria en que se escribieron las fechas antiguas "
+                             "(p. ej. UTC o America/Lima; por defecto, la zona local del sistema)")
+    args = parser.parse_args()
+
+    zona = None
+    if args.zona_origen:
+        import pytz
+        try:
+            zona = pytz.timezone(args.zona_origen)
+        except pytz.UnknownTimeZoneError:
+            raise SystemExit(f"Zona horaria desconocida: {args.zona_origen}")
+
+    tablas = args.tablas.split(",") if args.tablas else [
+        tabla for tabla, campos in TABLAS.items() if CAMPO_EPOCH in campos
+    ]
+
+    from utils.db import checkpoint_storage
+    from utils.negocios import usar_negocio
+
+    with usar_negocio(args.negocio):
+        for tabla in tablas:
+            rellenadas, invalidas = rellenar_tabla(os.path.join(DATA_DIR, f"{tabla}.csv"), zona)
+            print(f"{tabla}: {rellenadas} filas rellenadas, {invalidas} sin fecha válida")
+        # En producción las tablas están en el libro de Excel en memoria
+        checkpoint_storage()
+
+if __name__ == "__main__":
+    main()
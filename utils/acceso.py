@@ -0,0 +1,149 @@
+import csv
+import logging
+import os
+import time
+from collections import Counter
+
+from config import (
+    AUTHORIZED_USERS, ADMIN_USERS, USUARIOS_FILE, ACCESO_RAFAGA, ACCESO_INTERVALO
+)
+from utils.envios import TokenBucket
+
+# Configuración de logging
+logger = logging.getLogger(__name__)
+
+ROL_ADMIN = "admin"
+ROL_OPERADOR = "operador"
+
+# Comandos que recorren tablas completas o generan archivos: limitados por usuario
+COMANDOS_COSTOSOS = {
+    "reporte", "reporte_diario", "reporte_semanal", "reporte_mensual",
+    "exportar", "importar",
+}
+
+# Comandos reservados a administradores
+COMANDOS_ADMIN = {"metricas", "perf"}
+
+# Segundos entre comprobaciones de cambios en el archivo de usuarios
+_INTERVALO_RECARGA = 5
+
+class ControlAcceso:
+    """
+    Control de acceso por usuario.
+
+    Los usuarios y roles se cargan en un diccionario {user_id: rol} desde
+    config (AUTHORIZED_USERS como operadores, ADMIN_USERS como administradores)
+    y desde un CSV user_id,rol que se recarga automáticamente cuando cambia.
+    Si la lista de usuarios (AUTHORIZED_USERS y el archivo) está vacía, el bot
+    queda abierto a todos como operadores (comportamiento anterior), aunque
+    haya ADMIN_USERS: configurar solo administradores no deja fuera al resto.
+    Los comandos de administración siguen restringidos a los administradores.
+    """
+
+    def __init__(self, archivo=USUARIOS_FILE, rafaga=ACCESO_RAFAGA, intervalo=ACCESO_INTERVALO):
+        self.archivo = archivo
+        self._rafaga = rafaga
+        self._intervalo = intervalo
+        self._roles = {}
+        self._lista = set()     # usuarios que cierran el acceso (sin ADMIN_USERS)
+        self._mtime = None
+        self._proxima_revision = 0.0
+        self._cubetas = {}
+        self.rechazos = Counter()
+        self.recargar()
+
+    def recargar(self):
+        """Vuelve a leer los usuarios y roles desde config y desde el archivo"""
+        roles = {int(uid): ROL_OPERADOR for uid in AUTHORIZED_USERS}
+        roles.update({int(uid): ROL_ADMIN for uid in ADMIN_USERS})
+        lista = {int(uid) for uid in AUTHORIZED_USERS}
+
+        mtime = None
+        if os.path.exists(self.archivo):
+            mtime = os.path.getmtime(self.archivo)
+            try:
+                with open(self.archivo, 'r', newline='', encoding='utf-8') as f:
+                    for fila in csv.DictReader(f):
+                        try:
+                            uid = int(fila['user_id'])
+                        except (KeyError, TypeError, ValueError):
+                            continue
+                        rol = (fila.get('rol') or ROL_OPERADOR).strip().lower()
+                        roles[uid] = ROL_ADMIN if rol == ROL_ADMIN else ROL_OPERADOR
+                        lista.add(uid)
+            except OSError as e:
+                logger.error(f"Error al leer usuarios autorizados: {e}")
+                return
+
+        self._roles = roles
+        self._lista = lista
+        self._mtime = mtime
+        if lista:
+            logger.info(f"Control de acceso: {len(roles)} usuarios autorizados")
+        elif roles:
+            logger.warning(
+                f"Control de acceso: solo hay administradores ({len(roles)}); el bot está abierto a todos "
+                "y solo los comandos de administración están restringidos"
+            )
+        else:
+            logger.warning("Control de acceso: sin usuarios configurados, el bot está abierto a todos")
+
+    def _revisar_cambios(self):
+        ahora = time.monotonic()
+        if ahora < self._proxima_revision:
+            return
+        self._proxima_revision = ahora + _INTERVALO_RECARGA
+        mtime = os.path.getmtime(self.archivo) if os.path.exists(self.archivo) else None
+        if mtime != self._mtime:
+            self.recargar()
+
+    @property
+    def abierto(self):
+        """True si no hay usuarios en AUTHORIZED_USERS ni en el archivo (acceso libre)"""
+        return not self._lista
+
+    def rol(self, user_id):
+        """
+        Obtiene el rol de un usuario
+
+        Args:
+            user_id (int): Id de Telegram del usuario
+
+        Returns:
+            str: ROL_ADMIN, ROL_OPERADOR o None si no está autorizado
+        """
+        self._revisar_cambios()
+        if self.abierto:
+            return self._roles.get(user_id, ROL_OPERADOR)
+        return self._roles.get(user_id)
+
+    def es_admin(self, user_id):
+        """True si el usuario tiene rol de administrador"""
+        return self.rol(user_id) == ROL_ADMIN
+
+    def consumir(self, user_id):
+        """
+        Consume una ficha del límite de comandos costosos del usuario
+
+        Args:
+            user_id (int): Id de Telegram del usuario
+
+        Returns:
+            float: 0 si se permite, o los segundos que debe esperar
+        """
+        cubeta = self._cubetas.get(user_id)
+        if cubeta is None:
+            if len(self._cubetas) > 10000:
+                # Olvidar usuarios inactivos (cubeta llena) para no crecer sin límite
+                self._cubetas = {u: c for u, c in self._cubetas.items() if not c.llena}
+            cubeta = self._cubetas[user_id] = TokenBucket(self._rafaga, 1 / self._intervalo)
+        if cubeta.consumir():
+            return 0.0
+        return cubeta.tiempo_espera()
+
+    def rechazar(self, motivo):
+        """Cuenta un rechazo por motivo ('no_autorizado', 'solo_admin', 'limite')"""
+        self.rechazos[motivo] += 1
+
+# Instancia única compartida por el middleware y los comandos de administración
+control_acceso = ControlAcceso()
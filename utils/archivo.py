@@ -0,0 +1,351 @@
+"""
+Archivo del historial antiguo de las tablas.
+
+Las filas con más de ARCHIVO_DIAS días se mueven de la tabla (CSV o hoja de
+Excel) a un archivo por tabla y mes en ARCHIVO_DIR. Cada archivo empieza con
+una línea de encabezado sin comprimir (JSON con la cantidad de filas, las
+sumas de las columnas numéricas y las fechas mínima y máxima) seguida del CSV
+comprimido con gzip:
+
+    CAFEBOT-ARCHIVO {"tabla": "compras", "filas": 1234, "sumas": {...}, ...}
+    <gzip>
+
+Así los reportes que solo necesitan totales los leen del encabezado sin
+descomprimir nada, y los que necesitan el detalle de un período solo
+descomprimen (de a una fila) los meses que lo cubren.
+"""
+import asyncio
+import csv
+import gzip
+import io
+import json
+import logging
+import os
+from collections import Counter
+from datetime import datetime, time, timedelta
+
+import pytz
+
+from config import (
+    DATA_DIR, ARCHIVO_DIAS, ARCHIVO_DIR, ARCHIVO_TABLAS, ARCHIVO_HORA, ZONA_HORARIA,
+    ESTADO_PROCESADO_COMPLETO,
+)
+from utils.db import instantanea_tabla, retirar_filas, read_from_csv
+from utils.esquemas import esquema, NUMERO, PORCENTAJE, FORMATO_FECHA
+from utils.negocios import ids_negocios, ruta_negocio, usar_negocio
+from utils.helpers import ahora as ahora_negocio, fecha_a_epoch
+from utils.registros import clase_registro, epoch_de, fecha_de, iterar_registros
+
+# Logger
+logger = logging.getLogger(__name__)
+
+MARCA = b"CAFEBOT-ARCHIVO "
+EXTENSION = ".archivo"
+# Compresión intermedia: casi el tamaño de la máxima, bastante más rápida al archivar
+NIVEL_COMPRESION = 6
+
+# Condición adicional para archivar una fila de una tabla: las compras con café
+# disponible siguen en la tabla aunque sean antiguas (control de inventario)
+POLITICAS = {
+    "compras": lambda fila: fila.get("estado") == ESTADO_PROCESADO_COMPLETO,
+}
+
+# Encabezados leídos: {ruta: (mtime_ns, encabezado)}
+_encabezados = {}
+
+def _nombre_tabla(file_path):
+    return os.path.basename(file_path).split('.')[0]
+
+def _directorio(directorio=None):
+    """Directorio del archivo (del negocio en curso, si hay negocios)"""
+    return ruta_negocio(directorio or ARCHIVO_DIR)
+
+def _ruta_segmento(tabla, mes, directorio=None):
+    return os.path.join(_directorio(directorio), f"{tabla}-{mes}{EXTENSION}")
+
+def leer_encabezado(ruta):
+    """
+    Lee el encabezado de un archivo sin descomprimir los datos
+
+    Args:
+        ruta (str): Ruta del archivo
+
+    Returns:
+        dict: Encabezado (tabla, columnas, filas, sumas, fecha_min, fecha_max)
+    """
+    mtime = os.stat(ruta).st_mtime_ns
+    guardado = _encabezados.get(ruta)
+    if guardado is not None and guardado[0] == mtime:
+        return guardado[1]
+
+    with open(ruta, 'rb') as f:
+        linea = f.readline()
+    if not linea.startswith(MARCA):
+        raise ValueError(f"{ruta} no es un archivo de historial")
+    encabezado = json.loads(linea[len(MARCA):])
+    _encabezados[ruta] = (mtime, encabezado)
+    return encabezado
+
+def segmentos(tabla, directorio=None):
+    """
+    Archivos de una tabla ordenados por mes
+
+    Args:
+        tabla (str): Nombre de la tabla
+        directorio (str, optional): Directorio del archivo (por defecto ARCHIVO_DIR)
+
+    Returns:
+        list: Lista de (ruta, encabezado)
+    """
+    directorio = _directorio(directorio)
+    if not os.path.isdir(directorio):
+        return []
+    prefijo = f"{tabla}-"
+    resultado = []
+    for nombre in sorted(os.listdir(directorio)):
+        if nombre.startswith(prefijo) and nombre.endswith(EXTENSION):
+            ruta = os.path.join(directorio, nombre)
+            try:
+                resultado.append((ruta, leer_encabezado(ruta)))
+            except (OSError, ValueError) as e:
+                logger.error(f"Archivo de historial ilegible {ruta}: {e}")
+    return resultado
+
+def iterar_segmento(ruta, clase=None):
+    """
+    Genera las filas de un archivo descomprimiendo a medida que se leen
+
+    Args:
+        ruta (str): Ruta del archivo
+        clase (type, optional): Clase de registro; sin ella se generan
+            diccionarios de texto
+
+    Yields:
+        Registro o dict: Cada fila archivada
+    """
+    with open(ruta, 'rb') as f:
+        # Saltar el encabezado sin comprimir
+        f.readline()
+        with gzip.GzipFile(fileobj=f, mode='rb') as comprimido:
+            datos = io.TextIOWrapper(comprimido, encoding='utf-8', newline='')
+            if clase is None:
+                yield from csv.DictReader(datos)
+            else:
+                yield from iterar_registros(datos, clase)
+
+def leer_historial(file_path, desde=None, directorio=None):
+    """
+    Filas de una tabla incluyendo el historial archivado, en orden cronológico
+
+    Solo se descomprimen los meses archivados que tienen filas desde `desde`;
+    los demás se descartan mirando su encabezado.
+
+    Args:
+        file_path (str): Ruta o nombre del archivo de la tabla
+        desde (datetime, optional): Omitir los meses archivados anteriores
+        directorio (str, optional): Directorio del archivo (por defecto ARCHIVO_DIR)
+
+    Yields:
+        Registro: Filas archivadas y luego las de la tabla
+    """
+    tabla = _nombre_tabla(file_path)
+    clase = clase_registro(tabla)
+    limite = desde.strftime(FORMATO_FECHA) if desde is not None else None
+    for ruta, encabezado in segmentos(tabla, directorio):
+        if limite is not None and (encabezado.get("fecha_max") or "") < limite:
+            continue
+        yield from iterar_segmento(ruta, clase)
+    yield from read_from_csv(file_path)
+
+def totales_archivados(file_path, directorio=None):
+    """
+    Cantidad de filas y sumas de las columnas numéricas del historial
+    archivado de una tabla, leídas solo de los encabezados
+
+    Args:
+        file_path (str): Ruta o nombre del archivo de la tabla
+        directorio (str, optional): Directorio del archivo (por defecto ARCHIVO_DIR)
+
+    Returns:
+        dict: {"filas": int, "sumas": {columna: float}}
+    """
+    filas = 0
+    sumas = {}
+    for _, encabezado in segmentos(_nombre_tabla(file_path), directorio):
+        filas += encabezado["filas"]
+        for columna, valor in encabezado["sumas"].items():
+            sumas[columna] = sumas.get(columna, 0.0) + valor
+    return {"filas": filas, "sumas": sumas}
+
+def _resumir(tabla, columnas, filas):
+    """Encabezado de un archivo con las filas dadas"""
+    numericas = [
+        campo for campo, tipo in (esquema(tabla) or {}).items()
+        if tipo in (NUMERO, PORCENTAJE) and campo in columnas
+    ]
+    sumas = dict.fromkeys(numericas, 0.0)
+    fechas = []
+    for fila in filas:
+        for campo in numericas:
+            try:
+                sumas[campo] += float(fila.get(campo))
+            except (TypeError, ValueError):
+                pass
+        fecha = fecha_de(fila.get("fecha"))
+        if fecha is not None:
+            fechas.append(fecha)
+    return {
+        "version": 1,
+        "tabla": tabla,
+        "columnas": columnas,
+        "filas": len(filas),
+        "sumas": sumas,
+        "fecha_min": min(fechas).strftime(FORMATO_FECHA) if fechas else None,
+        "fecha_max": max(fechas).strftime(FORMATO_FECHA) if fechas else None,
+    }
+
+def _escribir_segmento(ruta, tabla, columnas, filas):
+    """Escribe un archivo completo (encabezado y datos comprimidos)"""
+    encabezado = _resumir(tabla, columnas, filas)
+    with open(ruta, 'wb') as f:
+        f.write(MARCA + json.dumps(encabezado, ensure_ascii=False).encode('utf-8') + b"\n")
+        with gzip.GzipFile(fileobj=f, mode='wb', compresslevel=NIVEL_COMPRESION, mtime=0) as comprimido:
+            with io.TextIOWrapper(comprimido, encoding='utf-8', newline='') as texto:
+                writer = csv.DictWriter(texto, fieldnames=columnas, extrasaction='ignore')
+                writer.writeheader()
+                for fila in filas:
+                    # Los valores de Excel pueden venir como datetime
+                    writer.writerow({
+                        columna: valor.strftime(FORMATO_FECHA) if isinstance(valor, datetime) else valor
+                        for columna, valor in fila.items()
+                    })
+
+def _valor_escrito(valor):
+    """Valor tal como queda escrito en el CSV de un archivo"""
+    if valor is None:
+        return ""
+    if isinstance(valor, datetime):
+        return valor.strftime(FORMATO_FECHA)
+    return str(valor)
+
+def archivar_tabla(file_path, corte, directorio=None):
+    """
+    Mueve al archivo las filas de una tabla anteriores a `corte`
+
+    Las filas se agregan al archivo de su mes (que se reescribe completo con
+    su nuevo encabezado). Los archivos nuevos se publican y las filas se
+    quitan de la tabla en un mismo paso; si la tabla se reescribió mientras
+    tanto no se cambia nada y se reintenta en la próxima ejecución. Las filas
+    que ya están en el archivo de su mes (p. ej. si el proceso terminó antes
+    de guardar la tabla sin ellas) solo se quitan de la tabla.
+
+    Args:
+        file_path (str): Ruta o nombre del archivo de la tabla
+        corte (datetime): Se archivan las filas con fecha anterior
+        directorio (str, optional): Directorio del archivo (por defecto ARCHIVO_DIR)
+
+    Returns:
+        int: Filas archivadas
+    """
+    tabla = _nombre_tabla(file_path)
+    directorio = _directorio(directorio)
+    politica = POLITICAS.get(tabla)
+
+    limite = fecha_a_epoch(corte)
+    instantanea = instantanea_tabla(file_path)
+    por_mes = {}
+    for fila in instantanea["filas"]:
+        epoch = epoch_de(fila)
+        if epoch is None or epoch >= limite:
+            continue
+        fecha = fecha_de(fila.get("fecha"))
+        if fecha is None:
+            continue
+        if politica is not None and not politica(fila):
+            continue
+        por_mes.setdefault(fecha.strftime('%Y-%m'), []).append(fila)
+    if not por_mes:
+        return 0
+
+    os.makedirs(directorio, exist_ok=True)
+    temporales = {}
+    try:
+        for mes, filas in por_mes.items():
+            ruta = _ruta_segmento(tabla, mes, directorio)
+            columnas = list(instantanea["columnas"])
+            anteriores = []
+            if os.path.exists(ruta):
+                for columna in leer_encabezado(ruta)["columnas"]:
+                    if columna not in columnas:
+                        columnas.append(columna)
+                anteriores = list(iterar_segmento(ruta))
+                # Por ocurrencia: dos filas iguales en la tabla son dos registros
+                # y una sola copia en el archivo cubre solo a una de ellas
+                ya_archivadas = Counter(
+                    tuple(_valor_escrito(fila.get(columna)) for columna in columnas) for fila in anteriores
+                )
+                nuevas = []
+                for fila in filas:
+                    clave = tuple(_valor_escrito(fila.get(columna)) for columna in columnas)
+                    if ya_archivadas[clave] > 0:
+                        ya_archivadas[clave] -= 1
+                    else:
+                        nuevas.append(fila)
+                filas = nuevas
+                if not filas:
+                    continue
+            temporal = f"{ruta}.tmp"
+            _escribir_segmento(temporal, tabla, columnas, anteriores + filas)
+            temporales[temporal] = ruta
+
+        def publicar():
+            for temporal, ruta in temporales.items():
+                os.replace(temporal, ruta)
+
+        retiradas = [fila for filas in por_mes.values() for fila in filas]
+        if not retirar_filas(file_path, instantanea, retiradas, publicar):
+            logger.warning(f"La tabla {tabla} cambió mientras se archivaba; se reintentará")
+            return 0
+        return len(retiradas)
+    finally:
+        for temporal in temporales:
+            if os.path.exists(temporal):
+                os.remove(temporal)
+
+def archivar(dias=ARCHIVO_DIAS, tablas=None, ahora=None, directorio=None):
+    """
+    Aplica la política de retención a las tablas configuradas
+
+    Args:
+        dias (int): Antigüedad mínima de las filas a archivar
+        tablas (list, optional): Tablas a archivar (por defecto ARCHIVO_TABLAS)
+        ahora (datetime, optional): Fecha de referencia
+        directorio (str, optional): Directorio del archivo (por defecto ARCHIVO_DIR)
+
+    Returns:
+        dict: {tabla: filas archivadas}
+    """
+    corte = (ahora or ahora_negocio()) - timedelta(days=dias)
+    resultado = {}
+    for tabla in tablas or ARCHIVO_TABLAS:
+        try:
+            resultado[tabla] = archivar_tabla(os.path.join(DATA_DIR, f"{tabla}.csv"), corte, directorio)
+        except Exception as e:
+            logger.error(f"Error al archivar {tabla}: {e}")
+            resultado[tabla] = 0
+    logger.info(f"Historial archivado (anterior a {corte:%Y-%m-%d}): {resultado}")
+    return resultado
+
+async def _archivar_programado(context) -> None:
+    for negocio_id in ids_negocios():
+        with usar_negocio(negocio_id):
+            # En un hilo: leer y comprimir la historia no debe bloquear el tráfico interactivo
+            await asyncio.to_thread(archivar)
+
+def programar_archivo(job_queue):
+    """Programa la ejecución diaria del archivo (si ARCHIVO_DIAS está configurado)"""
+    if ARCHIVO_DIAS <= 0 or job_queue is None:
+        return
+    horas, minutos = (int(parte) for parte in ARCHIVO_HORA.split(':'))
+    hora = time(horas, minutos, tzinfo=pytz.timezone(ZONA_HORARIA))
+    job_queue.run_daily(_archivar_programado, hora, name="archivo_historial")
@@ -0,0 +1,99 @@
+import logging
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+
+# Configuración de logging
+logger = logging.getLogger(__name__)
+
+# Fases de arranque medidas en este proceso: lista de (nombre, segundos)
+_fases = []
+
+@contextmanager
+def medir_fase(nombre):
+    """
+    Mide el tiempo de una fase del arranque y la registra para el reporte
+
+    Args:
+        nombre (str): Nombre de la fase
+    """
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        duracion = time.perf_counter() - inicio
+        _fases.append((nombre, duracion))
+        logger.debug(f"Arranque: {nombre} en {duracion * 1000:.1f} ms")
+
+def obtener_fases():
+    """
+    Devuelve las fases de arranque medidas hasta ahora
+
+    Returns:
+        list: Lista de tuplas (nombre, segundos)
+    """
+    return list(_fases)
+
+def medir_importaciones(modulos):
+    """
+    Mide el tiempo de importación de cada módulo en un intérprete limpio
+    usando `python -X importtime`, para que el resultado no dependa de los
+    módulos que ya estén cargados en este proceso.
+
+    Args:
+        modulos (list): Nombres de los módulos a importar
+
+    Returns:
+        list: Lista de tuplas (modulo, propio_us, acumulado_us) en orden de importación
+    """
+    codigo = "".join(
+        f"try:\n    import {modulo}\nexcept ImportError:\n    pass\n"
+        for modulo in modulos
+    )
+    resultado = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", codigo],
+        capture_output=True, text=True
+    )
+
+    tiempos = []
+    for linea in resultado.stderr.splitlines():
+        # Formato: "import time:   self [us] | cumulative | imported package"
+        if not linea.startswith("import time:") or "imported package" in linea:
+            continue
+        propio, acumulado, modulo = linea[len("import time:"):].split("|")
+        tiempos.append((modulo.rstrip(), int(propio), int(acumulado)))
+    return tiempos
+
+def generar_reporte(modulos, limite=25):
+    """
+    Genera el reporte de arranque: fases medidas y desglose de importación por módulo
+
+    Args:
+        modulos (list): Módulos de la aplicación a medir
+        limite (int, optional): Cantidad de módulos más costosos a listar
+
+    Returns:
+        str: Reporte en texto plano
+    """
+    lineas = ["Reporte de arranque", "", "Fases (este proceso):"]
+    for nombre, duracion in obtener_fases():
+        lineas.append(f"  {nombre:<40} {duracion * 1000:9.1f} ms")
+
+    tiempos = medir_importaciones(modulos)
+
+    lineas += ["", "Módulos de la aplicación (acumulado, intérprete limpio):"]
+    por_nombre = {modulo.strip(): (propio, acumulado) for modulo, propio, acumulado in tiempos}
+    for modulo in modulos:
+        if modulo in por_nombre:
+            lineas.append(f"  {modulo:<40} {por_nombre[modulo][1] / 1000:9.1f} ms")
+        else:
+            lineas.append(f"  {modulo:<40} {'no cargado':>12}")
+
+    lineas += ["", f"Top {limite} módulos por tiempo propio:"]
+    for modulo, propio, acumulado in sorted(tiempos, key=lambda t: t[1], reverse=True)[:limite]:
+        lineas.append(f"  {modulo.strip():<40} {propio / 1000:9.1f} ms (acumulado {acumulado / 1000:.1f} ms)")
+
+    pesados = [m for m in ("pandas", "numpy", "openpyxl") if m in por_nombre]
+    lineas += ["", "Dependencias pesadas cargadas al arrancar: " + (", ".join(pesados) if pesados else "ninguna")]
+    return "\n".join(lineas)
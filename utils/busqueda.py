@@ -0,0 +1,336 @@
+"""
+Índice invertido para /buscar: proveedores, clientes, calidades, categorías y
+descripciones de las tablas del bot.
+
+Cada tabla tiene su índice: por cada palabra (sin tildes y en minúsculas) la
+lista ordenada de filas que la contienen, más la posición de cada fila en la
+tabla (ver utils/db.leer_desde) y su día. Una búsqueda intersecta las listas
+de sus palabras, filtra por rango de fechas y lee del almacenamiento solo las
+filas de la página que se muestra.
+
+El índice se mantiene de forma incremental: antes de cada búsqueda se indexan
+solo las filas agregadas desde la anterior. Si la tabla se reescribió
+(update_csv, update_record, archivo del historial) se reconstruye completo.
+Los índices son una caché del negocio en curso (utils/negocios.cache_negocio).
+
+El historial archivado (utils/archivo.py) no se indexa.
+"""
+import bisect
+import heapq
+import logging
+import re
+import sys
+import threading
+import unicodedata
+from array import array
+from datetime import date, timedelta
+
+from config import COMPRAS_FILE, VENTAS_FILE, GASTOS_FILE, ADELANTOS_FILE
+from utils.db import leer_desde, leer_en_posiciones, marca_tabla
+from utils.helpers import ahora
+from utils.negocios import cache_negocio
+
+# Logger
+logger = logging.getLogger(__name__)
+
+# Campos indexados por tabla
+CAMPOS_BUSQUEDA = {
+    "compras": ("proveedor", "calidad"),
+    "ventas": ("cliente",),
+    "gastos": ("categoria", "descripcion"),
+    "adelantos": ("proveedor",),
+}
+
+ARCHIVOS = {
+    "compras": COMPRAS_FILE,
+    "ventas": VENTAS_FILE,
+    "gastos": GASTOS_FILE,
+    "adelantos": ADELANTOS_FILE,
+}
+
+CACHE_INDICES = "indices_busqueda"
+
+MESES = {
+    "enero": 1, "febrero": 2, "marzo": 3, "abril": 4, "mayo": 5, "junio": 6, "julio": 7,
+    "agosto": 8, "septiembre": 9, "setiembre": 9, "octubre": 10, "noviembre": 11, "diciembre": 12,
+}
+
+_PALABRA = re.compile(r"\w+")
+_FECHA = re.compile(r"^(\d{4})-(\d{2})(?:-(\d{2}))?$")
+
+# Día de las filas sin fecha válida: no entran en ningún rango
+_SIN_FECHA = 0
+
+# Evita construir dos veces el mismo índice en búsquedas simultáneas
+_lock = threading.Lock()
+
+def normalizar(texto):
+    """Texto en minúsculas y sin tildes ('Café Ñuñoa' -> 'cafe nunoa')"""
+    descompuesto = unicodedata.normalize("NFKD", str(texto))
+    return "".join(c for c in descompuesto if not unicodedata.combining(c)).lower()
+
+def palabras(texto):
+    """Palabras normalizadas de un texto"""
+    return _PALABRA.findall(normalizar(texto))
+
+def _dia(fecha):
+    """Ordinal del día de una fecha 'YYYY-MM-DD ...' (o datetime en Excel), o _SIN_FECHA"""
+    if not fecha:
+        return _SIN_FECHA
+    try:
+        return date.fromisoformat(str(fecha)[:10]).toordinal()
+    except (TypeError, ValueError):
+        return _SIN_FECHA
+
+class IndiceTabla:
+    """Índice invertido de una tabla"""
+
+    def __init__(self, tabla):
+        self.tabla = tabla
+        self.marca = None
+        self.fin = 0                     # posición desde la que seguir leyendo
+        self.posiciones = array("q")     # fila del índice -> posición en la tabla
+        self.dias = array("i")           # fila del índice -> ordinal del día
+        self.listas = {}                 # palabra -> array de filas del índice
+
+    def __sizeof__(self):
+        # Para el presupuesto de memoria del negocio (utils/negocios._estimar_memoria)
+        return (object.__sizeof__(self) + sys.getsizeof(self.posiciones)
+                + sys.getsizeof(self.dias) + sys.getsizeof(self.listas)
+                + sum(sys.getsizeof(palabra) + sys.getsizeof(filas)
+                      for palabra, filas in self.listas.items()))
+
+    def actualizar(self):
+        """Indexa las filas agregadas desde la última vez (o todo si la tabla se reescribió)"""
+        marca = marca_tabla(ARCHIVOS[self.tabla])
+        if marca != self.marca:
+            self.__init__(self.tabla)
+            self.marca = marca
+
+        campos = CAMPOS_BUSQUEDA[self.tabla]
+        # Los valores se repiten mucho (proveedores, categorías): se tokenizan una vez
+        tokenizados = {}
+        nuevas = 0
+        for posicion, siguiente, fila in leer_desde(ARCHIVOS[self.tabla], self.fin):
+            numero = len(self.posiciones)
+            self.posiciones.append(posicion)
+            self.dias.append(_dia(fila.get("fecha")))
+            unicas = set()
+            for campo in campos:
+                valor = fila.get(campo)
+                if not valor:
+                    continue
+                encontradas = tokenizados.get(valor)
+                if encontradas is None:
+                    encontradas = tokenizados[valor] = palabras(valor)
+                unicas.update(encontradas)
+            for palabra in unicas:
+                filas = self.listas.get(palabra)
+                if filas is None:
+                    filas = self.listas[palabra] = array("I")
+                filas.append(numero)
+            self.fin = siguiente
+            nuevas += 1
+        if nuevas:
+            logger.debug(f"Índice de {self.tabla}: {nuevas} filas nuevas ({len(self.posiciones)} en total)")
+
+    def _filas_de(self, palabra):
+        """
+        Filas con la palabra, ordenadas; si la palabra no aparece en la tabla,
+        filas con alguna palabra que empieza por ella ('mira' -> 'mirador')
+        """
+        if palabra in self.listas:
+            return self.listas[palabra]
+        coincidencias = [filas for clave, filas in self.listas.items() if clave.startswith(palabra)]
+        if len(coincidencias) == 1:
+            return coincidencias[0]
+        # Unión ordenada sin repetidos
+        resultado = array("I")
+        ultima = -1
+        for numero in heapq.merge(*coincidencias):
+            if numero != ultima:
+                resultado.append(numero)
+                ultima = numero
+        return resultado
+
+    def buscar(self, buscadas, desde=None, hasta=None):
+        """
+        Filas que contienen todas las palabras
+
+        Args:
+            buscadas (list): Palabras normalizadas
+            desde (date, optional): Primer día del rango
+            hasta (date, optional): Último día del rango
+
+        Returns:
+            list: (día, posición) de cada fila encontrada
+        """
+        listas = sorted((self._filas_de(palabra) for palabra in buscadas), key=len)
+        if not listas or not listas[0]:
+            return []
+
+        minimo = desde.toordinal() if desde else _SIN_FECHA + 1
+        maximo = hasta.toordinal() if hasta else date.max.toordinal()
+        resultado = []
+        # Se recorre la lista más corta y se busca cada fila en las demás
+        for numero in listas[0]:
+            dia = self.dias[numero]
+            if not minimo <= dia <= maximo:
+                continue
+            for filas in listas[1:]:
+                i = bisect.bisect_left(filas, numero)
+                if i == len(filas) or filas[i] != numero:
+                    break
+            else:
+                resultado.append((dia, self.posiciones[numero]))
+        return resultado
+
+def _indice(tabla):
+    indices = cache_negocio(CACHE_INDICES)
+    indice = indices.get(tabla)
+    if indice is None:
+        indice = indices[tabla] = IndiceTabla(tabla)
+    return indice
+
+def buscar(texto, desde=None, hasta=None, tablas=None):
+    """
+    Busca filas por texto en las tablas indexadas
+
+    Args:
+        texto (str): Palabras a buscar (todas deben aparecer)
+        desde (date, optional): Primer día del rango
+        hasta (date, optional): Último día del rango
+        tablas (list, optional): Tablas donde buscar (por defecto todas)
+
+    Returns:
+        tuple: (resultados, marcas) con los resultados como (tabla, día,
+        posición) del más reciente al más antiguo, y la marca de cada tabla
+        con la que se obtuvieron sus posiciones
+    """
+    buscadas = palabras(texto)
+    if not buscadas:
+        return [], {}
+
+    resultados = []
+    marcas = {}
+    with _lock:
+        for tabla in tablas or CAMPOS_BUSQUEDA:
+            indice = _indice(tabla)
+            indice.actualizar()
+            marcas[tabla] = indice.marca
+            resultados.extend((tabla, dia, posicion)
+                              for dia, posicion in indice.buscar(buscadas, desde, hasta))
+    resultados.sort(key=lambda resultado: (resultado[1], resultado[2]), reverse=True)
+    return resultados, marcas
+
+def pagina(texto, desde=None, hasta=None, numero=0, tamano=10):
+    """
+    Una página de resultados de búsqueda con sus filas leídas
+
+    Args:
+        texto (str): Palabras a buscar
+        desde (date, optional): Primer día del rango
+        hasta (date, optional): Último día del rango
+        numero (int, optional): Página (desde 0)
+        tamano (int, optional): Resultados por página
+
+    Returns:
+        tuple: (total de resultados, [(tabla, fila), ...] de la página)
+    """
+    for _ in range(3):
+        resultados, marcas = buscar(texto, desde, hasta)
+        seleccion = resultados[numero * tamano:(numero + 1) * tamano]
+
+        por_tabla = {}
+        for tabla, _dia_fila, posicion in seleccion:
+            por_tabla.setdefault(tabla, []).append(posicion)
+        leidas = {
+            tabla: dict(zip(posiciones, leer_en_posiciones(ARCHIVOS[tabla], posiciones)))
+            for tabla, posiciones in por_tabla.items()
+        }
+        # Si una tabla se reescribió mientras tanto, sus posiciones ya no valen
+        if all(marca_tabla(ARCHIVOS[tabla]) == marcas[tabla] for tabla in por_tabla):
+            filas = [(tabla, leidas[tabla][posicion]) for tabla, _dia_fila, posicion in seleccion]
+            return len(resultados), [(tabla, fila) for tabla, fila in filas if fila is not None]
+    logger.warning(f"Búsqueda '{texto}' sin resultados estables: las tablas cambian continuamente")
+    return 0, []
+
+def _mes(anio, mes):
+    """Primer y último día de un mes"""
+    inicio = date(anio, mes, 1)
+    siguiente = date(anio + mes // 12, mes % 12 + 1, 1)
+    return inicio, siguiente - timedelta(days=1)
+
+def _fecha_o_mes(texto, final=False):
+    """'2026-04-03' -> ese día; '2026-04' -> primer (o último) día del mes"""
+    coincidencia = _FECHA.match(texto)
+    if not coincidencia:
+        return None
+    anio, mes, dia = coincidencia.groups()
+    try:
+        if dia:
+            return date(int(anio), int(mes), int(dia))
+        inicio, fin = _mes(int(anio), int(mes))
+    except ValueError:
+        return None
+    return fin if final else inicio
+
+def interpretar_rango(argumentos, hoy=None):
+    """
+    Separa el rango de fechas opcional del final de los argumentos de /buscar
+
+    Rangos aceptados: 'hoy', 'ayer', 'semana' (últimos 7 días), 'mes' (mes en
+    curso), 'abril' (el último abril), 'abril 2026', '2026', '2026-04',
+    '2026-04-03' y 'desde..hasta' con cualquiera de los dos últimos formatos.
+
+    Args:
+        argumentos (list): Palabras del comando
+        hoy (date, optional): Fecha de referencia
+
+    Returns:
+        tuple: (palabras del texto, desde, hasta); desde y hasta son None sin rango
+    """
+    hoy = hoy or ahora().date()
+    argumentos = list(argumentos)
+    if not argumentos:
+        return argumentos, None, None
+
+    ultima = normalizar(argumentos[-1])
+    rango = None
+    usadas = 1
+    if ultima == "hoy":
+        rango = hoy, hoy
+    elif ultima == "ayer":
+        rango = hoy - timedelta(days=1), hoy - timedelta(days=1)
+    elif ultima == "semana":
+        rango = hoy - timedelta(days=6), hoy
+    elif ultima == "mes":
+        rango = _mes(hoy.year, hoy.month)
+    elif ultima in MESES:
+        mes = MESES[ultima]
+        rango = _mes(hoy.year if mes <= hoy.month else hoy.year - 1, mes)
+    elif re.fullmatch(r"20\d\d", ultima):
+        anio = int(ultima)
+        if len(argumentos) > 1 and normalizar(argumentos[-2]) in MESES:
+            rango = _mes(anio, MESES[normalizar(argumentos[-2])])
+            usadas = 2
+        else:
+            rango = date(anio, 1, 1), date(anio, 12, 31)
+    elif ".." in ultima:
+        inicio, _, fin = ultima.partition("..")
+        desde = _fecha_o_mes(inicio) if inicio else date.min
+        hasta = _fecha_o_mes(fin, final=True) if fin else date.max
+        if desde and hasta:
+            rango = desde, hasta
+    else:
+        desde = _fecha_o_mes(ultima)
+        if desde:
+            rango = desde, _fecha_o_mes(ultima, final=True)
+
+    if rango is None:
+        return argumentos, None, None
+    texto = argumentos[:-usadas]
+    # "compras de Finca El Mirador en abril"
+    if texto and normalizar(texto[-1]) in ("en", "de", "del", "desde"):
+        texto = texto[:-1]
+    return texto, rango[0], rango[1]
@@ -0,0 +1,391 @@
+"""
+Registro de cambios de las tablas: cada fila que save_to_csv, update_csv o
+update_record agrega, modifica o elimina se publica como un Cambio.
+
+Con CAMBIOS_ACTIVOS, cada cambio:
+  1. se agrega a un log en disco (CAMBIOS_DIR, uno por negocio) con un offset
+     creciente, en segmentos JSON Lines nombrados por su primer offset;
+  2. se entrega a los suscriptores en proceso (suscribir), en el mismo hilo
+     que hizo la escritura, por lo que deben ser rápidos.
+
+Los consumidores que necesitan procesar todos los cambios aunque el bot se
+reinicie usan un Consumidor: recuerda en disco el offset siguiente al último
+cambio confirmado y al volver lee el log desde ahí, sin releer las tablas.
+
+Las filas que el archivo del historial (utils/archivo.py) mueve fuera de las
+tablas no se publican: siguen existiendo, solo cambian de lugar.
+"""
+import json
+import logging
+import os
+import threading
+import time
+
+from config import CAMBIOS_ACTIVOS, CAMBIOS_DIR
+from utils.metricas import registrar_cambio
+from utils.negocios import ruta_negocio
+from utils.registros import clase_registro
+
+# Logger
+logger = logging.getLogger(__name__)
+
+# Operaciones
+OP_INSERTAR = "insertar"
+OP_ACTUALIZAR = "actualizar"
+OP_ELIMINAR = "eliminar"
+
+# Tamaño a partir del cual se empieza un segmento nuevo del log
+TAMANO_SEGMENTO = 16 * 1024 * 1024
+
+EXTENSION = ".jsonl"
+
+class Cambio:
+    """
+    Cambio de una fila de una tabla
+
+    Las filas y la clave llevan los tipos del esquema de la tabla (ver
+    utils/registros.py: números como float, fechas como datetime) sin importar
+    qué escritura las produjo, tanto al publicarse como al leerse del log.
+    """
+
+    __slots__ = ("offset", "tabla", "op", "clave", "antes", "despues", "momento", "campo_clave")
+
+    def __init__(self, offset, tabla, op, clave, antes, despues, momento, campo_clave='fecha'):
+        self.offset = offset
+        self.tabla = tabla
+        self.op = op
+        self.clave = clave
+        self.antes = antes          # fila antes del cambio (None al insertar)
+        self.despues = despues      # fila después del cambio (None al eliminar)
+        self.momento = momento      # segundos UTC en que se publicó
+        self.campo_clave = campo_clave
+
+    def a_dict(self):
+        return {campo: getattr(self, campo) for campo in self.__slots__}
+
+    def __repr__(self):
+        return f"Cambio({self.offset}, {self.tabla}, {self.op}, {self.clave!r})"
+
+def _fila(tabla, fila):
+    """Copia de una fila como diccionario, con los tipos del esquema de la tabla"""
+    if fila is None:
+        return None
+    clase = clase_registro(tabla)
+    return dict(clase(fila)) if clase else dict(fila)
+
+def _clave(tabla, campo_clave, clave):
+    """Clave convertida al tipo de su campo en el esquema de la tabla"""
+    clase = clase_registro(tabla)
+    convertir = clase._conversores.get(campo_clave) if clase else None
+    return convertir(clave) if convertir else clave
+
+def _tipar(cambio):
+    """Aplica los tipos del esquema a la clave y las filas de un cambio"""
+    cambio.clave = _clave(cambio.tabla, cambio.campo_clave, cambio.clave)
+    cambio.antes = _fila(cambio.tabla, cambio.antes)
+    cambio.despues = _fila(cambio.tabla, cambio.despues)
+    return cambio
+
+class LogCambios:
+    """Log de cambios de un directorio (el de DATA_DIR o el de un negocio)"""
+
+    def __init__(self, directorio):
+        self.directorio = directorio
+        self._lock = threading.Lock()
+        self._siguiente = None      # offset del próximo cambio
+        self._segmento = None       # ruta del segmento en el que se escribe
+        self._tamano = 0
+
+    def _segmentos(self):
+        """[(primer offset, ruta)] de los segmentos existentes, en orden"""
+        if not os.path.isdir(self.directorio):
+            return []
+        segmentos = []
+        for nombre in os.listdir(self.directorio):
+            base, extension = os.path.splitext(nombre)
+            if extension == EXTENSION and base.isdigit():
+                segmentos.append((int(base), os.path.join(self.directorio, nombre)))
+        return sorted(segmentos)
+
+    def _recuperar(self):
+        """Obtiene el próximo offset del último segmento, descartando una línea a medio escribir"""
+        segmentos = self._segmentos()
+        if not segmentos:
+            self._siguiente = 0
+            return
+        inicio, ruta = segmentos[-1]
+        siguiente = inicio
+        with open(ruta, 'rb+') as f:
+            completo = 0
+            for linea in f:
+                if not linea.endswith(b"\n"):
+                    break
+                completo += len(linea)
+                siguiente = json.loads(linea)["offset"] + 1
+            if completo < f.seek(0, os.SEEK_END):
+                logger.warning(f"Registro de cambios: se descarta una línea incompleta en {ruta}")
+                f.truncate(completo)
+        self._siguiente = siguiente
+        self._segmento = ruta
+        self._tamano = completo
+
+    def agregar(self, tabla, op, clave, antes, despues, campo_clave='fecha'):
+        """
+        Agrega un cambio al final del log
+
+        Returns:
+            Cambio: Cambio con su offset asignado
+        """
+        with self._lock:
+            if self._siguiente is None:
+                self._recuperar()
+            cambio = _tipar(Cambio(self._siguiente, tabla, op, clave, antes, despues, time.time(), campo_clave))
+            # Las fechas se escriben como texto (FORMATO_FECHA) y se vuelven a convertir al leer
+            linea = (json.dumps(cambio.a_dict(), ensure_ascii=False, default=str) + "\n").encode('utf-8')
+
+            if self._segmento is None or self._tamano + len(linea) > TAMANO_SEGMENTO:
+                os.makedirs(self.directorio, exist_ok=True)
+                self._segmento = os.path.join(self.directorio, f"{cambio.offset:020d}{EXTENSION}")
+                self._tamano = 0
+            # Se abre y cierra en cada cambio: con muchos negocios no quedan archivos abiertos
+            with open(self._segmento, 'ab') as f:
+                f.write(linea)
+            self._tamano += len(linea)
+            self._siguiente += 1
+            return cambio
+
+    def leer(self, desde=0, tablas=None):
+        """
+        Lee los cambios del log a partir de un offset
+
+        Args:
+            desde (int, optional): Primer offset a leer
+            tablas (set, optional): Solo cambios de estas tablas
+
+        Yields:
+            Cambio: Cambios en orden de offset
+        """
+        segmentos = self._segmentos()
+        for i, (inicio, ruta) in enumerate(segmentos):
+            # Segmentos que terminan antes de `desde`
+            if i + 1 < len(segmentos) and segmentos[i + 1][0] <= desde:
+                continue
+            with open(ruta, 'rb') as f:
+                for linea in f:
+                    if not linea.endswith(b"\n"):
+                        # Cambio a medio escribir: se leerá la próxima vez
+                        return
+                    datos = json.loads(linea)
+                    if datos["offset"] < desde:
+                        continue
+                    if tablas is not None and datos["tabla"] not in tablas:
+                        continue
+                    yield _tipar(Cambio(**datos))
+
+    def ultimo_offset(self):
+        """Offset del último cambio publicado (-1 si no hay ninguno)"""
+        with self._lock:
+            if self._siguiente is None:
+                self._recuperar()
+            return self._siguiente - 1
+
+# Logs por directorio (uno por negocio)
+_logs = {}
+_logs_lock = threading.Lock()
+
+# Suscriptores en proceso: [(función, tablas o None)]
+_suscriptores = []
+
+def log_cambios():
+    """Log de cambios del negocio en curso (o el de DATA_DIR)"""
+    directorio = os.path.abspath(ruta_negocio(CAMBIOS_DIR))
+    with _logs_lock:
+        log = _logs.get(directorio)
+        if log is None:
+            log = _logs[directorio] = LogCambios(directorio)
+        return log
+
+def suscribir(funcion, tablas=None):
+    """
+    Registra una función que recibe cada Cambio publicado, de cualquier negocio
+
+    La función se ejecuta en el hilo que hizo la escritura, con el negocio de
+    esa escritura en curso y con la tabla todavía bloqueada (no debe esperar a
+    otros hilos que escriban); sus excepciones se registran y no afectan a la
+    escritura.
+
+    Args:
+        funcion (callable): Recibe el Cambio
+        tablas (list, optional): Solo cambios de estas tablas
+    """
+    _suscriptores.append((funcion, set(tablas) if tablas else None))
+
+def cancelar_suscripcion(funcion):
+    """Quita una función registrada con suscribir"""
+    _suscriptores[:] = [(f, tablas) for f, tablas in _suscriptores if f is not funcion]
+
+def publicar(tabla, op, clave, antes=None, despues=None, campo_clave='fecha'):
+    """
+    Publica el cambio de una fila (sin efecto si CAMBIOS_ACTIVOS no está activo)
+
+    Las filas pueden venir como texto (CSV), tipadas o de Excel: se publican
+    siempre con los tipos del esquema de la tabla.
+
+    Args:
+        tabla (str): Nombre de la tabla
+        op (str): OP_INSERTAR, OP_ACTUALIZAR u OP_ELIMINAR
+        clave: Valor del campo clave de la fila
+        antes (dict, optional): Fila antes del cambio
+        despues (dict, optional): Fila después del cambio
+        campo_clave (str, optional): Campo de la clave
+
+    Returns:
+        Cambio: Cambio publicado, o None si no se publicó
+    """
+    if not CAMBIOS_ACTIVOS:
+        return None
+    try:
+        cambio = log_cambios().agregar(tabla, op, clave, antes, despues, campo_clave)
+    except Exception as e:
+        # La escritura en la tabla ya se hizo: no se revierte por un fallo del log
+        logger.error(f"Error al registrar cambio de {tabla}: {e}")
+        return None
+    registrar_cambio(tabla, op)
+
+    for funcion, tablas in list(_suscriptores):
+        if tablas is not None and tabla not in tablas:
+            continue
+        try:
+            funcion(cambio)
+        except Exception as e:
+            logger.error(f"Error en suscriptor de cambios {getattr(funcion, '__name__', funcion)}: {e}")
+    return cambio
+
+def _valor(valor):
+    """
+    Valor comparable entre una fila leída sin convertir y una ya tipada:
+    números como float, nulos (None, NaN, NA de pandas) como vacío
+    """
+    if valor is None:
+        return ''
+    try:
+        if valor != valor:
+            return ''
+    except TypeError:
+        # pandas.NA no se puede evaluar como booleano
+        return ''
+    try:
+        return float(valor)
+    except (TypeError, ValueError):
+        return str(valor)
+
+def _normalizar(fila):
+    """Fila con valores comparables, para comparar filas leídas y por escribir"""
+    return {campo: _valor(valor) for campo, valor in fila.items()}
+
+def publicar_diferencias(tabla, anteriores, nuevas, campo_clave):
+    """
+    Publica los cambios entre el contenido anterior y el nuevo de una tabla
+    reescrita completa (update_csv)
+
+    Las filas se emparejan por su campo clave (en orden si la clave se
+    repite): las que cambian se publican como actualizadas, las que sobran
+    como eliminadas y las que faltaban como insertadas.
+
+    Args:
+        tabla (str): Nombre de la tabla
+        anteriores (list): Filas antes de reescribir
+        nuevas (list): Filas escritas
+        campo_clave (str): Campo que identifica las filas
+    """
+    if not CAMBIOS_ACTIVOS:
+        return
+    por_clave = {}
+    for fila in anteriores:
+        por_clave.setdefault(str(fila.get(campo_clave, '')), []).append(fila)
+
+    for fila in nuevas:
+        clave = fila.get(campo_clave)
+        candidatas = por_clave.get(str(clave if clave is not None else ''))
+        if not candidatas:
+            publicar(tabla, OP_INSERTAR, clave, None, fila, campo_clave)
+            continue
+        anterior = candidatas.pop(0)
+        if _normalizar(anterior) != _normalizar(fila):
+            publicar(tabla, OP_ACTUALIZAR, clave, anterior, fila, campo_clave)
+
+    for candidatas in por_clave.values():
+        for anterior in candidatas:
+            publicar(tabla, OP_ELIMINAR, anterior.get(campo_clave), anterior, None, campo_clave)
+
+class Consumidor:
+    """
+    Lector del registro de cambios que recuerda en disco hasta dónde procesó,
+    para continuar desde ahí después de reiniciar. La posición es por negocio.
+
+    Uso:
+        consumidor = Consumidor("exportacion", tablas=["ventas"])
+        consumidor.procesar(lambda cambio: ...)
+    """
+
+    def __init__(self, nombre, tablas=None):
+        self.nombre = nombre
+        self.tablas = set(tablas) if tablas else None
+
+    def _ruta(self):
+        return os.path.join(ruta_negocio(CAMBIOS_DIR), "consumidores", f"{self.nombre}.offset")
+
+    def posicion(self):
+        """Offset del próximo cambio a procesar (0 si nunca se confirmó ninguno)"""
+        try:
+            with open(self._ruta(), 'r', encoding='utf-8') as f:
+                return int(f.read().strip() or 0)
+        except FileNotFoundError:
+            return 0
+
+    def pendientes(self):
+        """Cambios publicados desde la última confirmación"""
+        return log_cambios().leer(self.posicion(), self.tablas)
+
+    def confirmar(self, cambio):
+        """
+        Marca como procesados los cambios hasta uno (incluido)
+
+        Args:
+            cambio (Cambio | int): Último cambio procesado, o su offset
+        """
+        offset = cambio.offset if isinstance(cambio, Cambio) else cambio
+        ruta = self._ruta()
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        temporal = f"{ruta}.tmp"
+        with open(temporal, 'w', encoding='utf-8') as f:
+            f.write(str(offset + 1))
+        os.replace(temporal, ruta)
+
+    def procesar(self, funcion, cada=100):
+        """
+        Procesa los cambios pendientes y confirma el avance cada tantos cambios
+
+        Si la función lanza una excepción se confirma hasta el cambio anterior y
+        la excepción se propaga: al reintentar se continúa desde el que falló.
+
+        Args:
+            funcion (callable): Recibe cada Cambio
+            cada (int, optional): Cambios entre confirmaciones
+
+        Returns:
+            int: Cambios procesados
+        """
+        procesados = 0
+        ultimo = None
+        try:
+            for cambio in self.pendientes():
+                funcion(cambio)
+                ultimo = cambio
+                procesados += 1
+                if procesados % cada == 0:
+                    self.confirmar(ultimo)
+        finally:
+            if ultimo is not None:
+                self.confirmar(ultimo)
+        return procesados
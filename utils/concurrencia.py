@@ -0,0 +1,113 @@
+import asyncio
+import logging
+
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+from utils.perfilado import perfilador
+
+# Configuración de logging
+logger = logging.getLogger(__name__)
+
+def clave_chat(update):
+    """
+    Obtiene la clave de orden de un update: el id del chat del que proviene
+
+    Args:
+        update: Update de Telegram (u otro objeto encolado en la aplicación)
+
+    Returns:
+        int: Id del chat, o None si el update no pertenece a un chat
+    """
+    if isinstance(update, Update) and update.effective_chat is not None:
+        return update.effective_chat.id
+    return None
+
+class ProcesadorPorChat(BaseUpdateProcessor):
+    """
+    Procesador de updates concurrente con orden estricto por chat.
+
+    Updates de chats distintos se procesan en paralelo (hasta
+    max_concurrent_updates a la vez), pero los de un mismo chat se procesan
+    uno detrás de otro en orden de llegada, de modo que las transiciones de
+    estado de los ConversationHandler siguen siendo consistentes.
+
+    Un update solo ocupa un cupo de concurrencia global cuando ya es el
+    siguiente de su chat, así un chat con mucha cola no bloquea a los demás.
+    """
+
+    def __init__(self, max_concurrent_updates):
+        super().__init__(max_concurrent_updates)
+        # Un candado por chat con updates pendientes; asyncio.Lock atiende en orden FIFO
+        self._candados = {}
+        # Updates pendientes (en espera o en proceso) por chat
+        self._pendientes = {}
+        self._total_pendientes = 0
+        self._max_profundidad = 0
+        self._procesados = 0
+
+    async def process_update(self, update, coroutine):
+        clave = clave_chat(update)
+        if clave is None:
+            await super().process_update(update, coroutine)
+            self._procesados += 1
+            return
+
+        candado = self._candados.get(clave)
+        if candado is None:
+            candado = self._candados[clave] = asyncio.Lock()
+        profundidad = self._pendientes.get(clave, 0) + 1
+        self._pendientes[clave] = profundidad
+        self._total_pendientes += 1
+        self._max_profundidad = max(self._max_profundidad, profundidad)
+
+        try:
+            async with candado:
+                await super().process_update(update, coroutine)
+        finally:
+            self._total_pendientes -= 1
+            self._procesados += 1
+            restantes = self._pendientes[clave] - 1
+            if restantes:
+                self._pendientes[clave] = restantes
+            else:
+                # Nadie espera ni tiene el candado: se libera la memoria del chat
+                del self._pendientes[clave]
+                del self._candados[clave]
+
+    async def do_process_update(self, update, coroutine):
+        sesion = perfilador.sesion
+        if sesion is None:
+            await coroutine
+        else:
+            # Perfilado bajo demanda (/perf) de los próximos updates
+            await sesion.procesar(update, coroutine)
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+    @property
+    def total_pendientes(self):
+        """Updates aceptados que aún no terminaron de procesarse"""
+        return self._total_pendientes
+
+    def metricas(self):
+        """
+        Devuelve una instantánea de la profundidad de las colas
+
+        Returns:
+            dict: Métricas del procesador
+        """
+        en_proceso = self.current_concurrent_updates
+        return {
+            "max_concurrentes": self.max_concurrent_updates,
+            "en_proceso": en_proceso,
+            "en_espera": max(self._total_pendientes - en_proceso, 0),
+            "chats_activos": len(self._pendientes),
+            "max_profundidad_chat_actual": max(self._pendientes.values(), default=0),
+            "max_profundidad_chat_historica": self._max_profundidad,
+            "procesados": self._procesados,
+        }
@@ -1,20 +1,84 @@
 import csv
+import io
 import os
-import pandas as pd
-from datetime import datetime
 import logging
-import platform
+import shutil
+import threading
+from collections import Counter
+from datetime import datetime
+
+from config import CAMBIOS_ACTIVOS
+from utils.cambios import OP_ACTUALIZAR, OP_INSERTAR, publicar, publicar_diferencias
+from utils.esquemas import CAMPO_EPOCH, FORMATO_FECHA, dataframe_vacio, opciones_read_csv, tipar_dataframe
+from utils.helpers import fecha_a_epoch
+from utils.metricas import registrar_io
+from utils.negocios import negocio_actual, registro_negocios, ruta_negocio
+from utils.registros import clase_registro, cargar_registros
 
 # Determinar si estamos en producción (Heroku)
 IS_PRODUCTION = os.getenv('ENVIRONMENT', '').lower() == 'production'
 
-# Si estamos en producción, importar el módulo de Excel
-if IS_PRODUCTION:
-    from utils.excel_db import excel_db
+# pandas y el backend de Excel (openpyxl) se importan de forma diferida dentro
+# de las funciones que los usan para no penalizar el arranque del bot
 
 # Configuración de logging
 logger = logging.getLogger(__name__)
 
+# Serializa las escrituras en CSV entre el event loop y los hilos (p. ej. el archivo
+# del historial, ver utils/archivo.py)
+_bloqueo_escritura = threading.RLock()
+# Reescrituras completas de cada CSV, para detectar instantáneas desactualizadas
+_versiones = Counter()
+# Último (inodo, tamaño) visto de cada CSV por marca_tabla, para detectar las
+# reescrituras hechas por otros procesos (tools/archivar.py, tools/rellenar_epoch.py)
+_archivos_vistos = {}
+# Encabezado de cada CSV: {ruta: ((versión, dispositivo, inodo), columnas)}
+_encabezados = {}
+
+def _excel_db():
+    """Devuelve el libro de Excel del negocio en curso (o el compartido), importándolo la primera vez"""
+    negocio = negocio_actual()
+    if negocio is not None:
+        return negocio.excel
+    from utils.excel_db import excel_db
+    return excel_db
+
+def _tabla(file_path):
+    """Nombre de la tabla (hoja de Excel) a partir de la ruta del archivo"""
+    return os.path.basename(file_path).split('.')[0]
+
+def _encabezado_csv(file_path):
+    """
+    Columnas de un CSV existente (lista vacía si está vacío), leídas solo la
+    primera vez y cuando el archivo se reescribe (otra versión u otro inodo)
+    """
+    estado = os.stat(file_path)
+    marca = (_versiones[file_path], estado.st_dev, estado.st_ino)
+    guardado = _encabezados.get(file_path)
+    if guardado is not None and guardado[0] == marca and estado.st_size:
+        return guardado[1]
+    with open(file_path, 'r', newline='', encoding='utf-8') as f:
+        columnas = next(csv.reader(f), [])
+    _encabezados[file_path] = (marca, columnas)
+    return columnas
+
+def _con_epoch(data, fieldnames):
+    """
+    Agrega fecha_epoch a una fila con fecha, si no lo trae
+    
+    Returns:
+        tuple: (fila, fieldnames), sin modificar los originales
+    """
+    if 'fecha' not in data or data.get(CAMPO_EPOCH) not in (None, ''):
+        return data, fieldnames
+    epoch = fecha_a_epoch(data['fecha'])
+    if epoch is None:
+        return data, fieldnames
+    data = {**data, CAMPO_EPOCH: epoch}
+    if fieldnames is not None and CAMPO_EPOCH not in fieldnames:
+        fieldnames = list(fieldnames) + [CAMPO_EPOCH]
+    return data, fieldnames
+
 def save_to_csv(file_path, data, fieldnames=None):
     """
     Guarda datos en un archivo CSV o Excel (en producción)
@@ -27,85 +91,128 @@ def save_to_csv(file_path, data, fieldnames=None):
     Returns:
         bool: True si se guardó correctamente, False en caso contrario
     """
+    file_path = ruta_negocio(file_path)
     try:
         # Si estamos en producción, usar Excel
         if IS_PRODUCTION:
             # Extraer el nombre de la hoja del path
-            sheet_name = os.path.basename(file_path).split('.')[0]
-            return excel_db.append_data(sheet_name, data)
+            sheet_name = _tabla(file_path)
+            registrar_io(sheet_name, "escritura", 1)
+            data, _ = _con_epoch(data, None)
+            # Se publica con la hoja bloqueada: los cambios quedan en el mismo orden que las filas
+            return _excel_db().append_data(
+                sheet_name, data,
+                confirmar=lambda: publicar(sheet_name, OP_INSERTAR, data.get('fecha'), None, data),
+            )
         
         # Modo desarrollo: usar CSV
         else:
-            # Determinar si el archivo existe
-            file_exists = os.path.exists(file_path)
-            
-            # Si no se especifican fieldnames, usar las claves del diccionario
-            if fieldnames is None:
-                fieldnames = list(data.keys())
-            
-            with open(file_path, 'a', newline='', encoding='utf-8') as f:
-                writer = csv.DictWriter(f, fieldnames=fieldnames)
+            with _bloqueo_escritura:
+                # Determinar si el archivo existe
+                file_exists = os.path.exists(file_path)
+                
+                # Si no se especifican fieldnames, usar las claves del diccionario
+                if fieldnames is None:
+                    fieldnames = list(data.keys())
                 
-                # Escribir encabezados si el archivo es nuevo
-                if not file_exists:
-                    writer.writeheader()
+                # Los CSV creados antes de fecha_epoch no lo reciben hasta rellenarlos
+                # (tools/rellenar_epoch.py): una columna sin encabezado los corrompería
+                if not file_exists or CAMPO_EPOCH in _encabezado_csv(file_path):
+                    data, fieldnames = _con_epoch(data, fieldnames)
                 
-                # Escribir datos
-                writer.writerow(data)
+                with open(file_path, 'a', newline='', encoding='utf-8') as f:
+                    writer = csv.DictWriter(f, fieldnames=fieldnames)
+                    
+                    # Escribir encabezados si el archivo es nuevo
+                    if not file_exists:
+                        writer.writeheader()
+                    
+                    # Escribir datos
+                    inicio = f.tell()
+                    writer.writerow(data)
+                    registrar_io(_tabla(file_path), "escritura", 1, f.tell() - inicio)
+                
+                # Dentro del bloqueo: los cambios quedan en el mismo orden que las filas
+                publicar(_tabla(file_path), OP_INSERTAR, data.get('fecha'), None, data)
             
             return True
     except Exception as e:
         logger.error(f"Error al guardar en CSV/Excel: {e}")
         return False
 
-def get_dataframe(file_path):
+def get_dataframe(file_path, columns=None):
     """
     Lee un archivo CSV/Excel y lo devuelve como DataFrame de pandas
     
+    Las tablas con esquema (ver utils/esquemas.py) se devuelven ya tipadas:
+    categorías para los textos repetidos, float para montos y kilos y
+    datetime para las fechas.
+    
     Args:
         file_path (str): Ruta o nombre del archivo sin extensión
+        columns (list, optional): Cargar solo estas columnas
     
     Returns:
         DataFrame: DataFrame de pandas con los datos
     """
+    file_path = ruta_negocio(file_path)
+    import pandas as pd
+    
+    tabla = _tabla(file_path)
     try:
         # Si estamos en producción, usar Excel
         if IS_PRODUCTION:
-            # Extraer el nombre de la hoja del path
-            sheet_name = os.path.basename(file_path).split('.')[0]
-            return excel_db.get_dataframe(sheet_name)
+            df = _excel_db().get_dataframe(tabla, columns)
+            registrar_io(tabla, "lectura", len(df))
+            return df
         
         # Modo desarrollo: usar CSV
         else:
             # Verificar si el archivo existe
             if not os.path.exists(file_path):
-                # Si no existe, crear un DataFrame vacío
-                return pd.DataFrame()
+                # Si no existe, devolver un DataFrame vacío con las columnas de la tabla
+                return dataframe_vacio(tabla, columns)
             
-            # Leer CSV como DataFrame
-            df = pd.read_csv(file_path)
+            # Leer CSV como DataFrame con los tipos del esquema
+            try:
+                df = pd.read_csv(file_path, **opciones_read_csv(tabla, columns))
+            except ValueError:
+                # Algún valor no corresponde al tipo declarado: leer como texto y
+                # convertir dejando nulos los valores inválidos
+                opciones = opciones_read_csv(None, columns)
+                df = pd.read_csv(file_path, dtype=str, **opciones)
+            df = tipar_dataframe(df, tabla)
+            registrar_io(tabla, "lectura", len(df), os.path.getsize(file_path))
             return df
     except Exception as e:
         logger.error(f"Error al leer CSV/Excel como DataFrame: {e}")
         return pd.DataFrame()
 
-def read_from_csv(file_path):
+def read_from_csv(file_path, tipado=True):
     """
     Lee datos de un archivo CSV o Excel (en producción)
     
     Args:
         file_path (str): Ruta o nombre del archivo sin extensión
+        tipado (bool, optional): Si la tabla tiene esquema (ver utils/registros.py),
+            devolver registros con números y fechas ya convertidos en lugar de
+            diccionarios de texto
     
     Returns:
-        list: Lista de diccionarios con los datos leídos
+        list: Lista de registros (compatibles con dict) con los datos leídos
     """
+    file_path = ruta_negocio(file_path)
     try:
+        clase = clase_registro(_tabla(file_path)) if tipado else None
+        
         # Si estamos en producción, usar Excel
         if IS_PRODUCTION:
             # Extraer el nombre de la hoja del path
-            sheet_name = os.path.basename(file_path).split('.')[0]
-            df = excel_db.get_dataframe(sheet_name)
-            return df.to_dict('records')
+            sheet_name = _tabla(file_path)
+            df = _excel_db().get_dataframe(sheet_name)
+            registrar_io(sheet_name, "lectura", len(df))
+            filas = df.to_dict('records')
+            return [clase(fila) for fila in filas] if clase else filas
         
         # Modo desarrollo: usar CSV
         else:
@@ -113,8 +220,12 @@ def read_from_csv(file_path):
                 return []
             
             with open(file_path, 'r', newline='', encoding='utf-8') as f:
-                reader = csv.DictReader(f)
-                return list(reader)
+                if clase:
+                    filas = cargar_registros(f, clase)
+                else:
+                    filas = list(csv.DictReader(f))
+                registrar_io(_tabla(file_path), "lectura", len(filas), os.path.getsize(file_path))
+                return filas
     except Exception as e:
         logger.error(f"Error al leer CSV/Excel: {e}")
         return []
@@ -131,37 +242,67 @@ def update_csv(file_path, data_list, key_field='fecha'):
     Returns:
         bool: True si se actualizó correctamente, False en caso contrario
     """
+    file_path = ruta_negocio(file_path)
     try:
         # Si no hay datos, no hacer nada
         if not data_list:
             return True
         
-        # Si estamos en producción, usar Excel
-        if IS_PRODUCTION:
-            # Extraer el nombre de la hoja del path
-            sheet_name = os.path.basename(file_path).split('.')[0]
-            
-            # Convertir la lista a DataFrame
-            df = pd.DataFrame(data_list)
-            
-            # Guardar como una nueva hoja completa
-            return excel_db._save_sheet(sheet_name, df)
-        
-        # Modo desarrollo: usar CSV
-        else:
-            # Obtener los nombres de campos del primer registro
-            fieldnames = list(data_list[0].keys())
-            
-            with open(file_path, 'w', newline='', encoding='utf-8') as f:
-                writer = csv.DictWriter(f, fieldnames=fieldnames)
-                writer.writeheader()
-                writer.writerows(data_list)
-            
+        with _bloqueo_escritura:
+            # Contenido anterior, para publicar solo las filas que cambian
+            anteriores = _filas_actuales(file_path) if CAMBIOS_ACTIVOS else None
+            if not _reescribir_tabla(file_path, data_list):
+                return False
+            if anteriores is not None:
+                publicar_diferencias(_tabla(file_path), anteriores, data_list, key_field)
             return True
     except Exception as e:
         logger.error(f"Error al actualizar CSV/Excel: {e}")
         return False
 
+def _filas_actuales(file_path):
+    """Copia de las filas de una tabla sin convertir (ruta ya resuelta)"""
+    if IS_PRODUCTION:
+        return [dict(fila) for fila in _excel_db().instantanea(_tabla(file_path))["filas"]]
+    return read_from_csv(file_path, tipado=False)
+
+def _reescribir_tabla(file_path, data_list):
+    """Reemplaza el contenido completo de una tabla (ruta ya resuelta, con filas)"""
+    # Si estamos en producción, usar Excel
+    if IS_PRODUCTION:
+        # Extraer el nombre de la hoja del path
+        sheet_name = _tabla(file_path)
+        registrar_io(sheet_name, "escritura", len(data_list))
+        
+        # Convertir la lista a DataFrame
+        import pandas as pd
+        df = pd.DataFrame(data_list)
+        
+        # Guardar como una nueva hoja completa
+        return _excel_db()._save_sheet(sheet_name, df)
+    
+    # Modo desarrollo: usar CSV
+    # Obtener los nombres de campos del primer registro
+    fieldnames = list(data_list[0].keys())
+    
+    # Escribir en un temporal y reemplazar: el archivo nuevo tiene otro inodo, así
+    # otros procesos con posiciones de leer_desde notan la reescritura (marca_tabla)
+    temporal = f"{file_path}.tmp"
+    with _bloqueo_escritura:
+        try:
+            with open(temporal, 'w', newline='', encoding='utf-8') as f:
+                writer = csv.DictWriter(f, fieldnames=fieldnames)
+                writer.writeheader()
+                writer.writerows(data_list)
+                tamano = f.tell()
+            os.replace(temporal, file_path)
+        finally:
+            if os.path.exists(temporal):
+                os.remove(temporal)
+        _versiones[file_path] += 1
+        registrar_io(_tabla(file_path), "escritura", len(data_list), tamano)
+    return True
+
 def update_record(file_path, record_id, updates, id_field='fecha'):
     """
     Actualiza un solo registro en un archivo CSV o Excel (en producción)
@@ -175,34 +316,65 @@ def update_record(file_path, record_id, updates, id_field='fecha'):
     Returns:
         bool: True si se actualizó correctamente, False en caso contrario
     """
+    file_path = ruta_negocio(file_path)
     try:
         # Si estamos en producción, usar Excel
         if IS_PRODUCTION:
             # Extraer el nombre de la hoja del path
-            sheet_name = os.path.basename(file_path).split('.')[0]
-            return excel_db.update_data(sheet_name, id_field, record_id, updates)
+            sheet_name = _tabla(file_path)
+            registrar_io(sheet_name, "escritura", 1)
+            anteriores = [] if CAMBIOS_ACTIVOS else None
+            
+            def publicar_actualizadas():
+                for anterior in anteriores or []:
+                    publicar(sheet_name, OP_ACTUALIZAR, record_id, anterior, {**anterior, **updates}, id_field)
+            
+            return _excel_db().update_data(
+                sheet_name, id_field, record_id, updates, anteriores, confirmar=publicar_actualizadas
+            )
         
         # Modo desarrollo: usar CSV
         else:
-            # Leer todos los registros
-            records = read_from_csv(file_path)
-            
-            # Actualizar el registro específico
-            updated = False
-            for record in records:
-                if record[id_field] == record_id:
-                    record.update(updates)
-                    updated = True
-            
-            if not updated:
-                return False
-            
-            # Escribir todos los registros de vuelta al archivo
-            return update_csv(file_path, records, id_field)
+            with _bloqueo_escritura:
+                # Leer todos los registros sin convertir, para reescribirlos tal cual
+                records = read_from_csv(file_path, tipado=False)
+                
+                # La clave puede venir de un registro tipado (datetime): compararla como texto
+                clave = _clave_texto(record_id)
+                
+                # Actualizar el registro específico
+                actualizados = []
+                for record in records:
+                    if record[id_field] == clave:
+                        anterior = dict(record) if CAMBIOS_ACTIVOS else None
+                        record.update(updates)
+                        actualizados.append((anterior, record))
+                
+                if not actualizados:
+                    return False
+                
+                # Escribir todos los registros de vuelta al archivo
+                if not _reescribir_tabla(file_path, records):
+                    return False
+                for anterior, record in actualizados:
+                    publicar(_tabla(file_path), OP_ACTUALIZAR, record_id, anterior, record, id_field)
+                return True
     except Exception as e:
         logger.error(f"Error al actualizar registro: {e}")
         return False
 
+def _clave_texto(record_id):
+    """Valor buscado tal como está escrito en el CSV (las fechas tipadas, en FORMATO_FECHA)"""
+    if isinstance(record_id, datetime):
+        return record_id.strftime(FORMATO_FECHA)
+    return record_id if isinstance(record_id, str) else str(record_id)
+
+def _convertir_clave(file_path, id_field, record_id):
+    """Convierte el valor buscado al mismo tipo que tiene el campo en los registros tipados"""
+    clase = clase_registro(_tabla(file_path))
+    convertir = clase._conversores.get(id_field) if clase else None
+    return convertir(record_id) if convertir else record_id
+
 def get_record_by_id(file_path, record_id, id_field='fecha'):
     """
     Obtiene un registro específico por su ID
@@ -215,17 +387,19 @@ def get_record_by_id(file_path, record_id, id_field='fecha'):
     Returns:
         dict: Registro encontrado o None si no existe
     """
+    file_path = ruta_negocio(file_path)
     try:
         # Si estamos en producción, usar DataFrame
         if IS_PRODUCTION:
             # Extraer el nombre de la hoja del path
-            sheet_name = os.path.basename(file_path).split('.')[0]
-            df = excel_db.get_dataframe(sheet_name)
+            sheet_name = _tabla(file_path)
+            df = _excel_db().get_dataframe(sheet_name)
+            registrar_io(sheet_name, "lectura", len(df))
             if df.empty:
                 return None
             
-            # Filtrar por ID
-            filtered = df[df[id_field] == record_id]
+            # Filtrar por ID (convertido al tipo de la columna)
+            filtered = df[df[id_field] == _convertir_clave(file_path, id_field, record_id)]
             if filtered.empty:
                 return None
             
@@ -235,10 +409,214 @@ def get_record_by_id(file_path, record_id, id_field='fecha'):
         # Modo desarrollo: usar CSV
         else:
             records = read_from_csv(file_path)
+            record_id = _convertir_clave(file_path, id_field, record_id)
             for record in records:
                 if record[id_field] == record_id:
                     return record
             return None
     except Exception as e:
         logger.error(f"Error al obtener registro por ID: {e}")
-        return None
\ No newline at end of file
+        return None
+
+def instantanea_tabla(file_path):
+    """
+    Lee todas las filas de una tabla sin convertir, con una marca para detectar
+    después si la tabla se reescribió (ver retirar_filas)
+    
+    Args:
+        file_path (str): Ruta o nombre del archivo sin extensión
+    
+    Returns:
+        dict: {"columnas": [...], "filas": [dict, ...], "marca": ...}
+    """
+    file_path = ruta_negocio(file_path)
+    if IS_PRODUCTION:
+        return _excel_db().instantanea(_tabla(file_path))
+    
+    with _bloqueo_escritura:
+        if not os.path.exists(file_path):
+            return {"columnas": [], "filas": [], "marca": None}
+        with open(file_path, 'rb') as f:
+            datos = f.read()
+        marca = (_versiones[file_path], len(datos))
+    
+    reader = csv.DictReader(io.StringIO(datos.decode('utf-8'), newline=''))
+    filas = list(reader)
+    registrar_io(_tabla(file_path), "lectura", len(filas), len(datos))
+    return {"columnas": list(reader.fieldnames or []), "filas": filas, "marca": marca}
+
+def retirar_filas(file_path, instantanea, filas, confirmar=None):
+    """
+    Quita de una tabla filas de una instantánea, conservando las que se
+    agregaron después de tomarla
+    
+    Args:
+        file_path (str): Ruta o nombre del archivo sin extensión
+        instantanea (dict): Resultado de instantanea_tabla
+        filas (list): Filas de la instantánea a quitar
+        confirmar (callable, optional): Se llama con la tabla bloqueada justo
+            antes de quitar las filas (p. ej. para publicar el archivo que las guarda)
+    
+    Returns:
+        bool: True si se quitaron; False si la tabla se reescribió desde la
+        instantánea y no se modificó nada
+    """
+    file_path = ruta_negocio(file_path)
+    if instantanea["marca"] is None:
+        return False
+    retiradas = {id(fila) for fila in filas}
+    
+    if IS_PRODUCTION:
+        libro = _excel_db()
+        if not libro.retirar_filas(_tabla(file_path), instantanea["marca"], retiradas, confirmar):
+            return False
+        # Guardar ya el libro sin las filas: si el proceso termina antes del guardado
+        # diferido, quedarían a la vez en la hoja y en el archivo que las recibió
+        libro.checkpoint()
+        return True
+    
+    version, tamano = instantanea["marca"]
+    temporal = f"{file_path}.tmp"
+    try:
+        # Escribir las filas que se conservan fuera del bloqueo
+        with open(temporal, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=instantanea["columnas"])
+            writer.writeheader()
+            writer.writerows(fila for fila in instantanea["filas"] if id(fila) not in retiradas)
+        
+        with _bloqueo_escritura:
+            if _versiones[file_path] != version or os.path.getsize(file_path) < tamano:
+                return False
+            # Las filas agregadas desde la instantánea están al final del archivo
+            with open(file_path, 'rb') as origen, open(temporal, 'ab') as destino:
+                origen.seek(tamano)
+                shutil.copyfileobj(origen, destino)
+            if confirmar is not None:
+                confirmar()
+            os.replace(temporal, file_path)
+            _versiones[file_path] += 1
+            registrar_io(_tabla(file_path), "escritura", len(instantanea["filas"]) - len(retiradas),
+                         os.path.getsize(file_path))
+            return True
+    finally:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+
+def marca_tabla(file_path):
+    """
+    Marca de las reescrituras completas de una tabla: si cambia, las
+    posiciones de sus filas (ver leer_desde) ya no son válidas
+    
+    En CSV incluye el inodo del archivo (las reescrituras lo reemplazan, también
+    las de otros procesos) y cambia si el archivo se achica; agregar filas no
+    la cambia.
+    
+    Args:
+        file_path (str): Ruta o nombre del archivo sin extensión
+    
+    Returns:
+        Marca de la tabla (comparable con ==)
+    """
+    file_path = ruta_negocio(file_path)
+    if IS_PRODUCTION:
+        return _excel_db().version(_tabla(file_path))
+    try:
+        estado = os.stat(file_path)
+    except FileNotFoundError:
+        return (_versiones[file_path], None)
+    inodo = (estado.st_dev, estado.st_ino)
+    with _bloqueo_escritura:
+        visto = _archivos_vistos.get(file_path)
+        if visto is not None and visto[0] == inodo and estado.st_size < visto[1]:
+            # Reescrito en el lugar con menos contenido (fuera de este proceso)
+            _versiones[file_path] += 1
+        _archivos_vistos[file_path] = (inodo, estado.st_size)
+        return (_versiones[file_path], inodo)
+
+def _filas_csv_desde(f, columnas, posicion, fin):
+    """Genera (posición, siguiente, fila) de un CSV abierto en binario hasta el byte `fin`"""
+    f.seek(posicion)
+    while posicion < fin:
+        linea = f.readline()
+        # Un campo entre comillas puede contener saltos de línea
+        while linea.count(b'"') % 2 and f.tell() < fin:
+            linea += f.readline()
+        siguiente = f.tell()
+        if siguiente > fin or not linea.endswith(b"\n"):
+            # Fila a medio escribir: se leerá la próxima vez
+            return
+        valores = next(csv.reader([linea.decode('utf-8')]), None)
+        if valores:
+            yield posicion, siguiente, dict(zip(columnas, valores))
+        posicion = siguiente
+
+def leer_desde(file_path, posicion=0):
+    """
+    Lee las filas agregadas a una tabla a partir de una posición, sin cargarla
+    completa en memoria (para mantener índices de forma incremental)
+    
+    Las posiciones son desplazamientos en bytes en CSV y números de fila en
+    Excel; solo son válidas mientras no cambie marca_tabla().
+    
+    Args:
+        file_path (str): Ruta o nombre del archivo sin extensión
+        posicion (int, optional): Posición desde la que leer (0: desde el principio)
+    
+    Yields:
+        tuple: (posición, posición siguiente, fila como dict de texto)
+    """
+    file_path = ruta_negocio(file_path)
+    if IS_PRODUCTION:
+        filas = _excel_db().instantanea(_tabla(file_path))["filas"]
+        for numero in range(posicion, len(filas)):
+            yield numero, numero + 1, filas[numero]
+        return
+    
+    if not os.path.exists(file_path):
+        return
+    with open(file_path, 'rb') as f:
+        fin = os.fstat(f.fileno()).st_size
+        encabezado = f.readline()
+        columnas = next(csv.reader([encabezado.decode('utf-8')]), [])
+        yield from _filas_csv_desde(f, columnas, max(posicion, f.tell()), fin)
+
+def leer_en_posiciones(file_path, posiciones):
+    """
+    Lee filas sueltas de una tabla por su posición (ver leer_desde)
+    
+    Args:
+        file_path (str): Ruta o nombre del archivo sin extensión
+        posiciones (list): Posiciones de las filas
+    
+    Returns:
+        list: Filas (dict de texto), None para las posiciones que ya no existen
+    """
+    file_path = ruta_negocio(file_path)
+    if IS_PRODUCTION:
+        filas = _excel_db().instantanea(_tabla(file_path))["filas"]
+        return [filas[posicion] if 0 <= posicion < len(filas) else None for posicion in posiciones]
+    
+    resultado = []
+    with open(file_path, 'rb') as f:
+        fin = os.fstat(f.fileno()).st_size
+        columnas = next(csv.reader([f.readline().decode('utf-8')]), [])
+        for posicion in posiciones:
+            leida = next(_filas_csv_desde(f, columnas, posicion, fin), None)
+            resultado.append(leida[2] if leida else None)
+    registrar_io(_tabla(file_path), "lectura", len(resultado))
+    return resultado
+
+def checkpoint_storage():
+    """
+    Guarda en disco los cambios pendientes del backend (solo aplica a los
+    libros de Excel en memoria de producción, el compartido y los de cada
+    negocio cargado; el CSV escribe directamente)
+    
+    Returns:
+        bool: True si se guardó correctamente o no había nada pendiente
+    """
+    if IS_PRODUCTION:
+        from utils.excel_db import excel_db
+        compartido = excel_db.checkpoint()
+        return registro_negocios.checkpoint() and compartido
+    return True
@@ -0,0 +1,319 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict, deque
+
+from telegram.error import RetryAfter
+from telegram.ext import BaseRateLimiter
+
+from config import (
+    ENVIOS_GLOBAL_POR_SEGUNDO, ENVIOS_CHAT_POR_SEGUNDO, ENVIOS_GRUPO_POR_MINUTO,
+    ENVIOS_MAX_REINTENTOS
+)
+
+# Configuración de logging
+logger = logging.getLogger(__name__)
+
+# Clases de prioridad (menor valor = se atiende antes). Se pasan a los métodos del
+# bot con rate_limit_args, p. ej. bot.send_message(..., rate_limit_args=PRIORIDAD_MASIVA)
+PRIORIDAD_INTERACTIVA = 0
+PRIORIDAD_MASIVA = 1
+
+# Longitud máxima de un mensaje de Telegram
+MAX_LONGITUD_MENSAJE = 4096
+
+# Métodos que no cuentan para los límites de envío
+_METODOS_SIN_LIMITE = {"getUpdates", "getMe", "setWebhook", "deleteWebhook", "getWebhookInfo"}
+
+def _segundos(retry_after):
+    """Convierte RetryAfter.retry_after (int o timedelta según la versión) a segundos"""
+    if hasattr(retry_after, 'total_seconds'):
+        return retry_after.total_seconds()
+    return float(retry_after)
+
+class TokenBucket:
+    """
+    Cubeta de fichas: permite ráfagas de hasta `capacidad` operaciones y
+    repone `tasa` fichas por segundo. La capacidad es al menos 1: con menos
+    nunca se juntaría una ficha entera (p. ej. ENVIOS_CHAT_POR_SEGUNDO=0.5).
+    """
+
+    __slots__ = ("capacidad", "tasa", "_fichas", "_ultimo")
+
+    def __init__(self, capacidad, tasa):
+        self.capacidad = max(1.0, float(capacidad))
+        self.tasa = float(tasa)
+        self._fichas = self.capacidad
+        self._ultimo = time.monotonic()
+
+    def _reponer(self):
+        ahora = time.monotonic()
+        self._fichas = min(self.capacidad, self._fichas + (ahora - self._ultimo) * self.tasa)
+        self._ultimo = ahora
+
+    def tiempo_espera(self, fichas=1):
+        """Segundos que faltan para disponer de `fichas` (0 si ya están disponibles)"""
+        self._reponer()
+        if self._fichas >= fichas:
+            return 0.0
+        return (fichas - self._fichas) / self.tasa
+
+    def consumir(self, fichas=1):
+        """Consume fichas si hay suficientes; devuelve True si se consumieron"""
+        self._reponer()
+        if self._fichas >= fichas:
+            self._fichas -= fichas
+            return True
+        return False
+
+    @property
+    def llena(self):
+        """True si la cubeta está completa (el cliente lleva tiempo sin consumir)"""
+        self._reponer()
+        return self._fichas >= self.capacidad
+
+class LimitadorEnvios(BaseRateLimiter):
+    """
+    Limitador de peticiones salientes a la API de Telegram.
+
+    Aplica una cubeta global y una por chat (más restrictiva para grupos),
+    atiende antes las peticiones interactivas que las masivas y, ante un
+    RetryAfter, pausa todos los envíos el tiempo indicado y reintenta.
+    """
+
+    def __init__(self, global_por_segundo=ENVIOS_GLOBAL_POR_SEGUNDO,
+                 chat_por_segundo=ENVIOS_CHAT_POR_SEGUNDO,
+                 grupo_por_minuto=ENVIOS_GRUPO_POR_MINUTO,
+                 max_reintentos=ENVIOS_MAX_REINTENTOS):
+        self._global = TokenBucket(global_por_segundo, global_por_segundo)
+        self._chat_por_segundo = chat_por_segundo
+        self._grupo_por_minuto = grupo_por_minuto
+        self._max_reintentos = max_reintentos
+        self._cubetas_chat = {}
+        self._interactivas_esperando = 0
+        self._pausa_hasta = 0.0
+        self.estadisticas = {"peticiones": 0, "esperas": 0, "retry_after": 0}
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+    def _cubeta_chat(self, chat_id):
+        cubeta = self._cubetas_chat.get(chat_id)
+        if cubeta is None:
+            if len(self._cubetas_chat) > 1000:
+                # Olvidar chats inactivos (cubeta llena) para no crecer sin límite
+                self._cubetas_chat = {c: b for c, b in self._cubetas_chat.items() if not b.llena}
+            if str(chat_id).startswith('-'):
+                # Grupos y canales: N mensajes por minuto
+                cubeta = TokenBucket(self._grupo_por_minuto, self._grupo_por_minuto / 60)
+            else:
+                cubeta = TokenBucket(self._chat_por_segundo, self._chat_por_segundo)
+            self._cubetas_chat[chat_id] = cubeta
+        return cubeta
+
+    async def _adquirir(self, prioridad, chat_id):
+        cubeta_chat = self._cubeta_chat(chat_id) if chat_id is not None else None
+        interactiva = prioridad <= PRIORIDAD_INTERACTIVA
+        if interactiva:
+            self._interactivas_esperando += 1
+        try:
+            while True:
+                espera = self._pausa_hasta - time.monotonic()
+                if espera <= 0 and not interactiva and self._interactivas_esperando:
+                    # Ceder el paso a las peticiones interactivas pendientes
+                    espera = 0.05
+                if espera <= 0:
+                    espera = max(
+                        self._global.tiempo_espera(),
+                        cubeta_chat.tiempo_espera() if cubeta_chat else 0.0
+                    )
+                if espera <= 0:
+                    self._global.consumir()
+                    if cubeta_chat:
+                        cubeta_chat.consumir()
+                    return
+                self.estadisticas["esperas"] += 1
+                await asyncio.sleep(espera)
+        finally:
+            if interactiva:
+                self._interactivas_esperando -= 1
+
+    async def process_request(self, callback, args, kwargs, endpoint, data, rate_limit_args):
+        if endpoint in _METODOS_SIN_LIMITE:
+            return await callback(*args, **kwargs)
+
+        prioridad = rate_limit_args if isinstance(rate_limit_args, int) else PRIORIDAD_INTERACTIVA
+        chat_id = data.get('chat_id') if data else None
+
+        for intento in range(self._max_reintentos + 1):
+            await self._adquirir(prioridad, chat_id)
+            self.estadisticas["peticiones"] += 1
+            try:
+                return await callback(*args, **kwargs)
+            except RetryAfter as e:
+                if intento >= self._max_reintentos:
+                    raise
+                segundos = _segundos(e.retry_after)
+                self.estadisticas["retry_after"] += 1
+                logger.warning(f"Límite de Telegram alcanzado en {endpoint}, reintentando en {segundos}s")
+                # Pausar todos los envíos: el límite excedido puede ser global
+                self._pausa_hasta = max(self._pausa_hasta, time.monotonic() + segundos)
+
+class ColaEnvios:
+    """
+    Cola de envíos con prioridad para mensajes no interactivos (reportes,
+    notificaciones a varios usuarios).
+
+    Los mensajes pendientes de un mismo chat, con la misma prioridad y
+    opciones, se combinan en uno solo mientras no superen el largo máximo de
+    Telegram. Se envía como máximo un mensaje a la vez por chat, conservando
+    el orden, y los envíos pasan por el LimitadorEnvios del bot.
+    """
+
+    def __init__(self, max_envios_simultaneos=10):
+        self._max_envios_simultaneos = max_envios_simultaneos
+        self._bot = None
+        self._trabajador = None
+        self._semaforo = None
+        self._hay_trabajo = None
+        # {prioridad: OrderedDict(chat_id -> deque[(texto, opciones, futuro)])}
+        self._colas = {}
+        self._en_vuelo = set()
+        # Tareas de envío en curso: asyncio solo guarda referencias débiles a las tareas
+        self._tareas = set()
+        self.estadisticas = {"encolados": 0, "enviados": 0, "combinados": 0, "errores": 0}
+
+    def iniciar(self, bot):
+        """Arranca el trabajador de la cola (llamar con el event loop en marcha)"""
+        self._bot = bot
+        self._semaforo = asyncio.Semaphore(self._max_envios_simultaneos)
+        self._hay_trabajo = asyncio.Event()
+        self._trabajador = asyncio.create_task(self._trabajar(), name="ColaEnvios")
+
+    async def detener(self):
+        """
+        Detiene el trabajador y los envíos en curso; los mensajes pendientes se
+        descartan y sus futuros fallan con RuntimeError
+        """
+        if self._trabajador is not None:
+            self._trabajador.cancel()
+            try:
+                await self._trabajador
+            except asyncio.CancelledError:
+                pass
+            self._trabajador = None
+
+        tareas = list(self._tareas)
+        for tarea in tareas:
+            tarea.cancel()
+        await asyncio.gather(*tareas, return_exceptions=True)
+
+        error = RuntimeError("La cola de envíos se detuvo")
+        for cola in self._colas.values():
+            for mensajes in cola.values():
+                for _texto, _opciones, futuro in mensajes:
+                    if not futuro.done():
+                        futuro.set_exception(error)
+        self._colas.clear()
+
+    @property
+    def pendientes(self):
+        """Cantidad de mensajes en cola"""
+        return sum(len(mensajes) for cola in self._colas.values() for mensajes in cola.values())
+
+    def encolar(self, chat_id, texto, prioridad=PRIORIDAD_MASIVA, **opciones):
+        """
+        Encola un mensaje de texto
+
+        Args:
+            chat_id (int): Chat de destino
+            texto (str): Texto del mensaje
+            prioridad (int, optional): PRIORIDAD_INTERACTIVA o PRIORIDAD_MASIVA
+            **opciones: Argumentos adicionales para bot.send_message (parse_mode, ...)
+
+        Returns:
+            Future: Se resuelve con el Message enviado (o la excepción del envío)
+        """
+        futuro = asyncio.get_running_loop().create_future()
+        cola = self._colas.setdefault(prioridad, OrderedDict())
+        cola.setdefault(chat_id, deque()).append((texto, opciones, futuro))
+        self.estadisticas["encolados"] += 1
+        if self._hay_trabajo is not None:
+            self._hay_trabajo.set()
+        return futuro
+
+    def _siguiente_lote(self):
+        """Toma el siguiente lote combinable: prioridad más alta, chat más antiguo libre"""
+        for prioridad in sorted(self._colas):
+            cola = self._colas[prioridad]
+            for chat_id in cola:
+                if chat_id in self._en_vuelo:
+                    continue
+                mensajes = cola[chat_id]
+                texto, opciones, futuro = mensajes.popleft()
+                textos, futuros = [texto], [futuro]
+                longitud = len(texto)
+                while mensajes and mensajes[0][1] == opciones:
+                    siguiente = mensajes[0][0]
+                    if longitud + 2 + len(siguiente) > MAX_LONGITUD_MENSAJE:
+                        break
+                    _, _, futuro_siguiente = mensajes.popleft()
+                    textos.append(siguiente)
+                    futuros.append(futuro_siguiente)
+                    longitud += 2 + len(siguiente)
+                if not mensajes:
+                    del cola[chat_id]
+                else:
+                    # El chat pasa al final para no acaparar la cola
+                    cola.move_to_end(chat_id)
+                return prioridad, chat_id, textos, opciones, futuros
+        return None
+
+    async def _trabajar(self):
+        while True:
+            # Tomar el lote después de tener lugar: si se cancela la espera, sus
+            # mensajes siguen en la cola y detener() los resuelve
+            await self._semaforo.acquire()
+            lote = self._siguiente_lote()
+            if lote is None:
+                self._semaforo.release()
+                self._hay_trabajo.clear()
+                await self._hay_trabajo.wait()
+                continue
+            self._en_vuelo.add(lote[1])
+            tarea = asyncio.create_task(self._enviar(*lote))
+            self._tareas.add(tarea)
+            tarea.add_done_callback(self._tareas.discard)
+
+    async def _enviar(self, prioridad, chat_id, textos, opciones, futuros):
+        try:
+            if getattr(self._bot, 'rate_limiter', None) is not None:
+                opciones = dict(opciones, rate_limit_args=prioridad)
+            mensaje = await self._bot.send_message(chat_id, "\n\n".join(textos), **opciones)
+            self.estadisticas["enviados"] += 1
+            self.estadisticas["combinados"] += len(textos) - 1
+            for futuro in futuros:
+                if not futuro.done():
+                    futuro.set_result(mensaje)
+        except asyncio.CancelledError:
+            # detener(): quien espera el mensaje no debe quedar colgado
+            for futuro in futuros:
+                if not futuro.done():
+                    futuro.set_exception(RuntimeError("La cola de envíos se detuvo"))
+            raise
+        except Exception as e:
+            self.estadisticas["errores"] += 1
+            logger.error(f"Error enviando mensaje a {chat_id}: {e}")
+            for futuro in futuros:
+                if not futuro.done():
+                    futuro.set_exception(e)
+        finally:
+            self._en_vuelo.discard(chat_id)
+            self._semaforo.release()
+            self._hay_trabajo.set()
+
+# Instancia única usada por los envíos masivos (reportes programados, avisos)
+cola_envios = ColaEnvios()
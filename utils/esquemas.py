@@ -0,0 +1,249 @@
+"""
+Esquemas de almacenamiento de las tablas del bot.
+
+Cada tabla (el nombre del archivo de config.*_FILE sin extensión, que es
+también el nombre de la hoja en Excel) declara el tipo de sus columnas. Los
+usan tanto los registros tipados de read_from_csv (utils/registros.py) como
+los DataFrames de get_dataframe, en CSV y en Excel.
+
+No confundir con los esquemas de validación de entradas de utils/validators.py.
+"""
+
+# Tipos de columna
+TEXTO = "texto"
+CATEGORIA = "categoria"     # texto con pocos valores distintos (proveedor, calidad, estado, usuario)
+NUMERO = "numero"           # montos y kilos: float64 para no perder céntimos al sumar
+PORCENTAJE = "porcentaje"   # rendimiento y margen: solo se muestran con 2 decimales, float32 basta
+ENTERO = "entero"           # ids de Telegram (pueden ser negativos en grupos) y epoch
+FECHA = "fecha"
+
+FORMATO_FECHA = '%Y-%m-%d %H:%M:%S'
+
+# Segundos UTC de la fecha de cada fila, escritos al guardarla (ver utils/db.save_to_csv):
+# los filtros por período comparan enteros en vez de volver a interpretar el texto
+CAMPO_EPOCH = "fecha_epoch"
+# Valor de las filas sin fecha válida en epochs(): anterior a cualquier fecha
+SIN_EPOCH = -(2 ** 62)
+
+# dtype de pandas por tipo (las fechas se convierten aparte)
+DTYPES = {
+    TEXTO: str,
+    CATEGORIA: "category",
+    NUMERO: "float64",
+    PORCENTAJE: "float32",
+    ENTERO: "Int64",   # entero con nulos
+}
+
+# Columnas que escriben los handlers, en el orden en que se escriben
+TABLAS = {
+    "compras": {
+        "fecha": FECHA, "proveedor": CATEGORIA, "cantidad": NUMERO, "precio_kg": NUMERO,
+        "calidad": CATEGORIA, "total": NUMERO, "usuario": CATEGORIA,
+        "kg_disponibles": NUMERO, "estado": CATEGORIA, CAMPO_EPOCH: ENTERO,
+    },
+    "proceso": {
+        "fecha": FECHA, "tipo_proceso": CATEGORIA, "cantidad": NUMERO,
+        "kg_resultantes": NUMERO, "rendimiento": PORCENTAJE, "notas": TEXTO, "usuario": CATEGORIA,
+        CAMPO_EPOCH: ENTERO,
+    },
+    "gastos": {
+        "fecha": FECHA, "categoria": CATEGORIA, "monto": NUMERO, "descripcion": TEXTO,
+        "usuario": CATEGORIA, CAMPO_EPOCH: ENTERO,
+    },
+    "ventas": {
+        "fecha": FECHA, "cliente": CATEGORIA, "tipo_cafe": CATEGORIA, "cantidad": NUMERO,
+        "precio_kg": NUMERO, "total": NUMERO, "costo": NUMERO, "utilidad": NUMERO,
+        "margen": PORCENTAJE, "usuario": CATEGORIA, CAMPO_EPOCH: ENTERO,
+    },
+    "adelantos": {
+        "fecha": FECHA, "proveedor": CATEGORIA, "monto": NUMERO, "saldo_restante": NUMERO,
+        "notas": TEXTO, "usuario": CATEGORIA, CAMPO_EPOCH: ENTERO,
+    },
+    "pedidos": {
+        "fecha": FECHA, "id": TEXTO, "cliente": CATEGORIA, "telefono": TEXTO, "cantidad": NUMERO,
+        "fecha_entrega": TEXTO, "estado": CATEGORIA, "usuario": CATEGORIA, CAMPO_EPOCH: ENTERO,
+    },
+    "pedidos_estados": {
+        "fecha": FECHA, "pedido": TEXTO, "estado": CATEGORIA, "usuario": CATEGORIA, CAMPO_EPOCH: ENTERO,
+    },
+    "linaje": {
+        "fecha": FECHA, "origen": TEXTO, "destino": TEXTO, "kg": NUMERO, CAMPO_EPOCH: ENTERO,
+    },
+    "linaje_nodos": {
+        "fecha": FECHA, "nodo": TEXTO, "kg": NUMERO, "valor": NUMERO, CAMPO_EPOCH: ENTERO,
+    },
+    "suscripciones": {
+        "chat_id": ENTERO, "tipo": CATEGORIA, "usuario": CATEGORIA, "fecha": FECHA,
+        "activa": CATEGORIA, CAMPO_EPOCH: ENTERO,
+    },
+}
+
+def esquema(tabla):
+    """
+    Columnas y tipos de una tabla
+
+    Args:
+        tabla (str): Nombre de la tabla ('compras', 'ventas', ...)
+
+    Returns:
+        dict: {columna: tipo}, o None si la tabla no tiene esquema
+    """
+    return TABLAS.get(tabla)
+
+def opciones_read_csv(tabla, columnas=None):
+    """
+    Argumentos de pandas.read_csv para leer una tabla ya tipada
+
+    Args:
+        tabla (str): Nombre de la tabla
+        columnas (list, optional): Leer solo estas columnas
+
+    Returns:
+        dict: Argumentos para read_csv (usecols, dtype, parse_dates, date_format)
+    """
+    opciones = {}
+    if columnas is not None:
+        # Las columnas pedidas que no existen en el archivo simplemente no se devuelven
+        pedidas = set(columnas)
+        opciones["usecols"] = lambda columna: columna in pedidas
+
+    campos = esquema(tabla)
+    if campos:
+        opciones["dtype"] = {
+            campo: DTYPES[tipo] for campo, tipo in campos.items() if tipo != FECHA
+        }
+        fechas = [campo for campo, tipo in campos.items()
+                  if tipo == FECHA and (columnas is None or campo in columnas)]
+        if fechas:
+            opciones["parse_dates"] = fechas
+            opciones["date_format"] = FORMATO_FECHA
+    return opciones
+
+def _tiene_tipo(columna, tipo):
+    """True si la columna ya tiene el dtype que corresponde al tipo"""
+    import pandas as pd
+
+    if tipo == FECHA:
+        return pd.api.types.is_datetime64_any_dtype(columna.dtype)
+    if tipo == CATEGORIA:
+        return isinstance(columna.dtype, pd.CategoricalDtype)
+    if tipo == TEXTO:
+        return pd.api.types.is_string_dtype(columna.dtype) and columna.dtype != object
+    return columna.dtype == DTYPES[tipo]
+
+def tipar_dataframe(df, tabla):
+    """
+    Convierte las columnas de un DataFrame a los tipos del esquema de la tabla
+
+    Los valores que no se pueden convertir quedan como nulos (NaN/NaT). Las
+    columnas que no están en el esquema, o que ya tienen su tipo, no se modifican.
+
+    Args:
+        df (DataFrame): Datos leídos sin tipos (hoja de Excel, CSV con valores inválidos)
+        tabla (str): Nombre de la tabla
+
+    Returns:
+        DataFrame: El mismo DataFrame con las columnas convertidas
+    """
+    import pandas as pd
+
+    campos = esquema(tabla)
+    if not campos:
+        return df
+
+    for campo, tipo in campos.items():
+        if campo not in df.columns:
+            continue
+        columna = df[campo]
+        if _tiene_tipo(columna, tipo):
+            continue
+        if tipo == FECHA:
+            df[campo] = pd.to_datetime(columna, format=FORMATO_FECHA, errors="coerce")
+        elif tipo in (NUMERO, PORCENTAJE):
+            df[campo] = pd.to_numeric(columna, errors="coerce").astype(DTYPES[tipo])
+        elif tipo == ENTERO:
+            numeros = pd.to_numeric(columna, errors="coerce")
+            # Solo valores enteros; los demás quedan nulos
+            df[campo] = numeros.where(numeros.isna() | (numeros % 1 == 0)).astype(DTYPES[tipo])
+        elif tipo == CATEGORIA:
+            df[campo] = columna.where(columna.isna(), columna.astype(str)).astype("category")
+        else:
+            # Volver a poner los nulos después de convertir: astype(str) los
+            # escribiría como 'nan' o 'None', y update_csv los guardaría así
+            df[campo] = columna.astype(DTYPES[tipo]).where(columna.notna(), None)
+    return df
+
+def dataframe_vacio(tabla, columnas=None):
+    """
+    DataFrame vacío con las columnas (y tipos) de la tabla, para que los
+    llamadores puedan filtrar por columna aunque todavía no haya datos
+
+    Args:
+        tabla (str): Nombre de la tabla
+        columnas (list, optional): Columnas a incluir
+
+    Returns:
+        DataFrame: DataFrame sin filas
+    """
+    import pandas as pd
+
+    campos = esquema(tabla) or {}
+    if columnas is None:
+        columnas = list(campos)
+    df = pd.DataFrame({columna: pd.Series(dtype=object) for columna in columnas})
+    return tipar_dataframe(df, tabla)
+
+def epochs(df):
+    """
+    Segundos UTC de la fecha de cada fila como array de NumPy (int64), para
+    filtrar y agrupar por período con comparaciones enteras vectorizadas
+
+    Usa la columna fecha_epoch; las filas guardadas antes de que existiera se
+    calculan desde fecha en la zona horaria del negocio. Las filas sin fecha
+    válida quedan en SIN_EPOCH.
+
+    Args:
+        df (DataFrame): Datos de una tabla (ver utils/db.get_dataframe)
+
+    Returns:
+        ndarray: Un entero por fila
+    """
+    import numpy as np
+    import pandas as pd
+    from utils.helpers import zona_horaria
+
+    resultado = np.full(len(df), SIN_EPOCH, dtype=np.int64)
+    faltan = np.ones(len(df), dtype=bool)
+    if CAMPO_EPOCH in df.columns:
+        columna = pd.to_numeric(df[CAMPO_EPOCH], errors="coerce")
+        faltan = columna.isna().to_numpy()
+        resultado[~faltan] = columna[~faltan].to_numpy(dtype=np.int64)
+    if faltan.any() and "fecha" in df.columns:
+        fechas = pd.to_datetime(df["fecha"][faltan], format=FORMATO_FECHA, errors="coerce")
+        if fechas.dt.tz is None:
+            fechas = fechas.dt.tz_localize(zona_horaria().zone, ambiguous=False, nonexistent="shift_forward")
+        segundos = (fechas - pd.Timestamp(0, tz="UTC")) // pd.Timedelta(seconds=1)
+        resultado[faltan] = segundos.fillna(SIN_EPOCH).to_numpy(dtype=np.int64)
+    return resultado
+
+def filtrar_periodo(df, desde=None, hasta=None):
+    """
+    Filas de un DataFrame dentro de un período (ver epochs)
+
+    Args:
+        df (DataFrame): Datos de una tabla
+        desde (datetime, optional): Inicio del período (incluido)
+        hasta (datetime, optional): Fin del período (excluido)
+
+    Returns:
+        DataFrame: Filas del período
+    """
+    from utils.helpers import fecha_a_epoch
+
+    segundos = epochs(df)
+    mascara = segundos > SIN_EPOCH
+    if desde is not None:
+        mascara &= segundos >= fecha_a_epoch(desde)
+    if hasta is not None:
+        mascara &= segundos < fecha_a_epoch(hasta)
+    return df[mascara]
@@ -0,0 +1,367 @@
+import atexit
+import logging
+import os
+import sys
+import threading
+from collections import Counter
+
+from config import EXCEL_FILE, EXCEL_FLUSH_INTERVAL
+from utils.esquemas import dataframe_vacio, tipar_dataframe
+from utils.metricas import registrar_cache
+
+# Configuración de logging
+logger = logging.getLogger(__name__)
+
+class ExcelDB:
+    """
+    Backend de almacenamiento en un libro de Excel para producción.
+
+    El libro se carga una sola vez y se mantiene en memoria. Las escrituras
+    solo modifican la copia en memoria y marcan la hoja como modificada; las
+    hojas modificadas se guardan en disco:
+      - como máximo `flush_interval` segundos después del primer cambio pendiente,
+      - al llamar a checkpoint(),
+      - al cerrar el proceso (atexit) o el bot (close()).
+    Las lecturas (get_dataframe) se sirven desde memoria sin tocar el disco.
+    """
+
+    def __init__(self, file_path, flush_interval=EXCEL_FLUSH_INTERVAL):
+        self.file_path = file_path
+        self.flush_interval = flush_interval
+
+        # Protege las hojas en memoria, el conjunto de hojas modificadas y el temporizador
+        self._lock = threading.RLock()
+        # Serializa las escrituras a disco (el libro de openpyxl no es thread-safe)
+        self._flush_lock = threading.Lock()
+
+        self._libro = None
+        # {nombre_hoja: {"columnas": [...], "filas": [dict, ...]}}
+        self._hojas = None
+        self._modificadas = set()
+        self._dataframes = {}
+        self._temporizador = None
+        # Reemplazos completos de cada hoja, para detectar instantáneas desactualizadas
+        self._versiones = Counter()
+
+    def _cargar(self):
+        """Carga el libro desde disco la primera vez que se necesita"""
+        if self._hojas is not None:
+            return
+
+        from openpyxl import Workbook, load_workbook
+
+        hojas = {}
+        if os.path.exists(self.file_path):
+            libro = load_workbook(self.file_path)
+            for hoja in libro.worksheets:
+                filas = hoja.iter_rows(values_only=True)
+                encabezado = next(filas, None)
+                if not encabezado:
+                    hojas[hoja.title] = {"columnas": [], "filas": []}
+                    continue
+                columnas = [str(columna) for columna in encabezado if columna is not None]
+                hojas[hoja.title] = {
+                    "columnas": columnas,
+                    "filas": [
+                        dict(zip(columnas, fila))
+                        for fila in filas
+                        if any(valor is not None for valor in fila)
+                    ],
+                }
+            logger.info(f"Libro de Excel cargado en memoria: {self.file_path} ({len(hojas)} hojas)")
+        else:
+            libro = Workbook()
+            # Eliminar la hoja vacía por defecto; las hojas se crean al escribir
+            libro.remove(libro.active)
+
+        self._libro = libro
+        self._hojas = hojas
+
+    def _obtener_hoja(self, sheet_name, crear=False):
+        self._cargar()
+        hoja = self._hojas.get(sheet_name)
+        if hoja is None and crear:
+            hoja = {"columnas": [], "filas": []}
+            self._hojas[sheet_name] = hoja
+        return hoja
+
+    def _marcar_modificada(self, sheet_name):
+        """Marca una hoja como modificada y programa el guardado diferido"""
+        self._modificadas.add(sheet_name)
+        self._dataframes.pop(sheet_name, None)
+
+        if self._temporizador is None and self.flush_interval > 0:
+            self._temporizador = threading.Timer(self.flush_interval, self._flush_programado)
+            self._temporizador.daemon = True
+            self._temporizador.start()
+
+    def _flush_programado(self):
+        with self._lock:
+            self._temporizador = None
+        self.flush()
+
+    def append_data(self, sheet_name, data, confirmar=None):
+        """
+        Agrega una fila a una hoja
+
+        Args:
+            sheet_name (str): Nombre de la hoja
+            data (dict): Datos de la fila
+            confirmar (callable, optional): Se llama con la hoja bloqueada después
+                de agregarla (p. ej. para publicar el cambio en el mismo orden)
+
+        Returns:
+            bool: True si se agregó correctamente
+        """
+        with self._lock:
+            hoja = self._obtener_hoja(sheet_name, crear=True)
+            for columna in data:
+                if columna not in hoja["columnas"]:
+                    hoja["columnas"].append(columna)
+            hoja["filas"].append(dict(data))
+            self._marcar_modificada(sheet_name)
+            if confirmar is not None:
+                confirmar()
+        return True
+
+    def update_data(self, sheet_name, id_field, record_id, updates, anteriores=None, confirmar=None):
+        """
+        Actualiza las filas cuyo campo id_field coincide con record_id
+
+        Args:
+            sheet_name (str): Nombre de la hoja
+            id_field (str): Campo identificador
+            record_id: Valor del identificador
+            updates (dict): Campos a actualizar
+            anteriores (list, optional): Si se indica, se le agrega una copia de
+                cada fila actualizada tal como estaba antes
+            confirmar (callable, optional): Se llama con la hoja bloqueada después
+                de actualizar al menos una fila
+
+        Returns:
+            bool: True si se actualizó al menos una fila
+        """
+        with self._lock:
+            hoja = self._obtener_hoja(sheet_name)
+            if hoja is None:
+                return False
+
+            actualizado = False
+            for fila in hoja["filas"]:
+                valor = fila.get(id_field)
+                if valor == record_id or str(valor) == str(record_id):
+                    if anteriores is not None:
+                        anteriores.append(dict(fila))
+                    fila.update(updates)
+                    actualizado = True
+
+            if actualizado:
+                for columna in updates:
+                    if columna not in hoja["columnas"]:
+                        hoja["columnas"].append(columna)
+                self._marcar_modificada(sheet_name)
+                if confirmar is not None:
+                    confirmar()
+            return actualizado
+
+    def _save_sheet(self, sheet_name, df):
+        """
+        Reemplaza el contenido completo de una hoja
+
+        Args:
+            sheet_name (str): Nombre de la hoja
+            df (DataFrame): Nuevo contenido de la hoja
+
+        Returns:
+            bool: True si se guardó correctamente
+        """
+        with self._lock:
+            hoja = self._obtener_hoja(sheet_name, crear=True)
+            hoja["columnas"] = [str(columna) for columna in df.columns]
+            hoja["filas"] = df.to_dict('records')
+            self._versiones[sheet_name] += 1
+            self._marcar_modificada(sheet_name)
+        return True
+
+    def get_dataframe(self, sheet_name, columns=None):
+        """
+        Devuelve el contenido de una hoja como DataFrame, desde memoria
+
+        Args:
+            sheet_name (str): Nombre de la hoja
+            columns (list, optional): Devolver solo estas columnas
+
+        Returns:
+            DataFrame: Copia de los datos de la hoja con los tipos del esquema
+            de la tabla (vacío si no existe)
+        """
+        with self._lock:
+            df = self._dataframes.get(sheet_name)
+            registrar_cache("excel_dataframe", df is not None)
+            if df is None:
+                hoja = self._obtener_hoja(sheet_name)
+                if hoja is None:
+                    return dataframe_vacio(sheet_name, columns)
+                import pandas as pd
+                df = tipar_dataframe(pd.DataFrame(hoja["filas"], columns=hoja["columnas"]), sheet_name)
+                self._dataframes[sheet_name] = df
+            if columns is not None:
+                # Copiar solo las columnas pedidas que existen en la hoja
+                return df[[columna for columna in columns if columna in df.columns]].copy()
+            # Devolver una copia para que los llamadores no modifiquen la caché
+            return df.copy()
+
+    def instantanea(self, sheet_name):
+        """
+        Copia de la lista de filas de una hoja (las filas son las mismas de la
+        hoja, sin copiar), con la versión actual de la hoja
+
+        Args:
+            sheet_name (str): Nombre de la hoja
+
+        Returns:
+            dict: {"columnas": [...], "filas": [dict, ...], "marca": versión}
+        """
+        with self._lock:
+            hoja = self._obtener_hoja(sheet_name)
+            if hoja is None:
+                return {"columnas": [], "filas": [], "marca": None}
+            return {
+                "columnas": list(hoja["columnas"]),
+                "filas": list(hoja["filas"]),
+                "marca": self._versiones[sheet_name],
+            }
+
+    def version(self, sheet_name):
+        """
+        Versión de una hoja (cambia cuando se reemplaza o se le quitan filas),
+        sin copiar sus filas como instantanea()
+
+        Returns:
+            int: Versión, o None si la hoja no existe
+        """
+        with self._lock:
+            if self._obtener_hoja(sheet_name) is None:
+                return None
+            return self._versiones[sheet_name]
+
+    def retirar_filas(self, sheet_name, marca, retiradas, confirmar=None):
+        """
+        Quita filas tomadas de una instantánea
+
+        Args:
+            sheet_name (str): Nombre de la hoja
+            marca: Versión de la hoja en la instantánea
+            retiradas (set): id() de las filas a quitar
+            confirmar (callable, optional): Se llama con la hoja bloqueada antes de quitarlas
+
+        Returns:
+            bool: False si la hoja se reemplazó desde la instantánea
+        """
+        with self._lock:
+            hoja = self._obtener_hoja(sheet_name)
+            if hoja is None or self._versiones[sheet_name] != marca:
+                return False
+            if confirmar is not None:
+                confirmar()
+            hoja["filas"] = [fila for fila in hoja["filas"] if id(fila) not in retiradas]
+            self._versiones[sheet_name] += 1
+            self._marcar_modificada(sheet_name)
+        return True
+
+    def liberar_cache(self):
+        """Descarta los DataFrames en caché (se reconstruyen al pedirlos)"""
+        with self._lock:
+            self._dataframes.clear()
+
+    def memoria(self):
+        """
+        Bytes aproximados del libro en memoria: las filas de cada hoja
+        (estimadas a partir de una muestra) y los DataFrames en caché
+
+        Returns:
+            int: Bytes aproximados
+        """
+        with self._lock:
+            total = sum(int(df.memory_usage(deep=True).sum()) for df in self._dataframes.values())
+            for hoja in (self._hojas or {}).values():
+                filas = hoja["filas"]
+                if not filas:
+                    continue
+                muestra = filas[:100]
+                por_fila = sum(
+                    sys.getsizeof(fila) + sum(sys.getsizeof(valor) for valor in fila.values())
+                    for fila in muestra
+                ) / len(muestra)
+                total += int(por_fila * len(filas))
+            return total
+
+    def flush(self):
+        """
+        Guarda en disco las hojas modificadas desde el último guardado
+
+        Returns:
+            bool: True si no hubo errores
+        """
+        with self._flush_lock:
+            # Tomar una instantánea de las hojas modificadas sin bloquear a los escritores
+            # mientras se escribe el archivo
+            with self._lock:
+                if not self._modificadas:
+                    return True
+                pendientes = {
+                    nombre: (list(self._hojas[nombre]["columnas"]),
+                             [tuple(fila.get(columna) for columna in self._hojas[nombre]["columnas"])
+                              for fila in self._hojas[nombre]["filas"]])
+                    for nombre in self._modificadas
+                }
+                self._modificadas.clear()
+
+            try:
+                for nombre, (columnas, filas) in pendientes.items():
+                    # Reemplazar solo las hojas modificadas, conservando su posición
+                    if nombre in self._libro.sheetnames:
+                        posicion = self._libro.sheetnames.index(nombre)
+                        self._libro.remove(self._libro[nombre])
+                        hoja = self._libro.create_sheet(nombre, posicion)
+                    else:
+                        hoja = self._libro.create_sheet(nombre)
+                    hoja.append(columnas)
+                    for fila in filas:
+                        hoja.append(fila)
+
+                # Escritura atómica: guardar en un temporal y reemplazar
+                temporal = f"{self.file_path}.tmp"
+                self._libro.save(temporal)
+                os.replace(temporal, self.file_path)
+                logger.debug(f"Libro de Excel guardado ({', '.join(pendientes)})")
+                return True
+            except Exception as e:
+                logger.error(f"Error al guardar el libro de Excel: {e}")
+                # Volver a marcar las hojas para reintentar en el próximo guardado
+                with self._lock:
+                    for nombre in pendientes:
+                        self._marcar_modificada(nombre)
+                return False
+
+    def checkpoint(self):
+        """
+        Fuerza el guardado inmediato de los cambios pendientes
+
+        Returns:
+            bool: True si no hubo errores
+        """
+        with self._lock:
+            if self._temporizador is not None:
+                self._temporizador.cancel()
+                self._temporizador = None
+        return self.flush()
+
+    def close(self):
+        """Guarda los cambios pendientes antes de terminar"""
+        if self._hojas is not None:
+            self.checkpoint()
+
+# Instancia única usada por utils.db
+excel_db = ExcelDB(EXCEL_FILE)
+atexit.register(excel_db.close)
@@ -1,31 +1,144 @@
-from datetime import datetime
+from datetime import date, datetime, time, timedelta
+from functools import lru_cache
 import locale
-import os
+import logging
 
-# Intentar configurar el locale para formateo de moneda
-try:
-    # Configuración para español de Perú (para formateo de moneda)
-    locale.setlocale(locale.LC_ALL, 'es_PE.UTF-8')
-except:
-    try:
-        # Alternativa: español genérico
-        locale.setlocale(locale.LC_ALL, 'es_ES.UTF-8')
-    except:
+logger = logging.getLogger(__name__)
+
+# Locales a intentar, en orden de preferencia
+_LOCALES_PREFERIDOS = (
+    'es_PE.UTF-8',  # Español de Perú (para formateo de moneda)
+    'es_ES.UTF-8',  # Alternativa: español genérico
+    'Spanish',      # Alternativa en Windows
+)
+
+@lru_cache(maxsize=None)
+def configurar_locale():
+    """
+    Configura el locale para formateo de moneda. Se ejecuta una sola vez
+    (el resultado queda en caché) y no al importar el módulo, para no
+    retrasar el arranque del bot.
+    
+    Returns:
+        str: Locale configurado
+    """
+    for nombre in _LOCALES_PREFERIDOS:
         try:
-            # Alternativa en Windows
-            locale.setlocale(locale.LC_ALL, 'Spanish')
-        except:
-            # Si todo falla, usar configuración por defecto
-            locale.setlocale(locale.LC_ALL, '')
+            return locale.setlocale(locale.LC_ALL, nombre)
+        except locale.Error:
+            continue
+    
+    # Si todo falla, usar configuración por defecto
+    logger.debug("No se encontró un locale en español, usando el del sistema")
+    return locale.setlocale(locale.LC_ALL, '')
+
+@lru_cache(maxsize=None)
+def zona_horaria():
+    """Zona horaria del negocio (config.ZONA_HORARIA), importando pytz la primera vez"""
+    import pytz
+    from config import ZONA_HORARIA
+    return pytz.timezone(ZONA_HORARIA)
+
+def ahora():
+    """
+    Fecha y hora actual en la zona horaria del negocio, independiente de la
+    zona del servidor
+    
+    Returns:
+        datetime: Fecha con zona horaria
+    """
+    return datetime.now(zona_horaria())
+
+def inicio_del_dia(dias_atras=0):
+    """
+    Medianoche de hoy (o de hace unos días) en la zona horaria del negocio
+    
+    Args:
+        dias_atras (int, optional): Días antes de hoy
+    
+    Returns:
+        datetime: Fecha con zona horaria
+    """
+    dia = ahora().date() - timedelta(days=dias_atras)
+    return zona_horaria().localize(datetime.combine(dia, time.min))
+
+def inicio_del_mes(meses_atras=0):
+    """
+    Medianoche del primer día del mes en curso (o de hace unos meses) en la
+    zona horaria del negocio
+    
+    Args:
+        meses_atras (int, optional): Meses antes del actual
+    
+    Returns:
+        datetime: Fecha con zona horaria
+    """
+    hoy = ahora().date()
+    anio, mes = divmod(hoy.year * 12 + hoy.month - 1 - meses_atras, 12)
+    return zona_horaria().localize(datetime(anio, mes + 1, 1))
+
+def fecha_a_epoch(fecha):
+    """
+    Convierte una fecha a segundos desde 1970-01-01 UTC
+    
+    Las fechas sin zona horaria (como los textos que guardan los handlers) se
+    interpretan en la zona del negocio; la hora que se repite al volver del
+    horario de verano se toma como la del horario estándar.
+    
+    Args:
+        fecha: datetime, date, texto 'YYYY-MM-DD[ HH:MM:SS]' o vacío
+    
+    Returns:
+        int: Segundos, o None si la fecha está vacía o no es válida
+    """
+    if isinstance(fecha, str):
+        try:
+            fecha = datetime.fromisoformat(fecha)
+        except ValueError:
+            return None
+    elif isinstance(fecha, date) and not isinstance(fecha, datetime):
+        fecha = datetime.combine(fecha, time.min)
+    if not isinstance(fecha, datetime):
+        return None
+    if fecha.tzinfo is not None:
+        return int(fecha.timestamp())
+    desfase = _desfase_utc(fecha.year, fecha.month, fecha.day, fecha.hour)
+    return (fecha - _EPOCH_LOCAL) // _UN_SEGUNDO - desfase
+
+_EPOCH_LOCAL = datetime(1970, 1, 1)
+_UN_SEGUNDO = timedelta(seconds=1)
+
+@lru_cache(maxsize=16384)
+def _desfase_utc(anio, mes, dia, hora):
+    """
+    Segundos de diferencia con UTC de una hora local del negocio. Los cambios
+    de horario ocurren en horas exactas, así que basta calcularlo una vez por
+    hora: localizar fila por fila con pytz es unas diez veces más lento
+    """
+    local = zona_horaria().localize(datetime(anio, mes, dia, hora), is_dst=False)
+    return int(local.utcoffset().total_seconds())
+
+def epoch_a_fecha(epoch):
+    """
+    Convierte segundos desde 1970-01-01 UTC a fecha en la zona del negocio
+    
+    Args:
+        epoch (int): Segundos
+    
+    Returns:
+        datetime: Fecha con zona horaria
+    """
+    return datetime.fromtimestamp(epoch, zona_horaria())
 
 def get_current_timestamp():
     """
     Obtiene la fecha y hora actual en formato YYYY-MM-DD HH:MM:SS
+    (en la zona horaria del negocio)
     
     Returns:
         str: Timestamp actual formateado
     """
-    return datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    return ahora().strftime('%Y-%m-%d %H:%M:%S')
 
 def get_current_date():
     """
@@ -34,7 +147,7 @@ def get_current_date():
     Returns:
         str: Fecha actual formateada
     """
-    return datetime.now().strftime('%Y-%m-%d')
+    return ahora().strftime('%Y-%m-%d')
 
 def get_current_time():
     """
@@ -43,7 +156,7 @@ def get_current_time():
     Returns:
         str: Hora actual formateada
     """
-    return datetime.now().strftime('%H:%M:%S')
+    return ahora().strftime('%H:%M:%S')
 
 def format_currency(amount):
     """
@@ -0,0 +1,192 @@
+import asyncio
+import logging
+from collections import namedtuple
+
+# Configuración de logging
+logger = logging.getLogger(__name__)
+
+# Solicitud HTTP ya leída: encabezados con nombres en minúsculas
+Solicitud = namedtuple('Solicitud', ['metodo', 'ruta', 'encabezados', 'cuerpo'])
+
+# Respuesta HTTP: código, cuerpo (bytes) y encabezados adicionales
+Respuesta = namedtuple('Respuesta', ['estado', 'cuerpo', 'encabezados'])
+
+_TEXTOS_ESTADO = {
+    200: "OK",
+    400: "Bad Request",
+    403: "Forbidden",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    500: "Internal Server Error",
+    503: "Service Unavailable",
+}
+
+def respuesta(estado, cuerpo=b"", content_type="text/plain; charset=utf-8", encabezados=None):
+    """
+    Construye una respuesta HTTP
+
+    Args:
+        estado (int): Código de estado HTTP
+        cuerpo (bytes|str, optional): Cuerpo de la respuesta
+        content_type (str, optional): Tipo de contenido
+        encabezados (dict, optional): Encabezados adicionales
+
+    Returns:
+        Respuesta: Respuesta lista para enviar
+    """
+    if isinstance(cuerpo, str):
+        cuerpo = cuerpo.encode('utf-8')
+    extra = {"Content-Type": content_type}
+    extra.update(encabezados or {})
+    return Respuesta(estado, cuerpo, extra)
+
+class ServidorHTTP:
+    """
+    Servidor HTTP/1.1 mínimo sobre asyncio, sin dependencias externas.
+
+    Pensado para endpoints internos del bot (webhook de Telegram, métricas):
+    rutas exactas, cuerpos con Content-Length y conexiones keep-alive.
+    """
+
+    def __init__(self, host, port, max_body=1024 * 1024, timeout=30):
+        self.host = host
+        self.port = port
+        self.max_body = max_body
+        self.timeout = timeout
+        self._rutas = {}
+        self._prefijos = []
+        self._servidor = None
+        # Conexiones abiertas, para cerrarlas ordenadamente al detener
+        self._conexiones = {}
+
+    def agregar_ruta(self, metodo, ruta, handler):
+        """
+        Registra un handler para un método y ruta exactos
+
+        Args:
+            metodo (str): Método HTTP (GET, POST, ...)
+            ruta (str): Ruta exacta, sin query string
+            handler: Corrutina que recibe una Solicitud y devuelve una Respuesta
+        """
+        self._rutas[(metodo.upper(), ruta)] = handler
+
+    def agregar_ruta_prefijo(self, metodo, prefijo, handler):
+        """
+        Registra un handler para todas las rutas que empiezan con un prefijo.
+        Las rutas exactas tienen precedencia.
+
+        Args:
+            metodo (str): Método HTTP (GET, POST, ...)
+            prefijo (str): Prefijo de la ruta
+            handler: Corrutina que recibe una Solicitud y devuelve una Respuesta
+        """
+        self._prefijos.append((metodo.upper(), prefijo, handler))
+
+    @property
+    def puerto(self):
+        """Puerto real en el que escucha el servidor (útil si se inició con puerto 0)"""
+        if self._servidor and self._servidor.sockets:
+            return self._servidor.sockets[0].getsockname()[1]
+        return self.port
+
+    async def iniciar(self):
+        """Empieza a aceptar conexiones"""
+        self._servidor = await asyncio.start_server(self._atender_conexion, self.host, self.port)
+        logger.info(f"Servidor HTTP escuchando en {self.host}:{self.puerto}")
+
+    async def detener(self):
+        """Deja de aceptar conexiones y cierra el servidor"""
+        if self._servidor is not None:
+            self._servidor.close()
+            for writer in list(self._conexiones.values()):
+                writer.close()
+            if self._conexiones:
+                await asyncio.gather(*self._conexiones, return_exceptions=True)
+            await self._servidor.wait_closed()
+            self._servidor = None
+
+    async def _leer_solicitud(self, reader):
+        """Lee una solicitud completa; devuelve None si la conexión se cerró"""
+        linea = await reader.readline()
+        if not linea:
+            return None
+        try:
+            metodo, objetivo, _ = linea.decode('latin-1').split(' ', 2)
+        except ValueError:
+            raise ValueError("Línea de solicitud inválida")
+
+        encabezados = {}
+        while True:
+            linea = await reader.readline()
+            if linea in (b"\r\n", b"\n", b""):
+                break
+            nombre, _, valor = linea.decode('latin-1').partition(':')
+            encabezados[nombre.strip().lower()] = valor.strip()
+
+        longitud = int(encabezados.get('content-length', '0') or 0)
+        if longitud > self.max_body:
+            raise OverflowError("Cuerpo demasiado grande")
+        cuerpo = await reader.readexactly(longitud) if longitud else b""
+        return Solicitud(metodo.upper(), objetivo.split('?', 1)[0], encabezados, cuerpo)
+
+    async def _atender_conexion(self, reader, writer):
+        tarea = asyncio.current_task()
+        self._conexiones[tarea] = writer
+        try:
+            while True:
+                try:
+                    solicitud = await asyncio.wait_for(self._leer_solicitud(reader), self.timeout)
+                except (asyncio.TimeoutError, asyncio.IncompleteReadError):
+                    break
+                except OverflowError:
+                    await self._escribir(writer, respuesta(413), cerrar=True)
+                    break
+                except ValueError:
+                    await self._escribir(writer, respuesta(400), cerrar=True)
+                    break
+                if solicitud is None:
+                    break
+
+                resultado = await self._despachar(solicitud)
+                cerrar = solicitud.encabezados.get('connection', '').lower() == 'close'
+                await self._escribir(writer, resultado, cerrar)
+                if cerrar:
+                    break
+        except ConnectionError:
+            # El cliente cerró la conexión a mitad de una solicitud o respuesta
+            pass
+        finally:
+            self._conexiones.pop(tarea, None)
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def _despachar(self, solicitud):
+        handler = self._rutas.get((solicitud.metodo, solicitud.ruta))
+        if handler is None:
+            for metodo, prefijo, handler_prefijo in self._prefijos:
+                if metodo == solicitud.metodo and solicitud.ruta.startswith(prefijo):
+                    handler = handler_prefijo
+                    break
+        if handler is None:
+            if any(ruta == solicitud.ruta for _, ruta in self._rutas):
+                return respuesta(405)
+            return respuesta(404)
+        try:
+            return await handler(solicitud)
+        except Exception as e:
+            logger.error(f"Error atendiendo {solicitud.metodo} {solicitud.ruta}: {e}")
+            return respuesta(500)
+
+    async def _escribir(self, writer, resultado, cerrar=False):
+        estado, cuerpo, encabezados = resultado
+        lineas = [f"HTTP/1.1 {estado} {_TEXTOS_ESTADO.get(estado, '')}"]
+        encabezados = dict(encabezados)
+        encabezados["Content-Length"] = str(len(cuerpo))
+        encabezados["Connection"] = "close" if cerrar else "keep-alive"
+        lineas += [f"{nombre}: {valor}" for nombre, valor in encabezados.items()]
+        writer.write(("\r\n".join(lineas) + "\r\n\r\n").encode('latin-1') + cuerpo)
+        await writer.drain()
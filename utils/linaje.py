@@ -0,0 +1,346 @@
+"""
+Linaje de los lotes: de qué compras salió cada proceso y cada venta, y el
+costo y la utilidad reales de cada lote (compra).
+
+Los enlaces se guardan al escribir los registros, en dos tablas de solo
+agregar:
+  - LINAJE_NODOS_FILE: kilos y valor de cada registro enlazado (compra:
+    cantidad y total; proceso: kilos resultantes; venta: cantidad y total);
+  - LINAJE_FILE: kilos que pasan de un registro a otro (compra -> proceso,
+    proceso -> proceso, compra o proceso -> venta).
+
+Un registro se identifica como '<tabla>/<fecha_epoch>-<n>': las fechas
+tienen resolución de segundos y dos compras del mismo segundo son lotes
+distintos, así que n numera (desde 1) los registros de la tabla con el mismo
+epoch en el orden en que se guardaron. En memoria se mantienen listas de adyacencia en ambos
+sentidos que, como el índice de /buscar (utils/busqueda.py), se ponen al día
+leyendo solo las filas nuevas. Los recorridos y los márgenes visitan solo el
+subgrafo del lote o de la venta, no las tablas.
+
+Los kilos se reparten en proporción: si un proceso recibe 60 kg de una
+compra y 40 kg de otra, el 60 % de lo que produce (y de lo que se vende de
+él) corresponde a la primera.
+"""
+import logging
+import threading
+from collections import deque
+
+from config import LINAJE_FILE, LINAJE_NODOS_FILE
+from utils.db import leer_desde, marca_tabla, save_to_csv
+from utils.esquemas import CAMPO_EPOCH
+from utils.helpers import fecha_a_epoch, get_current_timestamp, parse_float
+from utils.negocios import cache_negocio
+
+# Logger
+logger = logging.getLogger(__name__)
+
+COMPRAS, PROCESO, VENTAS = "compras", "proceso", "ventas"
+
+# Campos de kilos y valor de los registros de cada tabla
+CAMPOS_NODO = {
+    COMPRAS: ("cantidad", "total"),
+    PROCESO: ("kg_resultantes", None),
+    VENTAS: ("cantidad", "total"),
+}
+
+CACHE_LINAJE = "linaje_lotes"
+
+# Serializa la puesta al día de las listas de adyacencia y la numeración de los nodos
+_lock = threading.Lock()
+
+def nodo(tabla, epoch, secuencia=1):
+    """Id de un registro en el linaje ('compras/1775229300-1')"""
+    return f"{tabla}/{epoch}-{secuencia}"
+
+def tabla_de(nodo_id):
+    return nodo_id.split("/", 1)[0]
+
+def _clave_epoch(nodo_id):
+    """(tabla, epoch) de un nodo, para agrupar los registros del mismo segundo"""
+    tabla, resto = nodo_id.split("/", 1)
+    return tabla, resto.rsplit("-", 1)[0]
+
+def epoch_de(fila):
+    """Epoch de una fila guardada (su fecha_epoch, o el de su fecha)"""
+    epoch = fila.get(CAMPO_EPOCH)
+    if epoch in (None, ''):
+        return fecha_a_epoch(fila.get("fecha"))
+    return int(float(epoch))
+
+class Linaje:
+    """Listas de adyacencia del linaje de los lotes"""
+
+    def __init__(self):
+        self.marcas = None
+        self.fines = {}
+        self.nodos = {}         # nodo -> (kg, valor)
+        self.por_epoch = {}     # (tabla, epoch) -> [nodo, ...] en orden de registro
+        self.abajo = {}         # nodo -> [(destino, kg), ...]
+        self.arriba = {}        # nodo -> [(origen, kg), ...]
+
+    def actualizar(self):
+        """Lee los nodos y enlaces nuevos (o todo si alguna tabla se reescribió)"""
+        marcas = [marca_tabla(LINAJE_NODOS_FILE), marca_tabla(LINAJE_FILE)]
+        if marcas != self.marcas:
+            self.__init__()
+            self.marcas = marcas
+
+        for _posicion, siguiente, fila in leer_desde(LINAJE_NODOS_FILE, self.fines.get(LINAJE_NODOS_FILE, 0)):
+            self.fines[LINAJE_NODOS_FILE] = siguiente
+            nodo_id = str(fila.get("nodo"))
+            if nodo_id not in self.nodos:
+                self.por_epoch.setdefault(_clave_epoch(nodo_id), []).append(nodo_id)
+            self.nodos[nodo_id] = (parse_float(fila.get("kg")), parse_float(fila.get("valor")))
+
+        for _posicion, siguiente, fila in leer_desde(LINAJE_FILE, self.fines.get(LINAJE_FILE, 0)):
+            self.fines[LINAJE_FILE] = siguiente
+            origen, destino, kg = str(fila.get("origen")), str(fila.get("destino")), parse_float(fila.get("kg"))
+            self.abajo.setdefault(origen, []).append((destino, kg))
+            self.arriba.setdefault(destino, []).append((origen, kg))
+
+    def recorrer(self, inicio, hacia_arriba=False):
+        """
+        Registros alcanzables desde uno, en anchura
+
+        Returns:
+            list: (nodo, distancia) sin incluir el inicio
+        """
+        adyacencia = self.arriba if hacia_arriba else self.abajo
+        vistos = {inicio}
+        cola = deque([(inicio, 0)])
+        resultado = []
+        while cola:
+            actual, distancia = cola.popleft()
+            for vecino, _kg in adyacencia.get(actual, ()):
+                if vecino not in vistos:
+                    vistos.add(vecino)
+                    resultado.append((vecino, distancia + 1))
+                    cola.append((vecino, distancia + 1))
+        return resultado
+
+    def _orden(self, inicio, adyacencia):
+        """Nodos alcanzables desde inicio, cada uno después de todos sus antecesores en el recorrido"""
+        orden, vistos = [], {inicio}
+        pila = [(inicio, iter(adyacencia.get(inicio, ())))]
+        while pila:
+            actual, vecinos = pila[-1]
+            for vecino, _kg in vecinos:
+                if vecino not in vistos:
+                    vistos.add(vecino)
+                    pila.append((vecino, iter(adyacencia.get(vecino, ()))))
+                    break
+            else:
+                pila.pop()
+                orden.append(actual)
+        orden.reverse()
+        return orden
+
+    def _kg_entrada(self, nodo_id):
+        return sum(kg for _origen, kg in self.arriba.get(nodo_id, ()))
+
+    def _kg_salida(self, nodo_id):
+        """Kilos que produce un registro (los de su nodo, o lo que recibe si no se registró)"""
+        kg = self.nodos.get(nodo_id, (0.0, 0.0))[0]
+        return kg or self._kg_entrada(nodo_id)
+
+    def origenes(self, nodo_id):
+        """
+        Compras de las que salió un registro (p. ej. una venta)
+
+        Returns:
+            dict: compra -> kilos de esa compra que terminaron en el registro
+        """
+        # Fracción de la salida de cada nodo que termina en el registro pedido
+        fraccion = {nodo_id: 1.0}
+        resultado = {}
+        for actual in self._orden(nodo_id, self.arriba):
+            # Un proceso reparte su salida en proporción a lo que recibe: de cada
+            # enlace de entrada termina en el registro la misma fracción
+            parte = fraccion.get(actual, 0.0)
+            for origen, kg in self.arriba.get(actual, ()):
+                llega = kg * parte
+                if tabla_de(origen) == COMPRAS:
+                    resultado[origen] = resultado.get(origen, 0.0) + llega
+                salida = self._kg_salida(origen)
+                if salida:
+                    fraccion[origen] = fraccion.get(origen, 0.0) + llega / salida
+        return resultado
+
+    def margen(self, compra):
+        """
+        Costo y utilidad de un lote, siguiendo sus kilos hasta las ventas
+
+        Returns:
+            dict: kg y costo del lote, kg vendidos, ingresos, costo de lo
+            vendido, utilidad, margen (%) y ventas (venta -> kg del lote)
+        """
+        kg_lote, costo_lote = self.nodos.get(compra, (0.0, 0.0))
+        # Parte de la salida de cada nodo que viene del lote, en kilos y en costo
+        fraccion = {compra: 1.0}
+        costo = {compra: costo_lote}
+        ventas = {}
+        ingresos = costo_vendido = kg_vendidos = 0.0
+        for actual in self._orden(compra, self.abajo):
+            if tabla_de(actual) == VENTAS:
+                kg_venta, total_venta = self.nodos.get(actual, (0.0, 0.0))
+                kg_venta = kg_venta or self._kg_entrada(actual)
+                vendidos = fraccion.get(actual, 0.0) * kg_venta
+                ventas[actual] = vendidos
+                kg_vendidos += vendidos
+                ingresos += fraccion.get(actual, 0.0) * total_venta
+                costo_vendido += costo.get(actual, 0.0)
+                continue
+            salida = self._kg_salida(actual)
+            if not salida:
+                continue
+            for destino, kg in self.abajo.get(actual, ()):
+                entrada = self._kg_entrada(destino)
+                if entrada:
+                    fraccion[destino] = fraccion.get(destino, 0.0) + kg * fraccion.get(actual, 0.0) / entrada
+                costo[destino] = costo.get(destino, 0.0) + costo.get(actual, 0.0) * kg / salida
+        utilidad = ingresos - costo_vendido
+        return {
+            "kg": kg_lote,
+            "costo": costo_lote,
+            "kg_vendidos": kg_vendidos,
+            "ingresos": ingresos,
+            "costo_vendido": costo_vendido,
+            "utilidad": utilidad,
+            "margen": utilidad / ingresos * 100 if ingresos else 0.0,
+            "ventas": ventas,
+        }
+
+def _linaje():
+    """Linaje del negocio en curso, al día con sus tablas (llamar con _lock)"""
+    cache = cache_negocio(CACHE_LINAJE)
+    linaje = cache.get("linaje")
+    if linaje is None:
+        linaje = cache["linaje"] = Linaje()
+    linaje.actualizar()
+    return linaje
+
+def nodos_de(tabla, epoch):
+    """
+    Registros de una tabla guardados en un mismo segundo
+
+    Args:
+        tabla (str): 'compras', 'proceso' o 'ventas'
+        epoch (int): fecha_epoch de los registros (ver epoch_de)
+
+    Returns:
+        list: Ids de los nodos, en el orden en que se registraron
+    """
+    with _lock:
+        return list(_linaje().por_epoch.get((tabla, str(epoch)), ()))
+
+def registrar_nodo(tabla, fila):
+    """
+    Guarda los kilos y el valor de un registro recién escrito
+
+    Args:
+        tabla (str): 'compras', 'proceso' o 'ventas'
+        fila (dict): Fila guardada (con su fecha)
+
+    Returns:
+        str: Id del nodo, o None si no se pudo guardar
+    """
+    epoch = epoch_de(fila)
+    if epoch is None:
+        logger.error(f"Registro de {tabla} sin fecha válida para el linaje: {fila.get('fecha')!r}")
+        return None
+    campo_kg, campo_valor = CAMPOS_NODO[tabla]
+    # Con el lock, dos registros del mismo segundo no toman el mismo número
+    with _lock:
+        anteriores = _linaje().por_epoch.get((tabla, str(epoch)), ())
+        nodo_id = nodo(tabla, epoch, len(anteriores) + 1)
+        datos = {
+            "fecha": get_current_timestamp(),
+            "nodo": nodo_id,
+            "kg": parse_float(fila.get(campo_kg)),
+            "valor": parse_float(fila.get(campo_valor)) if campo_valor else 0.0,
+        }
+        return nodo_id if save_to_csv(LINAJE_NODOS_FILE, datos) else None
+
+def vincular(origen, destino, kg):
+    """
+    Guarda que `kg` kilos de un registro pasaron a otro
+
+    Args:
+        origen (str): Nodo de origen (compra o proceso)
+        destino (str): Nodo de destino (proceso o venta)
+        kg (float): Kilos
+
+    Returns:
+        bool: True si se guardó
+    """
+    return save_to_csv(LINAJE_FILE, {
+        "fecha": get_current_timestamp(), "origen": origen, "destino": destino, "kg": kg,
+    })
+
+def registrar_proceso(fila, consumos):
+    """
+    Enlaza un proceso recién guardado con los lotes que consumió
+
+    Args:
+        fila (dict): Fila del proceso (fecha, kg_resultantes, ...)
+        consumos (list): (nodo de compra o proceso, kilos usados)
+
+    Returns:
+        bool: True si se guardaron todos los enlaces
+    """
+    destino = registrar_nodo(PROCESO, fila)
+    if destino is None:
+        return False
+    return all([vincular(origen, destino, kg) for origen, kg in consumos])
+
+def registrar_venta(fila, origenes):
+    """
+    Enlaza una venta recién guardada con los procesos o compras de los que salió
+
+    Args:
+        fila (dict): Fila de la venta (fecha, cantidad, total, ...)
+        origenes (list): (nodo de proceso o compra, kilos vendidos)
+
+    Returns:
+        bool: True si se guardaron todos los enlaces
+    """
+    destino = registrar_nodo(VENTAS, fila)
+    if destino is None:
+        return False
+    return all([vincular(origen, destino, kg) for origen, kg in origenes])
+
+def aguas_arriba(nodo_id):
+    """Registros de los que sale uno, con su distancia"""
+    with _lock:
+        return _linaje().recorrer(nodo_id, hacia_arriba=True)
+
+def aguas_abajo(nodo_id):
+    """Registros a los que llegan los kilos de uno, con su distancia"""
+    with _lock:
+        return _linaje().recorrer(nodo_id)
+
+def compras_de_venta(venta_id):
+    """
+    Compras de las que salió una venta
+
+    Args:
+        venta_id (str): Nodo de la venta (ver nodos_de)
+
+    Returns:
+        dict: Nodo de compra -> kilos de la compra que terminaron en la venta
+    """
+    with _lock:
+        return _linaje().origenes(venta_id)
+
+def margen_lote(compra_id):
+    """
+    Costo de lo vendido y utilidad de un lote (compra)
+
+    Args:
+        compra_id (str): Nodo de la compra (ver nodos_de)
+
+    Returns:
+        dict: Ver Linaje.margen
+    """
+    with _lock:
+        return _linaje().margen(compra_id)
@@ -0,0 +1,344 @@
+import asyncio
+import functools
+import logging
+import time
+from bisect import bisect_left
+
+from config import METRICAS_ACTIVAS, METRICAS_HOST, METRICAS_PUERTO
+
+# Configuración de logging
+logger = logging.getLogger(__name__)
+
+# Límites de los histogramas de latencia (segundos)
+BUCKETS_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+def _formatear_etiquetas(nombres, valores):
+    if not nombres:
+        return ""
+    pares = ",".join(
+        f'{nombre}="{str(valor).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+        for nombre, valor in zip(nombres, valores)
+    )
+    return "{" + pares + "}"
+
+class Contador:
+    """Contador acumulativo con etiquetas (tipo counter de Prometheus)"""
+
+    tipo = "counter"
+
+    def __init__(self, nombre, ayuda, etiquetas=()):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+        self._valores = {}
+
+    def inc(self, *valores_etiquetas, cantidad=1):
+        self._valores[valores_etiquetas] = self._valores.get(valores_etiquetas, 0) + cantidad
+
+    def valor(self, *valores_etiquetas):
+        return self._valores.get(valores_etiquetas, 0)
+
+    def muestras(self):
+        for valores, total in self._valores.items():
+            yield self.nombre, _formatear_etiquetas(self.etiquetas, valores), total
+
+class Histograma:
+    """Histograma con buckets fijos y etiquetas (tipo histogram de Prometheus)"""
+
+    tipo = "histogram"
+
+    def __init__(self, nombre, ayuda, etiquetas=(), buckets=BUCKETS_LATENCIA):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+        self.buckets = tuple(buckets)
+        # {valores_etiquetas: [conteos por bucket..., suma, total]}
+        self._series = {}
+
+    def observar(self, valor, *valores_etiquetas):
+        serie = self._series.get(valores_etiquetas)
+        if serie is None:
+            serie = self._series[valores_etiquetas] = [0] * (len(self.buckets) + 2)
+        indice = bisect_left(self.buckets, valor)
+        if indice < len(self.buckets):
+            serie[indice] += 1
+        serie[-2] += valor
+        serie[-1] += 1
+
+    def series(self):
+        """Valores de etiquetas de las series observadas"""
+        return list(self._series)
+
+    def resumen(self, *valores_etiquetas):
+        """
+        Resume una serie del histograma
+
+        Returns:
+            dict: total, promedio y percentiles p50/p95/p99 (límite superior del
+            bucket que los contiene), o None si la serie no tiene observaciones
+        """
+        serie = self._series.get(valores_etiquetas)
+        if not serie or not serie[-1]:
+            return None
+        total = serie[-1]
+        resultado = {"total": total, "promedio": serie[-2] / total}
+        for nombre, cuantil in (("p50", 0.5), ("p95", 0.95), ("p99", 0.99)):
+            objetivo = cuantil * total
+            acumulado = 0
+            resultado[nombre] = float("inf")
+            for limite, conteo in zip(self.buckets, serie):
+                acumulado += conteo
+                if acumulado >= objetivo:
+                    resultado[nombre] = limite
+                    break
+        return resultado
+
+    def muestras(self):
+        for valores, serie in self._series.items():
+            acumulado = 0
+            for limite, conteo in zip(self.buckets, serie):
+                acumulado += conteo
+                etiquetas = _formatear_etiquetas(self.etiquetas + ("le",), valores + (limite,))
+                yield f"{self.nombre}_bucket", etiquetas, acumulado
+            etiquetas = _formatear_etiquetas(self.etiquetas + ("le",), valores + ("+Inf",))
+            yield f"{self.nombre}_bucket", etiquetas, serie[-1]
+            yield f"{self.nombre}_sum", _formatear_etiquetas(self.etiquetas, valores), serie[-2]
+            yield f"{self.nombre}_count", _formatear_etiquetas(self.etiquetas, valores), serie[-1]
+
+class Medidor:
+    """
+    Valor instantáneo calculado al exportar (tipo gauge de Prometheus).
+    La función devuelve un número, o un diccionario {valor_etiqueta: número}
+    si se indica una etiqueta.
+    """
+
+    tipo = "gauge"
+
+    def __init__(self, nombre, ayuda, funcion, etiqueta=None):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.funcion = funcion
+        self.etiqueta = etiqueta
+
+    def muestras(self):
+        try:
+            resultado = self.funcion()
+        except Exception as e:
+            logger.error(f"Error calculando la métrica {self.nombre}: {e}")
+            return
+        if self.etiqueta is None:
+            yield self.nombre, "", resultado
+        else:
+            for valor_etiqueta, valor in resultado.items():
+                yield self.nombre, _formatear_etiquetas((self.etiqueta,), (valor_etiqueta,)), valor
+
+class RegistroMetricas:
+    """Conjunto de métricas exportadas en formato de texto de Prometheus"""
+
+    def __init__(self):
+        self._metricas = {}
+
+    def registrar(self, metrica):
+        self._metricas[metrica.nombre] = metrica
+        return metrica
+
+    def obtener(self, nombre):
+        return self._metricas.get(nombre)
+
+    def generar_texto(self):
+        """
+        Genera la exposición de todas las métricas
+
+        Returns:
+            str: Métricas en formato de texto de Prometheus 0.0.4
+        """
+        lineas = []
+        for metrica in self._metricas.values():
+            lineas.append(f"# HELP {metrica.nombre} {metrica.ayuda}")
+            lineas.append(f"# TYPE {metrica.nombre} {metrica.tipo}")
+            for nombre, etiquetas, valor in metrica.muestras():
+                lineas.append(f"{nombre}{etiquetas} {valor}")
+        return "\n".join(lineas) + "\n"
+
+registro = RegistroMetricas()
+
+latencia_handlers = registro.registrar(Histograma(
+    "cafebot_handler_segundos", "Latencia de los handlers por comando/estado de conversación",
+    ("handler",)
+))
+errores_handlers = registro.registrar(Contador(
+    "cafebot_handler_errores_total", "Excepciones lanzadas por los handlers", ("handler",)
+))
+filas_storage = registro.registrar(Contador(
+    "cafebot_storage_filas_total", "Filas leídas y escritas por tabla", ("tabla", "operacion")
+))
+bytes_storage = registro.registrar(Contador(
+    "cafebot_storage_bytes_total", "Bytes leídos y escritos por tabla", ("tabla", "operacion")
+))
+accesos_cache = registro.registrar(Contador(
+    "cafebot_cache_accesos_total", "Accesos a cachés por resultado (acierto/fallo)", ("cache", "resultado")
+))
+cambios_publicados = registro.registrar(Contador(
+    "cafebot_cambios_total", "Cambios publicados en el registro de cambios", ("tabla", "operacion")
+))
+lag_event_loop = registro.registrar(Histograma(
+    "cafebot_event_loop_lag_segundos", "Retraso del event loop respecto al intervalo esperado",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5)
+))
+registro.registrar(Medidor(
+    "cafebot_cache_tasa_aciertos", "Proporción de aciertos por caché",
+    lambda: _tasas_aciertos(), etiqueta="cache"
+))
+
+def _tasas_aciertos():
+    totales = {}
+    for (cache, resultado), cantidad in accesos_cache._valores.items():
+        aciertos, total = totales.get(cache, (0, 0))
+        totales[cache] = (aciertos + (cantidad if resultado == "acierto" else 0), total + cantidad)
+    return {cache: aciertos / total for cache, (aciertos, total) in totales.items() if total}
+
+def medir(nombre):
+    """
+    Decorador que mide la latencia de un handler asíncrono. Con las métricas
+    desactivadas devuelve la función original, sin ningún costo adicional.
+
+    Args:
+        nombre (str): Nombre del handler, p. ej. 'compra.CALIDAD'
+    """
+    def decorador(funcion):
+        if not METRICAS_ACTIVAS:
+            return funcion
+
+        @functools.wraps(funcion)
+        async def envoltura(*args, **kwargs):
+            inicio = time.perf_counter()
+            try:
+                return await funcion(*args, **kwargs)
+            except Exception:
+                errores_handlers.inc(nombre)
+                raise
+            finally:
+                latencia_handlers.observar(time.perf_counter() - inicio, nombre)
+        return envoltura
+    return decorador
+
+def registrar_io(tabla, operacion, filas, cantidad_bytes=0):
+    """
+    Registra filas y bytes leídos o escritos en una tabla
+
+    Args:
+        tabla (str): Nombre de la tabla (archivo sin extensión)
+        operacion (str): 'lectura' o 'escritura'
+        filas (int): Cantidad de filas
+        cantidad_bytes (int, optional): Cantidad de bytes
+    """
+    if not METRICAS_ACTIVAS:
+        return
+    filas_storage.inc(tabla, operacion, cantidad=filas)
+    if cantidad_bytes:
+        bytes_storage.inc(tabla, operacion, cantidad=cantidad_bytes)
+
+def registrar_cambio(tabla, operacion):
+    """Registra un cambio publicado (ver utils/cambios.py)"""
+    if not METRICAS_ACTIVAS:
+        return
+    cambios_publicados.inc(tabla, operacion)
+
+def registrar_cache(cache, acierto):
+    """Registra un acierto o fallo de una caché"""
+    if not METRICAS_ACTIVAS:
+        return
+    accesos_cache.inc(cache, "acierto" if acierto else "fallo")
+
+def registrar_medidor(nombre, ayuda, funcion, etiqueta=None):
+    """Registra un valor instantáneo que se calcula al exportar las métricas"""
+    if METRICAS_ACTIVAS:
+        registro.registrar(Medidor(nombre, ayuda, funcion, etiqueta))
+
+def generar_texto():
+    """Devuelve todas las métricas en formato de texto de Prometheus"""
+    return registro.generar_texto()
+
+def generar_resumen():
+    """
+    Genera un resumen legible de las métricas para el comando /metricas
+
+    Returns:
+        str: Mensaje con latencias por handler, E/S por tabla, cachés y event loop
+    """
+    if not METRICAS_ACTIVAS:
+        return "Las métricas están desactivadas (METRICAS_ACTIVAS=1 para activarlas)."
+
+    lineas = ["📈 MÉTRICAS DE RENDIMIENTO", "", "Handlers (n, p50/p95 ms)"]
+    for (handler,) in sorted(latencia_handlers.series()):
+        datos = latencia_handlers.resumen(handler)
+        errores = errores_handlers.valor(handler)
+        lineas.append(
+            f"- {handler}: {datos['total']}, {datos['p50'] * 1000:g}/{datos['p95'] * 1000:g}"
+            + (f" ({errores} errores)" if errores else "")
+        )
+
+    lineas += ["", "Almacenamiento (filas / KB)"]
+    tablas = sorted({tabla for tabla, _ in filas_storage._valores})
+    for tabla in tablas:
+        partes = []
+        for operacion in ("lectura", "escritura"):
+            filas = filas_storage.valor(tabla, operacion)
+            kb = bytes_storage.valor(tabla, operacion) / 1024
+            partes.append(f"{operacion} {filas} / {kb:.1f}")
+        lineas.append(f"- {tabla}: " + ", ".join(partes))
+
+    tasas = _tasas_aciertos()
+    if tasas:
+        lineas += ["", "Cachés (aciertos)"]
+        lineas += [f"- {cache}: {tasa:.0%}" for cache, tasa in sorted(tasas.items())]
+
+    lag = lag_event_loop.resumen()
+    if lag:
+        lineas += ["", f"Event loop: retraso promedio {lag['promedio'] * 1000:.1f} ms, p99 ≤ {lag['p99'] * 1000:g} ms"]
+
+    estado = [
+        f"- {nombre}: {valor}"
+        for medidor in registro._metricas.values()
+        if isinstance(medidor, Medidor) and medidor.etiqueta is None
+        for nombre, _, valor in medidor.muestras()
+    ]
+    if estado:
+        lineas += ["", "Estado"] + estado
+    return "\n".join(lineas)
+
+async def monitorear_event_loop(intervalo=0.5):
+    """Mide continuamente cuánto se retrasa el event loop al despertar de un sleep"""
+    while True:
+        inicio = time.perf_counter()
+        await asyncio.sleep(intervalo)
+        lag_event_loop.observar(max(time.perf_counter() - inicio - intervalo, 0.0))
+
+async def iniciar_exportador():
+    """
+    Inicia el endpoint HTTP /metrics y el monitor del event loop
+
+    Returns:
+        tuple: (ServidorHTTP, Task del monitor) o None si las métricas están desactivadas
+    """
+    if not METRICAS_ACTIVAS:
+        return None
+
+    from utils.http_server import ServidorHTTP, respuesta
+
+    async def metrics(solicitud):
+        return respuesta(200, generar_texto(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+    servidor = ServidorHTTP(METRICAS_HOST, METRICAS_PUERTO)
+    servidor.agregar_ruta("GET", "/metrics", metrics)
+    await servidor.iniciar()
+    monitor = asyncio.create_task(monitorear_event_loop(), name="monitor_event_loop")
+    return servidor, monitor
+
+async def detener_exportador(exportador):
+    """Detiene el endpoint y el monitor iniciados con iniciar_exportador()"""
+    if exportador is None:
+        return
+    servidor, monitor = exportador
+    monitor.cancel()
+    await servidor.detener()
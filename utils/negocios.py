@@ -0,0 +1,331 @@
+"""
+Espacios de datos por negocio: una sola instancia del bot atiende a varios
+negocios (cooperativas, productores) aislados entre sí.
+
+Con NEGOCIOS_ACTIVOS, el middleware de handlers/negocios.py fija el negocio
+del update en curso (el id de su chat o grupo) en una variable de contexto,
+que se propaga a los hilos de asyncio.to_thread. A partir de ahí:
+  - utils/db resuelve cada ruta bajo DATA_DIR (tablas, libro de Excel,
+    archivo del historial) a NEGOCIOS_DIR/<chat_id>/...;
+  - el libro de Excel en memoria y las cachés (cache_negocio) son del negocio.
+
+Los negocios cargados se mantienen en un LRU. La revisión periódica (en un
+hilo) descarga los que lleva más tiempo sin usarse si hay más de
+NEGOCIOS_MAX_CARGADOS, descarga los inactivos y vacía las cachés de los que
+superan su presupuesto de memoria. Descargar guarda el libro en disco, por
+eso no se hace al cargar un negocio desde el event loop; el negocio se vuelve
+a cargar en su próximo update.
+
+Sin NEGOCIOS_ACTIVOS no hay negocio en curso y todo usa DATA_DIR como antes.
+"""
+import asyncio
+import contextvars
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+
+from config import (
+    DATA_DIR, EXCEL_FILE, NEGOCIOS_ACTIVOS, NEGOCIOS_DIR, NEGOCIOS_MAX_CARGADOS,
+    NEGOCIOS_INACTIVIDAD, NEGOCIO_MEMORIA_MB,
+)
+
+# Logger
+logger = logging.getLogger(__name__)
+
+# Un negocio usado en los últimos segundos no se descarga por el LRU aunque se
+# supere NEGOCIOS_MAX_CARGADOS, para no cerrar su libro con un update en curso
+GRACIA_DESCARGA = 60
+
+# Id del negocio del update en curso
+_negocio_actual = contextvars.ContextVar("negocio_actual", default=None)
+
+# Cachés cuando no hay negocios
+_caches_globales = {}
+
+def _estimar_memoria(objeto, profundidad=3):
+    """Bytes aproximados de un objeto de caché (DataFrames, textos y contenedores)"""
+    memory_usage = getattr(objeto, "memory_usage", None)
+    if callable(memory_usage):
+        try:
+            return int(memory_usage(deep=True).sum())
+        except TypeError:
+            pass
+    tamano = sys.getsizeof(objeto)
+    if profundidad > 0 and isinstance(objeto, (dict, list, tuple, set)):
+        # Las cachés se modifican desde el event loop mientras se estiman en un
+        # hilo: recorrer una copia, y omitir el contenido si cambió al copiarla
+        try:
+            valores = tuple(objeto.values() if isinstance(objeto, dict) else objeto)
+        except RuntimeError:
+            valores = ()
+        tamano += sum(_estimar_memoria(valor, profundidad - 1) for valor in valores)
+    return tamano
+
+class Negocio:
+    """Datos en memoria de un negocio: su libro de Excel (producción) y sus cachés"""
+
+    def __init__(self, negocio_id, directorio):
+        self.id = negocio_id
+        self.directorio = directorio
+        self.caches = {}
+        # Cachés que liberar_caches conserva (p. ej. candados en uso)
+        self.permanentes = set()
+        self.ultimo_uso = time.monotonic()
+        self._excel = None
+        self._lock = threading.Lock()
+        # Protege el diccionario de cachés entre el event loop y la revisión en un hilo
+        self._lock_caches = threading.Lock()
+
+    def cache(self, nombre, liberable=True):
+        """Caché con nombre del negocio (ver cache_negocio)"""
+        with self._lock_caches:
+            if not liberable:
+                self.permanentes.add(nombre)
+            return self.caches.setdefault(nombre, {})
+
+    def ruta(self, file_path):
+        """Ruta equivalente dentro del directorio del negocio"""
+        relativa = os.path.relpath(file_path, DATA_DIR)
+        if relativa.startswith(os.pardir):
+            # Fuera de DATA_DIR (p. ej. EXCEL_FILE configurado aparte): mismo nombre
+            relativa = os.path.basename(file_path)
+        return os.path.join(self.directorio, relativa)
+
+    @property
+    def excel(self):
+        """Libro de Excel del negocio, cargado la primera vez que se usa"""
+        with self._lock:
+            if self._excel is None:
+                from utils.excel_db import ExcelDB
+                self._excel = ExcelDB(self.ruta(EXCEL_FILE))
+            return self._excel
+
+    def memoria(self):
+        """Bytes aproximados que ocupa el negocio en memoria"""
+        with self._lock_caches:
+            caches = dict(self.caches)
+        total = _estimar_memoria(caches)
+        if self._excel is not None:
+            total += self._excel.memoria()
+        return total
+
+    def liberar_caches(self):
+        """Vacía las cachés liberables (se recalculan al usarse); el libro sigue cargado"""
+        with self._lock_caches:
+            for nombre in list(self.caches):
+                if nombre not in self.permanentes:
+                    del self.caches[nombre]
+        if self._excel is not None:
+            self._excel.liberar_cache()
+
+    def descargar(self):
+        """Guarda el libro en disco y libera toda la memoria del negocio"""
+        with self._lock:
+            if self._excel is not None:
+                self._excel.close()
+                self._excel = None
+        with self._lock_caches:
+            self.caches.clear()
+
+class RegistroNegocios:
+    """Negocios cargados en memoria, del menos al más recientemente usado"""
+
+    def __init__(self, directorio=NEGOCIOS_DIR, max_cargados=NEGOCIOS_MAX_CARGADOS,
+                 inactividad=NEGOCIOS_INACTIVIDAD, memoria_mb=NEGOCIO_MEMORIA_MB):
+        self.directorio = directorio
+        self.max_cargados = max_cargados
+        self.inactividad = inactividad
+        self.memoria_max = memoria_mb * 1024 * 1024
+        self._cargados = OrderedDict()
+        self._lock = threading.RLock()
+        # Descargas por motivo (lru, inactividad, memoria, cierre) y vaciados de cachés
+        self.descargas = Counter()
+
+    def obtener(self, negocio_id):
+        """
+        Devuelve un negocio, cargándolo si hace falta, y lo marca como usado
+
+        Args:
+            negocio_id: Id del chat o grupo del negocio
+
+        Returns:
+            Negocio: Negocio cargado
+        """
+        with self._lock:
+            negocio = self._cargados.get(negocio_id)
+            if negocio is None:
+                directorio = os.path.join(self.directorio, str(negocio_id))
+                os.makedirs(directorio, exist_ok=True)
+                # El exceso sobre max_cargados lo descarga revisar(), fuera del event loop
+                negocio = self._cargados[negocio_id] = Negocio(negocio_id, directorio)
+            else:
+                self._cargados.move_to_end(negocio_id)
+            negocio.ultimo_uso = time.monotonic()
+            return negocio
+
+    def _aplicar_limite(self):
+        """Descarga los menos usados mientras se supere max_cargados"""
+        limite = time.monotonic() - GRACIA_DESCARGA
+        while len(self._cargados) > self.max_cargados:
+            negocio_id, negocio = next(iter(self._cargados.items()))
+            if negocio.ultimo_uso > limite:
+                # Todos los cargados están en uso: se tolera el exceso
+                break
+            self._descargar(negocio_id, "lru")
+
+    def _descargar(self, negocio_id, motivo):
+        negocio = self._cargados.pop(negocio_id)
+        negocio.descargar()
+        self.descargas[motivo] += 1
+        logger.debug(f"Negocio {negocio_id} descargado ({motivo})")
+
+    def revisar(self):
+        """
+        Descarga los menos usados si se supera max_cargados y los inactivos, y
+        vacía las cachés de los que superan su presupuesto de memoria (si aun
+        así lo superan, se descargan). Guarda libros en disco: llamar en un hilo
+        """
+        ahora = time.monotonic()
+        with self._lock:
+            self._aplicar_limite()
+            negocios = list(self._cargados.items())
+        for negocio_id, negocio in negocios:
+            if ahora - negocio.ultimo_uso > self.inactividad:
+                with self._lock:
+                    if self._cargados.get(negocio_id) is negocio:
+                        self._descargar(negocio_id, "inactividad")
+                continue
+            if negocio.memoria() > self.memoria_max:
+                negocio.liberar_caches()
+                self.descargas["caches"] += 1
+                if negocio.memoria() > self.memoria_max and ahora - negocio.ultimo_uso > GRACIA_DESCARGA:
+                    with self._lock:
+                        if self._cargados.get(negocio_id) is negocio:
+                            self._descargar(negocio_id, "memoria")
+
+    @property
+    def cargados(self):
+        return len(self._cargados)
+
+    def memoria(self):
+        """Bytes aproximados de todos los negocios cargados"""
+        with self._lock:
+            negocios = list(self._cargados.values())
+        return sum(negocio.memoria() for negocio in negocios)
+
+    def ids(self):
+        """Ids de todos los negocios con datos en disco"""
+        if not os.path.isdir(self.directorio):
+            return []
+        ids = []
+        for nombre in sorted(os.listdir(self.directorio)):
+            if os.path.isdir(os.path.join(self.directorio, nombre)):
+                try:
+                    ids.append(int(nombre))
+                except ValueError:
+                    continue
+        return ids
+
+    def checkpoint(self):
+        """Guarda en disco los libros de todos los negocios cargados"""
+        with self._lock:
+            negocios = list(self._cargados.values())
+        resultado = True
+        for negocio in negocios:
+            if negocio._excel is not None:
+                resultado = negocio._excel.checkpoint() and resultado
+        return resultado
+
+    def cerrar(self):
+        """Descarga todos los negocios (al terminar el bot)"""
+        with self._lock:
+            for negocio_id in list(self._cargados):
+                self._descargar(negocio_id, "cierre")
+
+# Instancia única
+registro_negocios = RegistroNegocios()
+
+def establecer_negocio(negocio_id):
+    """Fija el negocio del update en curso (None: datos compartidos de DATA_DIR)"""
+    _negocio_actual.set(negocio_id if NEGOCIOS_ACTIVOS else None)
+
+@contextmanager
+def usar_negocio(negocio_id):
+    """Ejecuta un bloque con los datos de un negocio (p. ej. en tareas programadas)"""
+    token = _negocio_actual.set(negocio_id if NEGOCIOS_ACTIVOS else None)
+    try:
+        yield
+    finally:
+        _negocio_actual.reset(token)
+
+def negocio_actual():
+    """
+    Negocio del update en curso
+
+    Returns:
+        Negocio: Negocio cargado, o None si no hay negocios
+    """
+    negocio_id = _negocio_actual.get()
+    if negocio_id is None:
+        return None
+    return registro_negocios.obtener(negocio_id)
+
+def ids_negocios():
+    """Negocios a recorrer en una tarea programada ([None] sin negocios)"""
+    if not NEGOCIOS_ACTIVOS:
+        return [None]
+    return registro_negocios.ids()
+
+def ruta_negocio(file_path):
+    """
+    Resuelve una ruta de datos para el negocio en curso
+
+    Args:
+        file_path (str): Ruta bajo DATA_DIR (p. ej. config.COMPRAS_FILE)
+
+    Returns:
+        str: Ruta dentro del directorio del negocio, o la misma ruta si no hay
+        negocio en curso o no está bajo DATA_DIR
+    """
+    if _negocio_actual.get() is None:
+        return file_path
+    absoluta = os.path.abspath(file_path)
+    datos = os.path.abspath(DATA_DIR)
+    if not absoluta.startswith(datos + os.sep):
+        return file_path
+    if absoluta.startswith(os.path.abspath(NEGOCIOS_DIR) + os.sep):
+        # Ya resuelta
+        return file_path
+    return negocio_actual().ruta(absoluta)
+
+def cache_negocio(nombre, liberable=True):
+    """
+    Caché con nombre del negocio en curso; se descarta al descargar el negocio
+
+    Args:
+        nombre (str): Nombre de la caché
+        liberable (bool, optional): False para que la revisión de memoria no la
+            vacíe (p. ej. candados que pueden estar tomados)
+
+    Returns:
+        dict: Caché del negocio (o global si no hay negocios)
+    """
+    negocio = negocio_actual()
+    if negocio is None:
+        return _caches_globales.setdefault(nombre, {})
+    return negocio.cache(nombre, liberable)
+
+async def _revisar_programado(context) -> None:
+    # En un hilo: estimar la memoria de los DataFrames recorre sus columnas de texto
+    # y descargar un negocio guarda su libro de Excel
+    await asyncio.to_thread(registro_negocios.revisar)
+
+def programar_revision(job_queue):
+    """Programa la revisión periódica de negocios inactivos y del presupuesto de memoria"""
+    if not NEGOCIOS_ACTIVOS or job_queue is None:
+        return
+    job_queue.run_repeating(_revisar_programado, interval=60, first=60, name="revision_negocios")
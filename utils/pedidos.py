@@ -0,0 +1,304 @@
+"""
+Cola de pedidos abiertos de /pedido y de WhatsApp (PEDIDOS_WHATSAPP_FILE).
+
+Los pedidos abiertos (pendientes o confirmados) de ambas fuentes se mantienen
+en memoria en un montículo ordenado por fecha de entrega, con índices por
+estado y por cliente, así "los próximos N" y "los de un cliente" no recorren
+las tablas. Los pedidos cerrados (entregados o cancelados) solo se cuentan.
+
+Un cambio de estado no reescribe la tabla de pedidos: se agrega una fila a
+PEDIDOS_ESTADOS_FILE (pedido, estado nuevo) y el estado de un pedido es el de
+su último cambio, o el de su fila si no tiene cambios.
+
+Como el índice de /buscar (utils/busqueda.py), la cola se pone al día antes de
+cada consulta leyendo solo las filas agregadas a las tres tablas desde la
+anterior, y se reconstruye si alguna se reescribió. Es una caché del negocio
+en curso (utils/negocios.cache_negocio).
+"""
+import heapq
+import itertools
+import logging
+import threading
+from collections import Counter
+from datetime import date, datetime
+
+from config import (
+    PEDIDOS_FILE, PEDIDOS_WHATSAPP_FILE, PEDIDOS_ESTADOS_FILE,
+    PEDIDO_PENDIENTE, PEDIDO_CONFIRMADO, PEDIDO_ENTREGADO, PEDIDO_CANCELADO,
+)
+from utils.busqueda import normalizar
+from utils.db import leer_desde, marca_tabla, save_to_csv
+from utils.helpers import get_current_timestamp, parse_float
+from utils.negocios import cache_negocio
+
+# Logger
+logger = logging.getLogger(__name__)
+
+ESTADOS_ABIERTOS = (PEDIDO_PENDIENTE, PEDIDO_CONFIRMADO)
+ESTADOS = ESTADOS_ABIERTOS + (PEDIDO_ENTREGADO, PEDIDO_CANCELADO)
+
+# Fuentes de pedidos y prefijo de sus ids
+FUENTES = {
+    "P": PEDIDOS_FILE,
+    "W": PEDIDOS_WHATSAPP_FILE,
+}
+
+CACHE_PEDIDOS = "cola_pedidos"
+
+# Orden de los pedidos sin fecha de entrega válida: al final de la cola
+_SIN_ENTREGA = date.max.toordinal()
+
+# Serializa la puesta al día de la cola y la asignación de ids
+_lock = threading.Lock()
+
+def fecha_entrega(valor):
+    """Fecha de entrega 'YYYY-MM-DD', 'DD/MM/YYYY' o datetime (Excel) como date, o None"""
+    if isinstance(valor, datetime):
+        return valor.date()
+    if isinstance(valor, date):
+        return valor
+    texto = str(valor or "").strip()[:10]
+    try:
+        # Mucho más rápido que strptime, que se nota al cargar toda la tabla
+        if "/" in texto:
+            dia, mes, anio = texto.split("/")
+            return date(int(anio), int(mes), int(dia))
+        return date.fromisoformat(texto)
+    except ValueError:
+        return None
+
+class Pedido:
+    """Pedido abierto en la cola"""
+
+    __slots__ = ("id", "cliente", "telefono", "cantidad", "entrega", "estado", "fecha", "orden")
+
+    def __init__(self, pedido_id, fila, orden):
+        self.id = pedido_id
+        self.cliente = str(fila.get("cliente") or "")
+        self.telefono = str(fila.get("telefono") or "")
+        self.cantidad = parse_float(fila.get("cantidad"))
+        self.entrega = fecha_entrega(fila.get("fecha_entrega"))
+        self.estado = str(fila.get("estado") or PEDIDO_PENDIENTE)
+        self.fecha = str(fila.get("fecha") or "")
+        self.orden = orden
+
+    def clave(self):
+        """Posición en la cola: fecha de entrega y, a igual fecha, orden de llegada"""
+        return (self.entrega.toordinal() if self.entrega else _SIN_ENTREGA, self.orden)
+
+class ColaPedidos:
+    """Pedidos abiertos de todas las fuentes"""
+
+    def __init__(self):
+        self.marcas = None
+        self.fines = {}             # tabla -> posición desde la que seguir leyendo
+        self.leidos = Counter()     # prefijo -> filas leídas de la fuente
+        self.abiertos = {}          # id -> Pedido
+        self.monticulo = []         # (clave, id); las entradas de pedidos cerrados se descartan al salir
+        self.por_estado = {estado: set() for estado in ESTADOS_ABIERTOS}
+        self.por_cliente = {}       # cliente normalizado -> ids abiertos
+        self.cerrados = Counter()   # estado -> pedidos cerrados
+        self._orden = itertools.count()
+        self._clientes = {}         # cliente -> cliente normalizado (se repiten mucho)
+
+    def actualizar(self):
+        """Lee las filas nuevas de las fuentes y de los cambios de estado (o todo si alguna se reescribió)"""
+        tablas = list(FUENTES.values()) + [PEDIDOS_ESTADOS_FILE]
+        marcas = [marca_tabla(tabla) for tabla in tablas]
+        if marcas != self.marcas:
+            self.__init__()
+            self.marcas = marcas
+
+        for prefijo, tabla in FUENTES.items():
+            for _posicion, siguiente, fila in leer_desde(tabla, self.fines.get(tabla, 0)):
+                self.fines[tabla] = siguiente
+                self.leidos[prefijo] += 1
+                # Los pedidos de WhatsApp sin id se numeran por su orden en la tabla
+                pedido_id = str(fila.get("id") or "") or f"{prefijo}{self.leidos[prefijo]}"
+                if prefijo != "P" and not pedido_id.startswith(prefijo):
+                    pedido_id = f"{prefijo}{pedido_id}"
+                self._agregar(Pedido(pedido_id, fila, next(self._orden)))
+
+        for _posicion, siguiente, fila in leer_desde(PEDIDOS_ESTADOS_FILE, self.fines.get(PEDIDOS_ESTADOS_FILE, 0)):
+            self.fines[PEDIDOS_ESTADOS_FILE] = siguiente
+            self._cambiar_estado(str(fila.get("pedido") or ""), str(fila.get("estado") or ""))
+
+        # Las entradas de pedidos cerrados solo se descartan al llegar arriba: si
+        # son mayoría (p. ej. al cargar el historial) se reconstruye el montículo
+        if len(self.monticulo) > 2 * len(self.abiertos) + 64:
+            self.monticulo = [(pedido.clave(), pedido.id) for pedido in self.abiertos.values()]
+            heapq.heapify(self.monticulo)
+
+    def _cliente(self, cliente):
+        normalizado = self._clientes.get(cliente)
+        if normalizado is None:
+            normalizado = self._clientes[cliente] = normalizar(cliente)
+        return normalizado
+
+    def _agregar(self, pedido):
+        if pedido.estado not in ESTADOS_ABIERTOS:
+            self.cerrados[pedido.estado] += 1
+            return
+        self.abiertos[pedido.id] = pedido
+        self.por_estado[pedido.estado].add(pedido.id)
+        self.por_cliente.setdefault(self._cliente(pedido.cliente), set()).add(pedido.id)
+        heapq.heappush(self.monticulo, (pedido.clave(), pedido.id))
+
+    def _cambiar_estado(self, pedido_id, estado):
+        pedido = self.abiertos.get(pedido_id)
+        if pedido is None or estado not in ESTADOS or estado == pedido.estado:
+            # Pedido ya cerrado o desconocido: el cambio no afecta a la cola
+            return
+        self.por_estado[pedido.estado].discard(pedido_id)
+        pedido.estado = estado
+        if estado in ESTADOS_ABIERTOS:
+            self.por_estado[estado].add(pedido_id)
+            return
+        # Cerrado: sale de los índices; su entrada del montículo se descarta al llegar arriba
+        del self.abiertos[pedido_id]
+        cliente = self._cliente(pedido.cliente)
+        ids = self.por_cliente.get(cliente)
+        if ids is not None:
+            ids.discard(pedido_id)
+            if not ids:
+                del self.por_cliente[cliente]
+        self.cerrados[estado] += 1
+
+    def proximos(self, cantidad, estado=None):
+        """
+        Los primeros pedidos abiertos por fecha de entrega
+
+        Se sacan del montículo hasta tener `cantidad` vigentes y se vuelven a
+        meter; las entradas de pedidos cerrados se descartan en el camino. Con
+        `estado` se eligen los primeros del índice por estado.
+        """
+        if estado is not None:
+            ids = self.por_estado.get(estado, ())
+            return heapq.nsmallest(cantidad, (self.abiertos[pedido_id] for pedido_id in ids), key=Pedido.clave)
+
+        vigentes = []
+        sacadas = []
+        while self.monticulo and len(vigentes) < cantidad:
+            entrada = heapq.heappop(self.monticulo)
+            pedido = self.abiertos.get(entrada[1])
+            if pedido is None:
+                continue
+            sacadas.append(entrada)
+            vigentes.append(pedido)
+        for entrada in sacadas:
+            heapq.heappush(self.monticulo, entrada)
+        return vigentes
+
+    def de_cliente(self, cliente):
+        """Pedidos abiertos de un cliente (nombre exacto sin tildes ni mayúsculas, o que lo contenga)"""
+        buscado = normalizar(cliente).strip()
+        ids = self.por_cliente.get(buscado)
+        if ids is None:
+            ids = set()
+            for nombre, del_cliente in self.por_cliente.items():
+                if buscado in nombre:
+                    ids |= del_cliente
+        return sorted((self.abiertos[pedido_id] for pedido_id in ids), key=Pedido.clave)
+
+    def resumen(self):
+        """Cantidad de pedidos por estado"""
+        resultado = {estado: len(ids) for estado, ids in self.por_estado.items()}
+        resultado.update(self.cerrados)
+        return resultado
+
+def _cola():
+    """Cola del negocio en curso, al día con las tablas (llamar con _lock)"""
+    cache = cache_negocio(CACHE_PEDIDOS)
+    cola = cache.get("cola")
+    if cola is None:
+        cola = cache["cola"] = ColaPedidos()
+    cola.actualizar()
+    return cola
+
+def proximos_pedidos(cantidad=10, estado=None):
+    """
+    Próximos pedidos abiertos por fecha de entrega
+
+    Args:
+        cantidad (int, optional): Máximo de pedidos
+        estado (str, optional): Solo pedidos en este estado
+
+    Returns:
+        tuple: (pedidos, resumen de cantidades por estado)
+    """
+    with _lock:
+        cola = _cola()
+        return cola.proximos(cantidad, estado), cola.resumen()
+
+def pedidos_de_cliente(cliente):
+    """
+    Pedidos abiertos de un cliente, por fecha de entrega
+
+    Args:
+        cliente (str): Nombre (o parte del nombre) del cliente
+
+    Returns:
+        list: Pedidos
+    """
+    with _lock:
+        return _cola().de_cliente(cliente)
+
+def registrar_pedido(datos):
+    """
+    Guarda un pedido nuevo de /pedido con el siguiente id ('P<n>')
+
+    Args:
+        datos (dict): cliente, telefono, cantidad, fecha_entrega (YYYY-MM-DD) y usuario
+
+    Returns:
+        str: Id del pedido, o None si no se pudo guardar
+    """
+    with _lock:
+        cola = _cola()
+        pedido_id = f"P{cola.leidos['P'] + 1}"
+        fila = {
+            "fecha": get_current_timestamp(),
+            "id": pedido_id,
+            "cliente": datos["cliente"],
+            "telefono": datos.get("telefono", ""),
+            "cantidad": datos["cantidad"],
+            "fecha_entrega": datos["fecha_entrega"],
+            "estado": PEDIDO_PENDIENTE,
+            "usuario": datos.get("usuario", ""),
+        }
+        if not save_to_csv(PEDIDOS_FILE, fila):
+            return None
+        cola.actualizar()
+        return pedido_id
+
+def cambiar_estado(pedido_id, estado, usuario=""):
+    """
+    Cambia el estado de un pedido abierto agregando una fila a PEDIDOS_ESTADOS_FILE
+
+    Args:
+        pedido_id (str): Id del pedido ('P12', 'W3')
+        estado (str): Estado nuevo (uno de ESTADOS)
+        usuario (str, optional): Quien hace el cambio
+
+    Returns:
+        tuple: (éxito, mensaje de error o None)
+    """
+    if estado not in ESTADOS:
+        return False, f"Estado inválido. Opciones: {', '.join(ESTADOS)}"
+    with _lock:
+        cola = _cola()
+        pedido = cola.abiertos.get(pedido_id)
+        if pedido is None:
+            return False, f"No hay un pedido abierto con id {pedido_id}"
+        if pedido.estado == estado:
+            return False, f"El pedido {pedido_id} ya está {estado.lower()}"
+        fila = {
+            "fecha": get_current_timestamp(),
+            "pedido": pedido_id,
+            "estado": estado,
+            "usuario": usuario,
+        }
+        if not save_to_csv(PEDIDOS_ESTADOS_FILE, fila):
+            return False, "Error al guardar el cambio de estado"
+        cola.actualizar()
+        return True, None
@@ -0,0 +1,264 @@
+import asyncio
+import contextvars
+import cProfile
+import io
+import logging
+import pstats
+import threading
+import time
+import tracemalloc
+
+# Configuración de logging
+logger = logging.getLogger(__name__)
+
+MODO_CPU = "cpu"
+MODO_MEMORIA = "memoria"
+
+# Cantidad de funciones / sitios de asignación incluidos en el informe
+LINEAS_INFORME = 40
+
+# Sesión que perfila el update en curso (se propaga a los hilos de asyncio.to_thread)
+_sesion_actual = contextvars.ContextVar("sesion_perfil", default=None)
+
+def _describir(update):
+    """Descripción corta de un update para el informe"""
+    mensaje = getattr(update, 'effective_message', None)
+    chat = getattr(update, 'effective_chat', None)
+    origen = f"chat {chat.id}" if chat is not None else "sin chat"
+    if mensaje is not None and mensaje.text:
+        texto = mensaje.text if mensaje.text.startswith('/') else "texto"
+        return f"{texto.split()[0]} ({origen})"
+    if getattr(update, 'callback_query', None) is not None:
+        return f"callback ({origen})"
+    return f"{type(update).__name__} ({origen})"
+
+def _habilitar(perfil):
+    """Activa un perfil; en Python 3.12+ solo puede haber uno activo a la vez"""
+    try:
+        perfil.enable()
+        return True
+    except ValueError:
+        return False
+
+class _CorrutinaPerfilada:
+    """
+    Ejecuta una corrutina activando el perfil solo mientras ella corre.
+
+    Entre cada paso (cada await que suspende) el perfil se desactiva, así
+    el tiempo de otros chats que el event loop atiende mientras tanto no se
+    mezcla en el informe ni se ve afectado por el perfilador.
+    """
+
+    def __init__(self, corrutina, sesion):
+        self._corrutina = corrutina
+        self._sesion = sesion
+
+    def __await__(self):
+        corrutina = self._corrutina
+        valor, excepcion = None, None
+        while True:
+            activo = _habilitar(self._sesion.perfil)
+            if not activo:
+                self._sesion.pasos_omitidos += 1
+            try:
+                if excepcion is not None:
+                    resultado = corrutina.throw(excepcion)
+                else:
+                    resultado = corrutina.send(valor)
+            except StopIteration as fin:
+                return fin.value
+            finally:
+                if activo:
+                    self._sesion.perfil.disable()
+            try:
+                valor, excepcion = (yield resultado), None
+            except BaseException as e:
+                valor, excepcion = None, e
+
+class SesionPerfil:
+    """
+    Perfilado de los próximos N updates, iniciado con /perf
+
+    En modo 'cpu' se acumula un cProfile de los pasos de cada update y de las
+    funciones que estos ejecutan en hilos con ejecutar_en_hilo(). En modo
+    'memoria' se toma una instantánea de tracemalloc al iniciar y otra al
+    terminar, y se informa la diferencia por sitio de asignación.
+    """
+
+    def __init__(self, modo, cantidad, chat_id, bot):
+        self.modo = modo
+        self.cantidad = cantidad
+        self.chat_id = chat_id
+        self.bot = bot
+        self.perfil = cProfile.Profile()
+        self.pasos_omitidos = 0
+        self.duraciones = []
+        self._perfiles_hilos = []
+        self._lock = threading.Lock()
+        self._asignados = 0
+        self._inicio = time.perf_counter()
+        self._instantanea = None
+        if modo == MODO_MEMORIA:
+            tracemalloc.start(10)
+            self._instantanea = tracemalloc.take_snapshot()
+
+    @property
+    def restantes(self):
+        """Updates que aún falta asignar a la sesión"""
+        return self.cantidad - self._asignados
+
+    async def procesar(self, update, corrutina):
+        """Procesa un update dentro de la sesión (llamado por el procesador de updates)"""
+        if self.restantes <= 0:
+            await corrutina
+            return
+
+        self._asignados += 1
+        token = _sesion_actual.set(self)
+        inicio = time.perf_counter()
+        try:
+            if self.modo == MODO_CPU:
+                await _CorrutinaPerfilada(corrutina, self)
+            else:
+                await corrutina
+        finally:
+            _sesion_actual.reset(token)
+            self.duraciones.append((_describir(update), time.perf_counter() - inicio))
+            if len(self.duraciones) >= self.cantidad:
+                # El informe se genera y envía aparte para no retener el turno del chat
+                perfilador.finalizar_aparte(self)
+
+    def perfilar_llamada(self, funcion, *args, **kwargs):
+        """Ejecuta una función en el hilo actual con un perfil propio"""
+        perfil = cProfile.Profile()
+        if not _habilitar(perfil):
+            self.pasos_omitidos += 1
+            return funcion(*args, **kwargs)
+        try:
+            return funcion(*args, **kwargs)
+        finally:
+            perfil.disable()
+            with self._lock:
+                self._perfiles_hilos.append(perfil)
+
+    def _informe_cpu(self, salida):
+        perfiles = [self.perfil] + self._perfiles_hilos
+        estadisticas = None
+        for perfil in perfiles:
+            perfil.create_stats()
+            if not perfil.stats:
+                continue
+            if estadisticas is None:
+                estadisticas = pstats.Stats(perfil, stream=salida)
+            else:
+                estadisticas.add(perfil)
+        if estadisticas is None:
+            salida.write("No se registraron llamadas.\n")
+            return
+        estadisticas.strip_dirs()
+        salida.write("=== Funciones por tiempo acumulado ===\n")
+        estadisticas.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(LINEAS_INFORME)
+        salida.write("=== Funciones por tiempo propio ===\n")
+        estadisticas.sort_stats(pstats.SortKey.TIME).print_stats(LINEAS_INFORME)
+
+    def _informe_memoria(self, salida):
+        final = tracemalloc.take_snapshot()
+        actual, pico = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        filtros = [
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+        ]
+        diferencias = final.filter_traces(filtros).compare_to(
+            self._instantanea.filter_traces(filtros), 'lineno'
+        )
+        salida.write(f"Memoria rastreada: actual {actual / 1024:.1f} KB, pico {pico / 1024:.1f} KB\n\n")
+        salida.write("=== Sitios de asignación por diferencia de tamaño ===\n")
+        for diferencia in diferencias[:LINEAS_INFORME]:
+            salida.write(f"{diferencia}\n")
+
+    def generar_informe(self):
+        """
+        Genera el informe de la sesión
+
+        Returns:
+            str: Informe en texto plano
+        """
+        salida = io.StringIO()
+        salida.write(f"Perfil {self.modo}: {len(self.duraciones)} updates en "
+                     f"{time.perf_counter() - self._inicio:.1f}s\n")
+        if self.pasos_omitidos:
+            salida.write(f"Pasos sin perfilar (otro perfilador activo): {self.pasos_omitidos}\n")
+        salida.write("\n=== Duración por update ===\n")
+        for descripcion, duracion in self.duraciones:
+            salida.write(f"{duracion * 1000:10.1f} ms  {descripcion}\n")
+        salida.write("\n")
+        if self.modo == MODO_CPU:
+            self._informe_cpu(salida)
+        else:
+            self._informe_memoria(salida)
+        return salida.getvalue()
+
+class Perfilador:
+    """Mantiene la sesión de perfilado activa (como máximo una a la vez)"""
+
+    def __init__(self):
+        self.sesion = None
+        # Informes en curso: asyncio solo guarda referencias débiles a las tareas
+        self._tareas = set()
+
+    def iniciar(self, modo, cantidad, chat_id, bot):
+        """
+        Inicia una sesión de perfilado
+
+        Returns:
+            SesionPerfil: La sesión iniciada, o None si ya hay una activa
+        """
+        if self.sesion is not None:
+            return None
+        self.sesion = SesionPerfil(modo, cantidad, chat_id, bot)
+        logger.info(f"Perfilado {modo} iniciado para los próximos {cantidad} updates")
+        return self.sesion
+
+    async def finalizar(self, sesion=None):
+        """
+        Termina la sesión (la activa si no se indica) y envía el informe como documento
+
+        Returns:
+            bool: True si había una sesión que finalizar
+        """
+        sesion = sesion or self.sesion
+        if sesion is None or sesion is not self.sesion:
+            return False
+        # Desde aquí los updates nuevos ya no pasan por la sesión
+        self.sesion = None
+        informe = await asyncio.to_thread(sesion.generar_informe)
+        try:
+            await sesion.bot.send_document(
+                sesion.chat_id,
+                document=io.BytesIO(informe.encode('utf-8')),
+                filename=f"perfil_{sesion.modo}_{time.strftime('%Y%m%d_%H%M%S')}.txt",
+                caption=f"Perfil {sesion.modo} de {len(sesion.duraciones)} updates"
+            )
+        except Exception as e:
+            logger.error(f"Error enviando el informe de perfilado: {e}")
+        return True
+
+    def finalizar_aparte(self, sesion):
+        """Lanza finalizar(sesion) en una tarea propia, conservando su referencia"""
+        tarea = asyncio.create_task(self.finalizar(sesion))
+        self._tareas.add(tarea)
+        tarea.add_done_callback(self._tareas.discard)
+
+async def ejecutar_en_hilo(funcion, *args, **kwargs):
+    """
+    Como asyncio.to_thread, pero si el update en curso se está perfilando
+    también se perfila la función ejecutada en el hilo
+    """
+    sesion = _sesion_actual.get()
+    if sesion is None or sesion.modo != MODO_CPU:
+        return await asyncio.to_thread(funcion, *args, **kwargs)
+    return await asyncio.to_thread(sesion.perfilar_llamada, funcion, *args, **kwargs)
+
+# Instancia única consultada por el procesador de updates
+perfilador = Perfilador()
@@ -0,0 +1,125 @@
+"""
+Precarga especulativa de datos durante las conversaciones.
+
+Cuando un paso de una conversación revela una clave (p. ej. el proveedor en
+/compra), se lanza en segundo plano la lectura de los datos relacionados y
+la tarea se guarda en user_data. Los pasos siguientes usan el resultado si
+ya está listo (sugerencias) y el paso final lo espera, normalmente ya
+terminado, en lugar de leer las tablas en ese momento.
+
+Las tareas se crean con el contexto del update, así que leen los datos del
+negocio en curso. Un resultado más antiguo que VIGENCIA segundos se vuelve
+a leer.
+"""
+import asyncio
+import logging
+import time
+
+from config import ADELANTOS_FILE
+from utils.db import get_dataframe
+from utils.metricas import registrar_cache
+from utils.perfilado import ejecutar_en_hilo
+from utils.ranking import compras_recientes
+
+# Logger
+logger = logging.getLogger(__name__)
+
+# Clave de user_data con las precargas de la conversación
+CLAVE = "precargas"
+
+# Segundos que se considera vigente un resultado precargado
+VIGENCIA = 300
+
+class Precarga:
+    """Tarea en segundo plano con los argumentos con que se lanzó"""
+
+    __slots__ = ("argumentos", "tarea", "inicio")
+
+    def __init__(self, argumentos, tarea):
+        self.argumentos = argumentos
+        self.tarea = tarea
+        self.inicio = time.monotonic()
+
+    def vigente(self, argumentos):
+        return self.argumentos == argumentos and time.monotonic() - self.inicio < VIGENCIA
+
+def _revisar_error(tarea):
+    # Recupera la excepción para que asyncio no la reporte como no atendida;
+    # obtener() vuelve a leer los datos
+    if not tarea.cancelled() and tarea.exception() is not None:
+        logger.warning(f"Error en precarga: {tarea.exception()}")
+
+def iniciar(user_data, nombre, funcion, *args):
+    """
+    Lanza funcion(*args) en un hilo sin esperar el resultado
+
+    Args:
+        user_data (dict): Datos de la conversación
+        nombre (str): Nombre de la precarga (también etiqueta de métricas)
+        funcion: Función bloqueante que lee los datos
+        *args: Argumentos (la clave revelada por la conversación)
+    """
+    precargas = user_data.setdefault(CLAVE, {})
+    anterior = precargas.get(nombre)
+    if anterior is not None and anterior.vigente(args):
+        return
+    tarea = asyncio.get_running_loop().create_task(ejecutar_en_hilo(funcion, *args))
+    tarea.add_done_callback(_revisar_error)
+    precargas[nombre] = Precarga(args, tarea)
+
+def disponible(user_data, nombre, *args):
+    """
+    Resultado de una precarga si ya terminó, sin esperar
+
+    Returns:
+        Resultado de la función, o None si aún no está listo o falló
+    """
+    precarga = user_data.get(CLAVE, {}).get(nombre)
+    if precarga is None or not precarga.vigente(args) or not precarga.tarea.done():
+        return None
+    if precarga.tarea.cancelled() or precarga.tarea.exception() is not None:
+        return None
+    return precarga.tarea.result()
+
+async def obtener(user_data, nombre, funcion, *args):
+    """
+    Resultado de una precarga, esperándola si sigue en curso; si no se lanzó,
+    venció o falló, ejecuta la función en un hilo
+
+    Returns:
+        Resultado de funcion(*args)
+    """
+    precarga = user_data.get(CLAVE, {}).get(nombre)
+    if precarga is not None and precarga.vigente(args):
+        acierto = precarga.tarea.done()
+        try:
+            resultado = await precarga.tarea
+            registrar_cache(nombre, acierto)
+            return resultado
+        except Exception:
+            pass
+    registrar_cache(nombre, False)
+    return await ejecutar_en_hilo(funcion, *args)
+
+def datos_proveedor(proveedor):
+    """
+    Datos de un proveedor que usa la conversación de /compra
+
+    Args:
+        proveedor (str): Nombre del proveedor
+
+    Returns:
+        dict: Saldo de adelantos pendientes ('adelantos'), últimos precios por kg
+        ('precios', del más reciente al más antiguo; ver utils/ranking.py) y
+        última calidad comprada ('calidad', o None)
+    """
+    df_adelantos = get_dataframe(ADELANTOS_FILE, columns=['proveedor', 'saldo_restante'])
+    saldo = 0.0
+    if not df_adelantos.empty:
+        adelantos = df_adelantos[df_adelantos['proveedor'] == proveedor]
+        saldo = float(adelantos.loc[adelantos['saldo_restante'] > 0, 'saldo_restante'].sum())
+
+    # De los acumuladores de compras: también los deja al día para la alerta de precio
+    precios, calidad = compras_recientes(proveedor)
+
+    return {"adelantos": saldo, "precios": precios, "calidad": calidad}
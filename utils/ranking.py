@@ -0,0 +1,236 @@
+"""
+Ranking de proveedores (/ranking_proveedores) y alerta de precio de /compra.
+
+Las compras se resumen en acumuladores por proveedor: totales, por día y los
+últimos precios por kg (media móvil). Se mantienen de forma incremental como
+el índice de /buscar (utils/busqueda.py): antes de cada consulta se suman solo
+las compras agregadas desde la anterior, y si la tabla se reescribió
+(update_csv, update_record, archivo del historial) se recalculan completos.
+Las compras archivadas (utils/archivo.py) también se suman, como en /reporte:
+al recalcular se leen primero los meses del archivo y luego la tabla.
+
+Un ranking suma los acumulados de los días del período (no las compras) y
+elige los primeros con un montículo de tamaño k (heapq.nlargest). Los
+acumuladores son una caché del negocio en curso (utils/negocios.cache_negocio).
+"""
+import heapq
+import logging
+import os
+import sys
+import threading
+from collections import deque
+from datetime import date
+
+from config import COMPRAS_FILE, ALERTA_PRECIO_PORCENTAJE, ALERTA_PRECIO_COMPRAS
+from utils.archivo import iterar_segmento, segmentos
+from utils.db import leer_desde, marca_tabla
+from utils.helpers import parse_float
+from utils.negocios import cache_negocio
+
+# Logger
+logger = logging.getLogger(__name__)
+
+CACHE_ESTADISTICAS = "estadisticas_compras"
+
+TABLA_COMPRAS = os.path.basename(COMPRAS_FILE).split('.')[0]
+
+# Criterios de /ranking_proveedores: título y valor de un acumulado
+CRITERIOS = {
+    "kg": ("Kilos comprados", lambda acumulado: acumulado.kg),
+    "gasto": ("Gasto", lambda acumulado: acumulado.gasto),
+    "precio": ("Precio promedio por kg", lambda acumulado: acumulado.precio_promedio),
+}
+
+# Compras previas necesarias para comparar un precio con la media móvil
+MINIMO_ALERTA = 3
+
+# Evita recalcular dos veces los acumuladores en consultas simultáneas
+_lock = threading.Lock()
+
+class Acumulado:
+    """Kilos, gasto y precio promedio (ponderado por kilos) de un conjunto de compras"""
+
+    __slots__ = ("kg", "gasto", "importe", "compras")
+
+    def __init__(self):
+        self.kg = 0.0
+        self.gasto = 0.0
+        self.importe = 0.0      # suma de precio_kg * cantidad
+        self.compras = 0
+
+    def agregar(self, kg, gasto, precio):
+        self.kg += kg
+        self.gasto += gasto
+        self.importe += precio * kg
+        self.compras += 1
+
+    def sumar(self, otro):
+        self.kg += otro.kg
+        self.gasto += otro.gasto
+        self.importe += otro.importe
+        self.compras += otro.compras
+
+    @property
+    def precio_promedio(self):
+        return self.importe / self.kg if self.kg else 0.0
+
+class EstadisticasCompras:
+    """Acumuladores por proveedor de la tabla de compras"""
+
+    def __init__(self):
+        self.marca = None
+        self.fin = 0            # posición desde la que seguir leyendo
+        self.totales = {}       # proveedor -> Acumulado
+        self.dias = {}          # ordinal del día -> {proveedor: Acumulado}
+        self.precios = {}       # proveedor -> últimos precios por kg
+        self.calidades = {}     # proveedor -> última calidad comprada
+
+    def __sizeof__(self):
+        # Para el presupuesto de memoria del negocio (utils/negocios._estimar_memoria)
+        return (object.__sizeof__(self) + sys.getsizeof(self.totales) + sys.getsizeof(self.dias)
+                + sum(sys.getsizeof(proveedores) for proveedores in self.dias.values())
+                + sum(sys.getsizeof(precios) for precios in self.precios.values()))
+
+    def actualizar(self):
+        """Suma las compras agregadas desde la última vez (o todas si la tabla o el archivo cambiaron)"""
+        archivados = segmentos(TABLA_COMPRAS)
+        marca = (marca_tabla(COMPRAS_FILE), _marca_archivo(archivados))
+        if marca != self.marca:
+            self.__init__()
+            self.marca = marca
+            # Los meses archivados son anteriores a todas las filas de la tabla
+            for ruta, _encabezado in archivados:
+                for fila in iterar_segmento(ruta):
+                    self._agregar(fila)
+
+        nuevas = 0
+        for _posicion, siguiente, fila in leer_desde(COMPRAS_FILE, self.fin):
+            self.fin = siguiente
+            self._agregar(fila)
+            nuevas += 1
+        if nuevas:
+            logger.debug(f"Estadísticas de compras: {nuevas} compras nuevas")
+
+    def _agregar(self, fila):
+        """Suma una compra (fila de texto de la tabla o del archivo)"""
+        proveedor = fila.get("proveedor")
+        if not proveedor:
+            return
+        proveedor = str(proveedor)
+        kg = parse_float(fila.get("cantidad"))
+        precio = parse_float(fila.get("precio_kg"))
+        gasto = parse_float(fila.get("total"), precio * kg)
+
+        acumulado = self.totales.get(proveedor)
+        if acumulado is None:
+            acumulado = self.totales[proveedor] = Acumulado()
+        acumulado.agregar(kg, gasto, precio)
+
+        try:
+            dia = date.fromisoformat(str(fila.get("fecha"))[:10]).toordinal()
+        except ValueError:
+            dia = None
+        if dia is not None:
+            del_dia = self.dias.get(dia)
+            if del_dia is None:
+                del_dia = self.dias[dia] = {}
+            acumulado = del_dia.get(proveedor)
+            if acumulado is None:
+                acumulado = del_dia[proveedor] = Acumulado()
+            acumulado.agregar(kg, gasto, precio)
+
+        if fila.get("calidad"):
+            self.calidades[proveedor] = str(fila.get("calidad"))
+        if precio > 0:
+            precios = self.precios.get(proveedor)
+            if precios is None:
+                precios = self.precios[proveedor] = deque(maxlen=ALERTA_PRECIO_COMPRAS)
+            precios.append(precio)
+
+    def acumulados(self, desde=None, hasta=None):
+        """Acumulado por proveedor de las compras del período (todas sin período)"""
+        if desde is None and hasta is None:
+            return self.totales
+        minimo = desde.toordinal() if desde else date.min.toordinal()
+        maximo = hasta.toordinal() if hasta else date.max.toordinal()
+        resultado = {}
+        for dia, proveedores in self.dias.items():
+            if not minimo <= dia <= maximo:
+                continue
+            for proveedor, acumulado in proveedores.items():
+                total = resultado.get(proveedor)
+                if total is None:
+                    total = resultado[proveedor] = Acumulado()
+                total.sumar(acumulado)
+        return resultado
+
+def _marca_archivo(archivados):
+    """Identifica el contenido del archivo de compras: cambia al archivar un mes"""
+    return tuple((ruta, encabezado["filas"], encabezado.get("fecha_max")) for ruta, encabezado in archivados)
+
+def _estadisticas():
+    """Acumuladores del negocio en curso, al día con la tabla de compras"""
+    cache = cache_negocio(CACHE_ESTADISTICAS)
+    estadisticas = cache.get("compras")
+    if estadisticas is None:
+        estadisticas = cache["compras"] = EstadisticasCompras()
+    estadisticas.actualizar()
+    return estadisticas
+
+def ranking_proveedores(desde=None, hasta=None, cantidad=5):
+    """
+    Mejores proveedores por cada criterio de CRITERIOS
+
+    Args:
+        desde (date, optional): Primer día del período
+        hasta (date, optional): Último día del período
+        cantidad (int, optional): Proveedores por criterio
+
+    Returns:
+        dict: criterio -> [(proveedor, Acumulado), ...] de mayor a menor
+    """
+    with _lock:
+        acumulados = _estadisticas().acumulados(desde, hasta)
+        return {
+            criterio: heapq.nlargest(cantidad, acumulados.items(), key=lambda par, valor=valor: valor(par[1]))
+            for criterio, (_titulo, valor) in CRITERIOS.items()
+        }
+
+def compras_recientes(proveedor):
+    """
+    Últimos precios por kg y última calidad de un proveedor
+
+    Args:
+        proveedor (str): Nombre del proveedor
+
+    Returns:
+        tuple: (precios del más reciente al más antiguo, hasta
+        ALERTA_PRECIO_COMPRAS; última calidad o None)
+    """
+    with _lock:
+        estadisticas = _estadisticas()
+        precios = estadisticas.precios.get(proveedor, ())
+        return list(reversed(precios)), estadisticas.calidades.get(proveedor)
+
+def desviacion_precio(precios, precio):
+    """
+    Compara el precio de una compra nueva con la media móvil del proveedor
+
+    Args:
+        precios (list): Precios recientes del proveedor (sin la compra nueva),
+            como los devuelve compras_recientes
+        precio (float): Precio por kg de la compra
+
+    Returns:
+        tuple: (media, desviación en %) si el precio se aparta más de
+        ALERTA_PRECIO_PORCENTAJE de la media, o None
+    """
+    if ALERTA_PRECIO_PORCENTAJE <= 0 or len(precios) < MINIMO_ALERTA:
+        return None
+    media = sum(precios) / len(precios)
+    if media <= 0:
+        return None
+    desviacion = (precio - media) / media * 100
+    if abs(desviacion) <= ALERTA_PRECIO_PORCENTAJE:
+        return None
+    return media, desviacion
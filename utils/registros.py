@@ -0,0 +1,306 @@
+import csv
+import sys
+from collections.abc import MutableMapping
+from datetime import datetime
+from functools import lru_cache
+
+from utils.esquemas import (
+    TABLAS, TEXTO, CATEGORIA, NUMERO, PORCENTAJE, ENTERO, FECHA, CAMPO_EPOCH,
+)
+from utils.helpers import fecha_a_epoch
+
+def _texto(valor):
+    return valor
+
+def _categoria(valor):
+    return sys.intern(valor) if isinstance(valor, str) else valor
+
+def _numero(valor):
+    """Convierte a float; si no es un número se conserva el valor original ('' incluido)"""
+    if isinstance(valor, float):
+        return valor
+    try:
+        return float(valor)
+    except (TypeError, ValueError):
+        return valor
+
+def _entero(valor):
+    """Convierte a int; si no es un entero se conserva el valor original"""
+    if isinstance(valor, int):
+        return valor
+    try:
+        return int(valor)
+    except (TypeError, ValueError):
+        return valor
+
+def _fecha(valor):
+    """Convierte 'YYYY-MM-DD HH:MM:SS' a datetime; si no se puede se conserva el valor original"""
+    if isinstance(valor, str):
+        try:
+            return datetime.fromisoformat(valor)
+        except ValueError:
+            return valor
+    return valor
+
+# Los porcentajes también se cargan como float: el float32 solo se usa en los DataFrames
+CONVERSORES = {
+    TEXTO: _texto, CATEGORIA: _categoria, NUMERO: _numero, PORCENTAJE: _numero,
+    ENTERO: _entero, FECHA: _fecha,
+}
+
+def fecha_de(valor):
+    """
+    Devuelve un valor de fecha como datetime, tanto si ya fue convertido
+    como si es el texto original
+
+    Args:
+        valor: datetime, texto 'YYYY-MM-DD HH:MM:SS' o vacío
+
+    Returns:
+        datetime: Fecha, o None si está vacía o no es válida
+    """
+    if isinstance(valor, datetime):
+        return valor
+    if not valor or not isinstance(valor, str):
+        return None
+    try:
+        # Mucho más rápido que strptime(FORMATO_FECHA) y acepta el mismo formato
+        return datetime.fromisoformat(valor)
+    except ValueError:
+        return None
+
+def epoch_de(fila):
+    """
+    Segundos UTC de la fecha de una fila: su fecha_epoch, o su fecha
+    convertida si se guardó antes de que existiera esa columna
+
+    Args:
+        fila: Registro o diccionario
+
+    Returns:
+        int: Segundos, o None si la fila no tiene fecha válida
+    """
+    epoch = fila.get(CAMPO_EPOCH)
+    if isinstance(epoch, int):
+        return epoch
+    if epoch is not None:
+        # Texto sin convertir, float o entero de NumPy (Excel); vacío o nulo si no es válido
+        try:
+            return int(epoch)
+        except (TypeError, ValueError):
+            pass
+    return fecha_a_epoch(fila.get('fecha'))
+
+class Registro(MutableMapping):
+    """
+    Fila de una tabla con campos tipados en __slots__.
+
+    Se comporta como un diccionario (r['total'], r.get('cantidad', 0),
+    r.update(...), dict(r)) para que los handlers existentes sigan
+    funcionando, pero ocupa mucha menos memoria y los números y fechas ya
+    vienen convertidos. Las columnas que no están en el esquema de la tabla
+    se guardan en un diccionario aparte.
+    """
+
+    __slots__ = ("_extra",)
+
+    # Definidos por cada subclase (ver definir_registro)
+    _campos = ()
+    _conversores = {}
+
+    def __init__(self, valores=None, **kwargs):
+        self._extra = None
+        if valores is not None:
+            self.update(valores)
+        if kwargs:
+            self.update(kwargs)
+
+    def __getitem__(self, clave):
+        if clave in self._conversores:
+            try:
+                return getattr(self, clave)
+            except AttributeError:
+                raise KeyError(clave) from None
+        if self._extra is not None and clave in self._extra:
+            return self._extra[clave]
+        raise KeyError(clave)
+
+    def __setitem__(self, clave, valor):
+        conversor = self._conversores.get(clave)
+        if conversor is not None:
+            setattr(self, clave, conversor(valor))
+        else:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[clave] = valor
+
+    def __delitem__(self, clave):
+        if clave in self._conversores:
+            try:
+                delattr(self, clave)
+            except AttributeError:
+                raise KeyError(clave) from None
+        elif self._extra is not None and clave in self._extra:
+            del self._extra[clave]
+        else:
+            raise KeyError(clave)
+
+    def __iter__(self):
+        for campo in self._campos:
+            if hasattr(self, campo):
+                yield campo
+        if self._extra:
+            yield from self._extra
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __contains__(self, clave):
+        if clave in self._conversores:
+            return hasattr(self, clave)
+        return self._extra is not None and clave in self._extra
+
+    def __repr__(self):
+        return f"{type(self).__name__}({dict(self)!r})"
+
+def definir_registro(nombre, campos):
+    """
+    Crea la clase de registro de una tabla
+
+    Args:
+        nombre (str): Nombre de la clase
+        campos (dict): {campo: tipo} con los tipos de utils/esquemas.py
+
+    Returns:
+        type: Subclase de Registro con un slot por campo
+    """
+    return type(nombre, (Registro,), {
+        "__slots__": tuple(campos),
+        "_campos": tuple(campos),
+        "_conversores": {campo: CONVERSORES[tipo] for campo, tipo in campos.items()},
+    })
+
+# Clases de registro de las tablas con esquema (ver utils/esquemas.py)
+_NOMBRES = {
+    "compras": "Compra", "proceso": "Proceso", "gastos": "Gasto", "ventas": "Venta",
+    "adelantos": "Adelanto", "pedidos": "Pedido", "pedidos_estados": "EstadoPedido",
+    "linaje": "VinculoLote", "linaje_nodos": "NodoLote", "suscripciones": "Suscripcion",
+}
+REGISTROS = {tabla: definir_registro(_NOMBRES[tabla], campos) for tabla, campos in TABLAS.items()}
+
+def clase_registro(tabla):
+    """Clase de registro de una tabla, o None si la tabla no tiene esquema"""
+    return REGISTROS.get(tabla)
+
+# Conversores que el constructor generado escribe en línea
+_EN_LINEA = {_numero: "float", _entero: "int", _fecha: "fromisoformat"}
+
+@lru_cache(maxsize=64)
+def _constructor_fila(clase, encabezado):
+    """
+    Genera una función que crea un registro a partir de una fila de csv.reader.
+
+    Como collections.namedtuple, el código se genera una vez por clase y
+    encabezado: cada columna se asigna a su slot con la conversión escrita en
+    línea (float, int, datetime.fromisoformat, sys.intern), sin una llamada a
+    función de Python por campo. Así la carga tipada cuesta lo mismo que
+    csv.DictReader.
+    """
+    lineas = ["def crear(fila):", "    r = nuevo(clase)"]
+    extras = []
+    for posicion, columna in enumerate(encabezado):
+        if columna is None:
+            continue
+        conversor = clase._conversores.get(columna)
+        if conversor is None:
+            extras.append(f"{columna!r}: fila[{posicion}]")
+        elif conversor in _EN_LINEA:
+            funcion = _EN_LINEA[conversor]
+            lineas += [
+                f"    v = fila[{posicion}]",
+                "    try:",
+                f"        r.{columna} = {funcion}(v)",
+                "    except ValueError:",
+                # Valor no convertible ('' incluido): se conserva tal cual
+                f"        r.{columna} = v",
+            ]
+        elif conversor is _categoria:
+            lineas.append(f"    r.{columna} = intern(fila[{posicion}])")
+        else:
+            lineas.append(f"    r.{columna} = fila[{posicion}]")
+    lineas.append(f"    r._extra = {{{', '.join(extras)}}}" if extras else "    r._extra = None")
+    lineas.append("    return r")
+
+    espacio = {"nuevo": clase.__new__, "clase": clase,
+               "fromisoformat": datetime.fromisoformat, "intern": sys.intern}
+    exec("\n".join(lineas), espacio)
+    return espacio["crear"]
+
+def _preparar_lectura(reader, clase):
+    """Lee el encabezado y devuelve (constructor de filas, ancho), o None si el archivo está vacío"""
+    encabezado = next(reader, None)
+    if not encabezado:
+        return None
+
+    # Columnas repetidas: como en csv.DictReader, gana la última
+    vistas = set()
+    for posicion in range(len(encabezado) - 1, -1, -1):
+        if encabezado[posicion] in vistas:
+            encabezado[posicion] = None
+        else:
+            vistas.add(encabezado[posicion])
+
+    return _constructor_fila(clase, tuple(encabezado)), len(encabezado)
+
+def cargar_registros(archivo, clase):
+    """
+    Lee un CSV como lista de registros tipados
+
+    Args:
+        archivo: Archivo CSV abierto en modo texto
+        clase (type): Clase de registro (ver definir_registro)
+
+    Returns:
+        list: Lista de registros
+    """
+    reader = csv.reader(archivo)
+    preparado = _preparar_lectura(reader, clase)
+    if preparado is None:
+        return []
+
+    crear, ancho = preparado
+    registros = []
+    agregar = registros.append
+    for fila in reader:
+        if len(fila) < ancho:
+            if not fila:
+                continue
+            # Igual que csv.DictReader: las columnas faltantes quedan vacías
+            fila += [''] * (ancho - len(fila))
+        agregar(crear(fila))
+    return registros
+
+def iterar_registros(archivo, clase):
+    """
+    Igual que cargar_registros, pero genera los registros de a uno sin
+    cargar el archivo completo en memoria
+
+    Args:
+        archivo: Archivo CSV abierto en modo texto
+        clase (type): Clase de registro (ver definir_registro)
+
+    Yields:
+        Registro: Cada fila del archivo
+    """
+    reader = csv.reader(archivo)
+    preparado = _preparar_lectura(reader, clase)
+    if preparado is None:
+        return
+
+    crear, ancho = preparado
+    for fila in reader:
+        if len(fila) < ancho:
+            if not fila:
+                continue
+            fila += [''] * (ancho - len(fila))
+        yield crear(fila)
@@ -1,6 +1,16 @@
 import re
+from collections import namedtuple
 from datetime import datetime
 
+# Expresiones regulares precompiladas (se compilan una sola vez al importar)
+_RE_SEPARADORES_TELEFONO = re.compile(r'[\s-]')
+_RE_CELULAR = re.compile(r'^9\d{8}$')
+_RE_FIJO = re.compile(r'^0\d{1,2}\d{6,7}$')
+_RE_EMAIL = re.compile(r'^[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+$')
+_RE_CARACTERES_PELIGROSOS = re.compile(r'[\'";]')
+_RE_FECHA = re.compile(r'^(\d{2})/(\d{2})/(\d{4})$')
+_RE_FECHA_ISO = re.compile(r'^(\d{4})-(\d{2})-(\d{2})$')
+
 def validate_number(text):
     """
     Valida si un texto es un número (entero o decimal)
@@ -31,19 +41,13 @@ def validate_phone(text):
     """
     try:
         # Eliminar espacios y guiones
-        text = re.sub(r'[\s-]', '', text)
-        
-        # Validar que sea un número de 9 dígitos que comience con 9
-        if re.match(r'^9\d{8}$', text):
-            return True
-        
-        # O un número fijo con código de área (01, 04, etc.)
-        if re.match(r'^0\d{1,2}\d{6,7}$', text):
-            return True
-        
-        return False
-    except:
+        text = _RE_SEPARADORES_TELEFONO.sub('', text)
+    except TypeError:
         return False
+    
+    # Validar que sea un número de 9 dígitos que comience con 9,
+    # o un número fijo con código de área (01, 04, etc.)
+    return bool(_RE_CELULAR.match(text) or _RE_FIJO.match(text))
 
 def validate_date(text):
     """
@@ -88,9 +92,8 @@ def validate_email(text):
         bool: True si es un correo válido, False en caso contrario
     """
     try:
-        pattern = r'^[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+$'
-        return re.match(pattern, text) is not None
-    except:
+        return _RE_EMAIL.match(text) is not None
+    except TypeError:
         return False
 
 def validate_text_length(text, min_length=1, max_length=None):
@@ -169,9 +172,202 @@ def sanitize_text(text):
         str: Texto sanitizado
     """
     # Eliminar caracteres potencialmente peligrosos
-    text = re.sub(r'[\'";]', '', text)
+    text = _RE_CARACTERES_PELIGROSOS.sub('', text)
     
     # Limitar a longitud razonable
     text = text[:500]
     
-    return text.strip()
\ No newline at end of file
+    return text.strip()
+
+# ---------------------------------------------------------------------------
+# Validación por lotes con esquemas declarativos
+# ---------------------------------------------------------------------------
+
+# Error estructurado devuelto por la validación por lotes
+ErrorValidacion = namedtuple('ErrorValidacion', ['fila', 'campo', 'valor', 'mensaje'])
+
+# Esquemas de validación por tabla. Cada campo declara su tipo y restricciones:
+#   tipo: 'texto', 'numero', 'positivo', 'porcentaje', 'telefono', 'email',
+#         'fecha' (DD/MM/YYYY) o 'fecha_iso' (YYYY-MM-DD)
+#   requerido: si el campo debe existir y no estar vacío (por defecto True)
+#   max: longitud máxima para campos de texto
+ESQUEMAS = {
+    'compra': {
+        'proveedor': {'tipo': 'texto', 'max': 100},
+        'cantidad': {'tipo': 'positivo'},
+        'precio_kg': {'tipo': 'positivo'},
+        'calidad': {'tipo': 'texto', 'max': 50},
+    },
+    'gasto': {
+        'categoria': {'tipo': 'texto', 'max': 50},
+        'monto': {'tipo': 'positivo'},
+        'descripcion': {'tipo': 'texto', 'max': 500, 'requerido': False},
+    },
+    'venta': {
+        'cliente': {'tipo': 'texto', 'max': 100},
+        'cantidad': {'tipo': 'positivo'},
+        'precio_kg': {'tipo': 'positivo'},
+    },
+    'pedido': {
+        'cliente': {'tipo': 'texto', 'max': 100},
+        'telefono': {'tipo': 'telefono', 'requerido': False},
+        'cantidad': {'tipo': 'positivo'},
+        'fecha_entrega': {'tipo': 'fecha'},
+    },
+}
+
+def _a_float(valor):
+    """Convierte texto o número a float aceptando coma decimal; None si no es válido"""
+    if isinstance(valor, (int, float)):
+        return float(valor)
+    try:
+        return float(valor.strip().replace(',', '.').replace('%', ''))
+    except (AttributeError, ValueError):
+        return None
+
+def _regla_texto(valor):
+    return None if isinstance(valor, str) else "debe ser texto"
+
+def _regla_numero(valor):
+    return None if _a_float(valor) is not None else "debe ser un número"
+
+def _regla_positivo(valor):
+    numero = _a_float(valor)
+    if numero is None:
+        return "debe ser un número"
+    return None if numero > 0 else "debe ser mayor que cero"
+
+def _regla_porcentaje(valor):
+    numero = _a_float(valor)
+    if numero is None:
+        return "debe ser un número"
+    return None if 0 <= numero <= 100 else "debe estar entre 0 y 100"
+
+def _regla_telefono(valor):
+    if isinstance(valor, str):
+        valor = _RE_SEPARADORES_TELEFONO.sub('', valor)
+        if _RE_CELULAR.match(valor) or _RE_FIJO.match(valor):
+            return None
+    return "no es un teléfono válido"
+
+def _regla_email(valor):
+    if isinstance(valor, str) and _RE_EMAIL.match(valor):
+        return None
+    return "no es un correo válido"
+
+def _es_fecha_valida(anio, mes, dia):
+    try:
+        datetime(int(anio), int(mes), int(dia))
+        return True
+    except ValueError:
+        return False
+
+def _regla_fecha(valor):
+    coincidencia = _RE_FECHA.match(valor) if isinstance(valor, str) else None
+    if coincidencia:
+        dia, mes, anio = coincidencia.groups()
+        if _es_fecha_valida(anio, mes, dia):
+            return None
+    return "debe tener formato DD/MM/YYYY"
+
+def _regla_fecha_iso(valor):
+    coincidencia = _RE_FECHA_ISO.match(valor) if isinstance(valor, str) else None
+    if coincidencia and _es_fecha_valida(*coincidencia.groups()):
+        return None
+    return "debe tener formato YYYY-MM-DD"
+
+_REGLAS_POR_TIPO = {
+    'texto': _regla_texto,
+    'numero': _regla_numero,
+    'positivo': _regla_positivo,
+    'porcentaje': _regla_porcentaje,
+    'telefono': _regla_telefono,
+    'email': _regla_email,
+    'fecha': _regla_fecha,
+    'fecha_iso': _regla_fecha_iso,
+}
+
+def _compilar_campo(definicion):
+    """
+    Compila la definición de un campo en una función valor -> mensaje de error o None
+    
+    Args:
+        definicion (dict): Definición del campo según ESQUEMAS
+    
+    Returns:
+        function: Validador del campo
+    """
+    regla_tipo = _REGLAS_POR_TIPO[definicion['tipo']]
+    requerido = definicion.get('requerido', True)
+    max_length = definicion.get('max')
+    
+    def validar(valor):
+        if valor is None or (isinstance(valor, str) and valor.strip() == ''):
+            return "es obligatorio" if requerido else None
+        error = regla_tipo(valor)
+        if error is None and max_length is not None and isinstance(valor, str) and len(valor) > max_length:
+            error = f"excede {max_length} caracteres"
+        return error
+    
+    return validar
+
+def _compilar_esquemas(esquemas):
+    """Compila todos los esquemas una sola vez: {tabla: ((campo, validador), ...)}"""
+    return {
+        tabla: tuple((campo, _compilar_campo(definicion)) for campo, definicion in campos.items())
+        for tabla, campos in esquemas.items()
+    }
+
+_ESQUEMAS_COMPILADOS = _compilar_esquemas(ESQUEMAS)
+
+def _obtener_esquema(tabla):
+    try:
+        return _ESQUEMAS_COMPILADOS[tabla]
+    except KeyError:
+        raise ValueError(f"No existe esquema de validación para la tabla '{tabla}'") from None
+
+def validate_rows(tabla, filas):
+    """
+    Valida un lote de filas contra el esquema de una tabla en una sola llamada
+    
+    Args:
+        tabla (str): Nombre del esquema ('compra', 'gasto', 'venta', 'pedido')
+        filas (iterable): Filas a validar (diccionarios campo -> valor)
+    
+    Returns:
+        list: Lista de ErrorValidacion (vacía si todas las filas son válidas)
+    """
+    esquema = _obtener_esquema(tabla)
+    errores = []
+    for numero_fila, fila in enumerate(filas):
+        for campo, validar in esquema:
+            valor = fila.get(campo)
+            mensaje = validar(valor)
+            if mensaje is not None:
+                errores.append(ErrorValidacion(numero_fila, campo, valor, mensaje))
+    return errores
+
+def validate_column(tabla, campo, valores):
+    """
+    Valida todos los valores de una columna contra el esquema de una tabla
+    
+    Args:
+        tabla (str): Nombre del esquema ('compra', 'gasto', 'venta', 'pedido')
+        campo (str): Nombre del campo a validar
+        valores (iterable): Valores de la columna
+    
+    Returns:
+        list: Lista de ErrorValidacion (vacía si todos los valores son válidos)
+    """
+    for nombre, validar in _obtener_esquema(tabla):
+        if nombre == campo:
+            break
+    else:
+        raise ValueError(f"El campo '{campo}' no existe en el esquema '{tabla}'")
+    
+    errores = []
+    for numero_fila, valor in enumerate(valores):
+        mensaje = validar(valor)
+        if mensaje is not None:
+            errores.append(ErrorValidacion(numero_fila, campo, valor, mensaje))
+    return errores
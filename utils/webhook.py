@@ -0,0 +1,139 @@
+import asyncio
+import hmac
+import json
+import logging
+import signal
+
+from telegram import Update
+
+from config import (
+    WEBHOOK_URL, WEBHOOK_LISTEN, WEBHOOK_PORT, WEBHOOK_PATH, WEBHOOK_SECRET,
+    UPDATE_QUEUE_SIZE
+)
+from utils.http_server import ServidorHTTP, respuesta
+
+# Configuración de logging
+logger = logging.getLogger(__name__)
+
+# Segundos que Telegram debe esperar antes de reintentar cuando la cola está llena
+RETRY_AFTER_COLA_LLENA = 1
+
+def _updates_pendientes(application):
+    """Updates encolados más los que el procesador concurrente ya tomó y no terminó"""
+    procesador = application.update_processor
+    return application.update_queue.qsize() + getattr(procesador, 'total_pendientes', 0)
+
+def crear_receptor(application, secreto=WEBHOOK_SECRET, max_pendientes=UPDATE_QUEUE_SIZE):
+    """
+    Crea el handler HTTP que recibe updates de Telegram y los encola
+
+    Args:
+        application (Application): Aplicación del bot
+        secreto (str, optional): Valor esperado en X-Telegram-Bot-Api-Secret-Token
+        max_pendientes (int, optional): Updates pendientes a partir de los cuales se
+            rechazan nuevos. Con procesamiento concurrente la update_queue se vacía
+            enseguida, por eso también se cuentan los updates en proceso o en espera.
+
+    Returns:
+        function: Corrutina Solicitud -> Respuesta
+    """
+    estadisticas = {"recibidos": 0, "rechazados_cola_llena": 0, "rechazados_secreto": 0}
+    if not secreto:
+        logger.warning("WEBHOOK_SECRET vacío: el webhook acepta updates sin verificar su origen")
+
+    async def recibir_update(solicitud):
+        if secreto:
+            recibido = solicitud.encabezados.get('x-telegram-bot-api-secret-token', '')
+            if not hmac.compare_digest(recibido.encode(), secreto.encode()):
+                estadisticas["rechazados_secreto"] += 1
+                return respuesta(403)
+
+        try:
+            datos = json.loads(solicitud.cuerpo)
+            # Un update es siempre un objeto JSON; una lista o un número no se decodifican
+            if not isinstance(datos, dict):
+                raise ValueError(f"se esperaba un objeto JSON, no {type(datos).__name__}")
+            update = Update.de_json(datos, application.bot)
+        except (ValueError, TypeError, KeyError) as e:
+            logger.warning(f"Update inválido recibido por webhook: {e}")
+            return respuesta(400)
+
+        try:
+            if _updates_pendientes(application) >= max_pendientes:
+                raise asyncio.QueueFull
+            application.update_queue.put_nowait(update)
+        except asyncio.QueueFull:
+            # Telegram reintenta cualquier respuesta que no sea 2xx
+            estadisticas["rechazados_cola_llena"] += 1
+            return respuesta(503, encabezados={"Retry-After": str(RETRY_AFTER_COLA_LLENA)})
+
+        estadisticas["recibidos"] += 1
+        return respuesta(200)
+
+    recibir_update.estadisticas = estadisticas
+    return recibir_update
+
+async def _ejecutar(application, puerto=WEBHOOK_PORT):
+    servidor = ServidorHTTP(WEBHOOK_LISTEN, puerto)
+    servidor.agregar_ruta("POST", WEBHOOK_PATH, crear_receptor(application))
+
+    async def salud(solicitud):
+        estado = {"cola": application.update_queue.qsize()}
+        if hasattr(application.update_processor, 'metricas'):
+            estado.update(application.update_processor.metricas())
+        return respuesta(200, json.dumps(estado), content_type="application/json")
+    servidor.agregar_ruta("GET", "/salud", salud)
+
+    detener = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for senal in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(senal, detener.set)
+        except (NotImplementedError, RuntimeError):
+            # Windows no soporta add_signal_handler; Ctrl+C lanza KeyboardInterrupt
+            pass
+
+    async with application:
+        # Igual que run_polling: post_init tras initialize y post_shutdown al final
+        if application.post_init is not None:
+            await application.post_init(application)
+        await application.start()
+        await servidor.iniciar()
+        if WEBHOOK_URL:
+            await application.bot.set_webhook(
+                url=WEBHOOK_URL.rstrip('/') + WEBHOOK_PATH,
+                secret_token=WEBHOOK_SECRET or None,
+                allowed_updates=Update.ALL_TYPES,
+            )
+            logger.info(f"Webhook registrado en {WEBHOOK_URL.rstrip('/')}{WEBHOOK_PATH}")
+        else:
+            logger.info("WEBHOOK_URL vacío: no se registra el webhook en Telegram")
+
+        try:
+            await detener.wait()
+        finally:
+            await servidor.detener()
+            await application.stop()
+            if application.post_shutdown is not None:
+                await application.post_shutdown(application)
+
+def run_webhook(application):
+    """
+    Ejecuta el bot en modo webhook con el servidor HTTP integrado, como
+    alternativa a application.run_polling(). Bloquea hasta recibir SIGINT/SIGTERM.
+
+    Para aplicar backpressure, la aplicación debe construirse con una
+    update_queue acotada: si está llena se responde 503 y Telegram reintenta.
+
+    Con WEBHOOK_URL configurado se exige WEBHOOK_SECRET: sin él cualquiera que
+    conozca la URL pública podría enviar updates falsos.
+
+    Args:
+        application (Application): Aplicación del bot
+    """
+    if WEBHOOK_URL and not WEBHOOK_SECRET:
+        raise SystemExit("WEBHOOK_URL requiere WEBHOOK_SECRET: configúralo para verificar los updates")
+    try:
+        asyncio.run(_ejecutar(application))
+    except KeyboardInterrupt:
+        pass